@@ -1,17 +1,116 @@
 from django.contrib import admin
-from .models import Equipment, UploadHistory
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from .fleet import fleet_summary, hot_equipment_count
+from .models import Equipment, FleetAggregate, UploadHistory
+
+# Changelists count at most this many matching rows
+CHANGELIST_COUNT_LIMIT = 10000
+
+
+class LimitedCountPaginator(Paginator):
+    """Paginator whose count stops at CHANGELIST_COUNT_LIMIT instead of scanning the whole table"""
+
+    @cached_property
+    def count(self):
+        return self.object_list[:CHANGELIST_COUNT_LIMIT].count()
+
+
+class EquipmentPaginator(LimitedCountPaginator):
+    """Unfiltered, the Equipment table size is read from the fleet aggregates"""
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            return hot_equipment_count()
+        return super().count
+
+
+class EquipmentTypeFilter(admin.SimpleListFilter):
+    """Equipment types from the fleet aggregates, not SELECT DISTINCT over Equipment"""
+    title = 'equipment type'
+    parameter_name = 'equipment_type'
+
+    def lookups(self, request, model_admin):
+        types = FleetAggregate.objects.order_by('equipment_type').values_list('equipment_type', flat=True).distinct()
+        return [(t, t) for t in types]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(equipment_type=self.value())
+        return queryset
+
+
+class RecentUploadFilter(admin.SimpleListFilter):
+    """The latest uploads only, instead of every upload ever made"""
+    title = 'upload'
+    parameter_name = 'upload_session'
+    limit = 50
+
+    def lookups(self, request, model_admin):
+        uploads = UploadHistory.objects.select_related('user')[:self.limit]
+        return [(str(upload.id), f"{upload.user.username}: {upload}") for upload in uploads]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(upload_session_id=self.value())
+        return queryset
 
 
 @admin.register(UploadHistory)
 class UploadHistoryAdmin(admin.ModelAdmin):
-    list_display = ['filename', 'user', 'num_records', 'uploaded_at']
-    list_filter = ['uploaded_at', 'user']
+    list_display = ['filename', 'user', 'num_records', 'uploaded_at', 'archived_at']
+    list_filter = ['uploaded_at', 'archived_at', 'user']
+    list_select_related = ['user']
     search_fields = ['filename']
     readonly_fields = ['uploaded_at']
+    raw_id_fields = ['user']
+    paginator = LimitedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Equipment)
 class EquipmentAdmin(admin.ModelAdmin):
     list_display = ['equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature', 'upload_session']
-    list_filter = ['equipment_type', 'upload_session']
+    list_filter = [EquipmentTypeFilter, RecentUploadFilter]
+    list_select_related = ['upload_session']
     search_fields = ['equipment_name', 'equipment_type']
+    raw_id_fields = ['upload_session']
+    paginator = EquipmentPaginator
+    show_full_result_count = False
+
+
+@admin.register(FleetAggregate)
+class FleetAggregateAdmin(admin.ModelAdmin):
+    """Read-only fleet dashboard; the rows are maintained by ingest and retention cleanup"""
+    change_list_template = 'admin/api/fleetaggregate/change_list.html'
+    list_display = ['user', 'equipment_type', 'upload_count', 'equipment_count', 'archived_equipment_count',
+                    'anomaly_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature', 'updated_at']
+    list_filter = ['equipment_type']
+    list_select_related = ['user']
+    search_fields = ['user__username', 'equipment_type']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), 'fleet': fleet_summary()}
+        return super().changelist_view(request, extra_context=extra_context)
+
+    @admin.display(description='avg flowrate')
+    def avg_flowrate(self, obj):
+        return round(obj.flowrate_sum / obj.equipment_count, 2) if obj.equipment_count else None
+
+    @admin.display(description='avg pressure')
+    def avg_pressure(self, obj):
+        return round(obj.pressure_sum / obj.equipment_count, 2) if obj.equipment_count else None
+
+    @admin.display(description='avg temperature')
+    def avg_temperature(self, obj):
+        return round(obj.temperature_sum / obj.equipment_count, 2) if obj.equipment_count else None
@@ -0,0 +1,196 @@
+"""
+Admission control for the CSV ingest path
+
+Parsing and saving an upload is the most expensive thing the API does, so
+ingests are limited globally and per user. Requests over the limit wait in a
+bounded queue for a free slot; when the queue is full, or the wait times out,
+they are rejected with 429 and a Retry-After estimate. Upload size is checked
+while the body streams in, so oversized files are refused before they are
+fully read.
+
+Like the event broker, the controller is in-memory and limits one process.
+"""
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# Retry-After suggested before any ingest has finished
+DEFAULT_RETRY_AFTER = 5
+# Allowance for multipart boundaries and headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class AdmissionRejected(Exception):
+    """No ingest slot is available; retry after `retry_after` seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Uploaded file is too large.'
+    default_code = 'upload_too_large'
+
+
+class IngestAdmission:
+    """
+    Counting limiter with a bounded wait queue
+
+    Args:
+        max_concurrent: Ingests allowed to run at once across all users
+        max_per_user: Ingests allowed to run at once for one user
+        queue_size: Requests allowed to wait for a slot across all users
+        queue_size_per_user: Requests allowed to wait for a slot for one user
+        timeout: Seconds a queued request waits before it is rejected
+    """
+
+    def __init__(self, max_concurrent, max_per_user, queue_size, queue_size_per_user, timeout):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.queue_size = queue_size
+        self.queue_size_per_user = queue_size_per_user
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._active = Counter()
+        self._waiting = Counter()
+        self._active_total = 0
+        self._waiting_total = 0
+        self._stats = {
+            'admitted': 0,
+            'completed': 0,
+            'rejected_queue_full': 0,
+            'rejected_timeout': 0,
+            'peak_active': 0,
+            'peak_waiting': 0,
+            'wait_seconds_total': 0.0,
+            'ingest_seconds_total': 0.0,
+        }
+
+    def _has_slot(self, user_id):
+        return self._active_total < self.max_concurrent and self._active[user_id] < self.max_per_user
+
+    def _retry_after(self):
+        """Estimate when a slot frees up from the average ingest time"""
+        completed = self._stats['completed']
+        if not completed:
+            return DEFAULT_RETRY_AFTER
+        average = self._stats['ingest_seconds_total'] / completed
+        return max(1, math.ceil(average * (1 + self._waiting_total / self.max_concurrent)))
+
+    @contextmanager
+    def admit(self, user_id):
+        """
+        Hold an ingest slot for the duration of the with-block
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait timed out
+        """
+        requested = time.monotonic()
+
+        with self._cond:
+            if not self._has_slot(user_id):
+                if (self._waiting_total >= self.queue_size
+                        or self._waiting[user_id] >= self.queue_size_per_user):
+                    self._stats['rejected_queue_full'] += 1
+                    raise AdmissionRejected('Too many uploads in progress', self._retry_after())
+
+                self._waiting[user_id] += 1
+                self._waiting_total += 1
+                self._stats['peak_waiting'] = max(self._stats['peak_waiting'], self._waiting_total)
+                try:
+                    admitted = self._cond.wait_for(lambda: self._has_slot(user_id), self.timeout)
+                finally:
+                    self._waiting[user_id] -= 1
+                    self._waiting_total -= 1
+                    if not self._waiting[user_id]:
+                        del self._waiting[user_id]
+
+                if not admitted:
+                    self._stats['rejected_timeout'] += 1
+                    raise AdmissionRejected('Timed out waiting for an upload slot', self._retry_after())
+
+            self._active[user_id] += 1
+            self._active_total += 1
+            self._stats['admitted'] += 1
+            self._stats['peak_active'] = max(self._stats['peak_active'], self._active_total)
+            started = time.monotonic()
+            self._stats['wait_seconds_total'] += started - requested
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active[user_id] -= 1
+                self._active_total -= 1
+                if not self._active[user_id]:
+                    del self._active[user_id]
+                self._stats['completed'] += 1
+                self._stats['ingest_seconds_total'] += time.monotonic() - started
+                self._cond.notify_all()
+
+    def metrics(self):
+        """Snapshot of current load, limits and counters"""
+        with self._cond:
+            stats = dict(self._stats)
+            return {
+                'active': self._active_total,
+                'waiting': self._waiting_total,
+                'active_users': len(self._active),
+                'limits': {
+                    'max_concurrent': self.max_concurrent,
+                    'max_per_user': self.max_per_user,
+                    'queue_size': self.queue_size,
+                    'queue_size_per_user': self.queue_size_per_user,
+                    'timeout_seconds': self.timeout,
+                },
+                **stats,
+                'avg_wait_seconds': stats['wait_seconds_total'] / stats['admitted'] if stats['admitted'] else 0.0,
+                'avg_ingest_seconds': stats['ingest_seconds_total'] / stats['completed'] if stats['completed'] else 0.0,
+            }
+
+
+@lru_cache(maxsize=None)
+def get_admission():
+    """Return the process-wide ingest admission controller"""
+    return IngestAdmission(
+        max_concurrent=settings.UPLOAD_MAX_CONCURRENT_INGESTS,
+        max_per_user=settings.UPLOAD_MAX_CONCURRENT_INGESTS_PER_USER,
+        queue_size=settings.UPLOAD_ADMISSION_QUEUE_SIZE,
+        queue_size_per_user=settings.UPLOAD_ADMISSION_QUEUE_SIZE_PER_USER,
+        timeout=settings.UPLOAD_ADMISSION_TIMEOUT_SECONDS
+    )
+
+
+def check_content_length(request):
+    """
+    Refuse a request whose declared body size already exceeds the upload limit
+
+    Raises:
+        UploadTooLarge: If Content-Length is over settings.UPLOAD_MAX_FILE_SIZE
+    """
+    content_length = request.META.get('CONTENT_LENGTH') or ''
+    if content_length.isdigit() and int(content_length) > settings.UPLOAD_MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+        raise UploadTooLarge(f'Uploaded file exceeds the limit of {settings.UPLOAD_MAX_FILE_SIZE} bytes.')
+
+
+class UploadSizeLimitHandler(FileUploadHandler):
+    """Abort a multipart upload as soon as a file grows past settings.UPLOAD_MAX_FILE_SIZE"""
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.UPLOAD_MAX_FILE_SIZE:
+            raise UploadTooLarge(f'Uploaded file exceeds the limit of {settings.UPLOAD_MAX_FILE_SIZE} bytes.')
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None  # Let the next handler build the uploaded file
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+def use_sqlite_wal(sender, connection, **kwargs):
+    """
+    Put SQLite databases in write-ahead-log mode
+
+    An ingest writes its upload in one transaction; in WAL mode readers keep
+    reading the last committed data meanwhile instead of waiting on it.
+    """
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        connection_created.connect(use_sqlite_wal, dispatch_uid='api.use_sqlite_wal')
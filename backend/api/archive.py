@@ -0,0 +1,291 @@
+"""
+Archive tier for uploads that age out of the hot set
+
+When settings.UPLOAD_RETENTION_MODE is 'archive', cleanup_old_uploads()
+compacts the Equipment rows of old uploads into a zstd-compressed Parquet
+file under settings.UPLOAD_ARCHIVE_DIR and deletes them from the database.
+The UploadHistory row (filename, counts, averages) stays, marked with
+archived_at. Endpoints that are asked for an archived upload rehydrate the
+file into numpy columns and serve from those; rehydrated uploads are kept
+in an in-process LRU cache.
+
+Archive rows are stored ordered by (equipment_name, id), the order pages
+are served in, so paging an archived upload is a slice.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .columnar import NUMERIC_COLUMNS, UploadColumns, delete_upload_columns
+from .models import Equipment
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = [
+    'id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature',
+    'flowrate_z', 'pressure_z', 'temperature_z', 'anomaly_score', 'is_anomaly',
+]
+ARCHIVE_BATCH_SIZE = 5000
+ARCHIVE_ROW_GROUP_SIZE = 65536
+
+
+def upload_archive_path(upload_id):
+    """Path of the archive file of an upload"""
+    return os.path.join(settings.UPLOAD_ARCHIVE_DIR, f'{upload_id}.parquet')
+
+
+class ArchivedUpload(UploadColumns):
+    """
+    Rehydrated columns of an archived upload
+
+    Provides the same summary() and type_distribution() as a columnar
+    sidecar, plus the row-level reads the endpoints need.
+    """
+
+    def __init__(self, table):
+        # Attributes are named after the Equipment fields they hold
+        self.id = table.column('id').to_numpy()
+        self.equipment_name = table.column('equipment_name').to_numpy(zero_copy_only=False)
+        for name in NUMERIC_COLUMNS:
+            setattr(self, name, table.column(name).to_numpy())
+        for name in ('flowrate_z', 'pressure_z', 'temperature_z', 'anomaly_score'):
+            setattr(self, name, table.column(name).to_numpy())
+        self.is_anomaly = table.column('is_anomaly').to_numpy(zero_copy_only=False)
+
+        types = table.column('equipment_type').combine_chunks().dictionary_encode()
+        self.type_codes = types.indices.to_numpy(zero_copy_only=False).astype(np.int32)
+        self.types = types.dictionary.to_pylist()
+
+    def _values(self, field, index):
+        if field == 'equipment_type':
+            return np.asarray(self.types, dtype=object)[self.type_codes[index]].tolist()
+        return getattr(self, field)[index].tolist()
+
+    def rows(self, fields, index):
+        """
+        Selected rows as tuples
+
+        Args:
+            fields: Field names, as in the serializers
+            index: Slice or integer index array selecting the rows
+
+        Returns:
+            List of tuples of plain Python values
+        """
+        return list(zip(*(self._values(field, index) for field in fields)))
+
+    def records(self, fields, index):
+        """Selected rows as dictionaries, like serializer output"""
+        return [dict(zip(fields, row)) for row in self.rows(fields, index)]
+
+    def page(self, fields, offset=0, limit=None):
+        """Rows in (equipment_name, id) order, optionally one page of them"""
+        end = offset + limit if limit is not None else None
+        return self.records(fields, slice(offset, end))
+
+    def anomalies(self, fields, threshold, equipment_type=None, limit=None):
+        """
+        Rows scoring above the threshold, most severe first
+
+        Returns:
+            Tuple of (records, total number of matching rows)
+        """
+        mask = self.anomaly_score > threshold
+        if equipment_type:
+            code = self.types.index(equipment_type) if equipment_type in self.types else -1
+            mask &= self.type_codes == code
+
+        index = np.flatnonzero(mask)
+        index = index[np.argsort(-self.anomaly_score[index], kind='stable')]
+        return self.records(fields, index[:limit]), len(index)
+
+    def iter_rows(self, fields, batch_size=ARCHIVE_BATCH_SIZE):
+        """Yield rows as tuples in id (original upload) order"""
+        order = np.argsort(self.id, kind='stable')
+        for start in range(0, len(order), batch_size):
+            yield from self.rows(fields, order[start:start + batch_size])
+
+
+class ArchiveCache:
+    """
+    LRU cache of rehydrated uploads
+
+    Args:
+        max_size: Number of rehydrated uploads kept in memory
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._uploads = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, upload_history):
+        """
+        Return the rehydrated upload, reading its archive on a cache miss
+
+        Raises:
+            OSError: If the archive file cannot be read
+        """
+        with self._lock:
+            archived = self._uploads.get(upload_history.id)
+            if archived is not None:
+                self._uploads.move_to_end(upload_history.id)
+                self._stats['hits'] += 1
+                return archived
+            self._stats['misses'] += 1
+
+        # Read outside the lock so one slow rehydration doesn't block cache hits
+        archived = read_upload_archive(upload_history.id)
+
+        with self._lock:
+            self._uploads[upload_history.id] = archived
+            self._uploads.move_to_end(upload_history.id)
+            while len(self._uploads) > self.max_size:
+                self._uploads.popitem(last=False)
+                self._stats['evictions'] += 1
+        return archived
+
+    def evict(self, upload_id):
+        with self._lock:
+            self._uploads.pop(upload_id, None)
+
+    def metrics(self):
+        """Snapshot of cache size and counters"""
+        with self._lock:
+            return {'size': len(self._uploads), 'max_size': self.max_size, **self._stats}
+
+
+@lru_cache(maxsize=None)
+def get_archive_cache():
+    """Return the process-wide cache of rehydrated uploads"""
+    return ArchiveCache(settings.UPLOAD_ARCHIVE_CACHE_SIZE)
+
+
+def load_archived_upload(upload_history):
+    """
+    Rehydrate an archived upload, through the LRU cache
+
+    Args:
+        upload_history: UploadHistory instance with archived_at set
+
+    Returns:
+        ArchivedUpload
+    """
+    return get_archive_cache().get(upload_history)
+
+
+def read_upload_archive(upload_id):
+    """Read an archive file into an ArchivedUpload"""
+    import pyarrow.parquet as pq
+
+    return ArchivedUpload(pq.read_table(upload_archive_path(upload_id)))
+
+
+def write_upload_archive(upload_history):
+    """
+    Write an upload's Equipment rows to its archive file
+
+    The file is written under a temporary name and renamed into place.
+
+    Args:
+        upload_history: UploadHistory instance
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('equipment_name', pa.string()),
+        ('equipment_type', pa.string()),
+        ('flowrate', pa.float64()),
+        ('pressure', pa.float64()),
+        ('temperature', pa.float64()),
+        ('flowrate_z', pa.float64()),
+        ('pressure_z', pa.float64()),
+        ('temperature_z', pa.float64()),
+        ('anomaly_score', pa.float64()),
+        ('is_anomaly', pa.bool_()),
+    ])
+
+    rows = (
+        Equipment.objects.filter(upload_session=upload_history)
+        .order_by('equipment_name', 'id')
+        .values_list(*ARCHIVE_FIELDS)
+        .iterator(chunk_size=ARCHIVE_BATCH_SIZE)
+    )
+
+    path = upload_archive_path(upload_history.id)
+    tmp_path = f'{path}.tmp'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def write_row_group(writer, batch):
+        columns = list(zip(*batch))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema
+        ))
+
+    try:
+        with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= ARCHIVE_ROW_GROUP_SIZE:
+                    write_row_group(writer, batch)
+                    batch = []
+            if batch:
+                write_row_group(writer, batch)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def archive_upload(upload_history):
+    """
+    Move an upload's Equipment rows out of the database into its archive
+
+    The summary row is kept and marked archived. If the archive cannot be
+    written the upload is left as it was.
+
+    Args:
+        upload_history: UploadHistory instance
+
+    Returns:
+        True if the upload was archived
+    """
+    try:
+        write_upload_archive(upload_history)
+    except OSError:
+        logger.warning('Could not archive upload %s', upload_history.id, exc_info=True)
+        return False
+
+    with transaction.atomic():
+        Equipment.objects.filter(upload_session=upload_history).delete()
+        upload_history.archived_at = timezone.now()
+        upload_history.save(update_fields=['archived_at'])
+
+    # The archive holds the columns now
+    delete_upload_columns(upload_history.id)
+    return True
+
+
+def delete_upload_archive(upload_id):
+    """Remove the archive file of an upload, if any, and drop it from the cache"""
+    get_archive_cache().evict(upload_id)
+    try:
+        os.remove(upload_archive_path(upload_id))
+    except FileNotFoundError:
+        pass
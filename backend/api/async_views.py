@@ -0,0 +1,301 @@
+"""
+Async read endpoints for ASGI deployments
+
+These mirror get_data, get_summary and get_history in api.views but are
+native Django async views built on the async ORM, so a single ASGI worker
+can keep many slow dashboard requests in flight. DRF's @api_view is
+sync-only, so authentication is done by api.authentication.aauthenticate().
+"""
+import time
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .archive import load_archived_upload
+from .authentication import aauthenticate, unauthorized_response, method_not_allowed_response
+from .columnar import load_upload_columns
+from .events import get_broker, parse_last_event_id, format_sse, AsyncSubscription, KEEPALIVE
+from .models import Equipment, UploadHistory
+from .result_cache import get_result_cache
+from .sampling import load_upload_sample, sample_records
+from .sketches import load_upload_sketches, sketch_percentiles
+from .serializers import EquipmentSerializer, UploadHistorySerializer
+from .table_query import (
+    default_table_query, is_default, is_filtered, page_cursor, parse_table_query, query_archived, query_equipment,
+    seek_archived, seek_equipment
+)
+from .views import DASHBOARD_SECTIONS, get_page_params, get_sample_params
+
+
+def async_login_required(view):
+    """Reject unauthenticated requests with the same 401 body DRF returns"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return method_not_allowed_response(request.method)
+
+        user, error = await aauthenticate(request)
+        if user is None:
+            return unauthorized_response(error)
+
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def aget_requested_upload(request):
+    """The upload named by the upload_id query param, else the user's latest (or None)"""
+    uploads = UploadHistory.objects.filter(user=request.user)
+    upload_id = request.GET.get('upload_id')
+
+    if upload_id:
+        return await uploads.filter(id=upload_id).afirst() if upload_id.isdigit() else None
+    return await uploads.afirst()
+
+
+async def aequipment_page(upload, offset=0, limit=None, query=None):
+    """
+    Equipment records of an upload, optionally one page of them
+
+    Args:
+        query: Table query to filter and order by (see api.table_query);
+               defaults to every record in name order
+
+    Returns:
+        Tuple of (records, number of records the query selects)
+    """
+    query = query or default_table_query()
+    fields = EquipmentSerializer.Meta.fields
+    end = offset + limit if limit is not None else None
+
+    if upload.archived_at:
+        archived = await sync_to_async(load_archived_upload, thread_sensitive=False)(upload)
+        if is_default(query):
+            return await sync_to_async(archived.page, thread_sensitive=False)(fields, offset, limit), upload.num_records
+        index = await sync_to_async(query_archived, thread_sensitive=False)(archived, query)
+        page = (await sync_to_async(seek_archived, thread_sensitive=False)(archived, index, query))[offset:end]
+        return await sync_to_async(archived.records, thread_sensitive=False)(fields, page), len(index)
+
+    # Name alone is not unique, so the id keeps page boundaries stable
+    equipment = query_equipment(Equipment.objects.filter(upload_session=upload), upload, query).values(*fields)
+
+    if limit is None and not offset and query['after'] is None:
+        data = [row async for row in equipment.aiterator(chunk_size=2000)]
+        return data, len(data)
+
+    data = [row async for row in seek_equipment(equipment, query)[offset:end].aiterator(chunk_size=2000)]
+    return data, await equipment.acount() if is_filtered(query) else upload.num_records
+
+
+async def aupload_summary(upload):
+    """Summary statistics of an upload, from the result cache"""
+    return await get_result_cache().aget_or_compute('summary', upload.id, partial(acompute_upload_summary, upload))
+
+
+async def acompute_upload_summary(upload):
+    """Summary statistics of an upload"""
+    # Vectorized over the memory-mapped sidecar (or rehydrated archive) when there is one
+    load = load_archived_upload if upload.archived_at else load_upload_columns
+    columns = await sync_to_async(load, thread_sensitive=False)(upload)
+    if columns is not None:
+        summary = await sync_to_async(columns.summary, thread_sensitive=False)()
+    else:
+        equipment = Equipment.objects.filter(upload_session=upload)
+
+        # One grouped query instead of a COUNT per type
+        type_distribution = {
+            row['equipment_type']: row['count']
+            async for row in equipment.order_by().values('equipment_type').annotate(count=Count('id'))
+        }
+
+        summary = {
+            'total_count': await equipment.acount(),
+            'avg_flowrate': round(upload.avg_flowrate, 2) if upload.avg_flowrate else 0,
+            'avg_pressure': round(upload.avg_pressure, 2) if upload.avg_pressure else 0,
+            'avg_temperature': round(upload.avg_temperature, 2) if upload.avg_temperature else 0,
+            'type_distribution': type_distribution
+        }
+
+    # Sketches are only built here for uploads ingested before they existed
+    sketches = (await sync_to_async(load_upload_sketches)([upload]))[0]
+    summary['percentiles'] = sketch_percentiles(sketches, settings.SUMMARY_PERCENTILES)
+    return summary
+
+
+@async_login_required
+async def get_data(request):
+    """
+    Get equipment data for the current user's latest upload
+    Query params: upload_id (defaults to the latest upload), offset, limit;
+                  ordering, equipment_type, <field>_min/<field>_max, is_anomaly,
+                  search, after (see api.table_query);
+                  sample (N random rows from the upload's stored preview sample
+                  instead of a page), stratify (equipment_type)
+    Returns: One page of equipment records, the number of records matching
+             (count) and in the upload (total_count), the page's offset/limit,
+             and next_cursor to pass as after for the next page (null after
+             a short page)
+    """
+    upload = await aget_requested_upload(request)
+
+    if not upload:
+        return JsonResponse({'upload_id': None, 'count': 0, 'data': []})
+
+    try:
+        sample, stratify = get_sample_params(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if sample:
+        # Built on first use for older uploads, which scans their rows
+        stored = await sync_to_async(load_upload_sample)(upload)
+        return JsonResponse({
+            'upload_id': upload.id,
+            'count': upload.num_records,
+            'sampled': True,
+            'stratify': stratify,
+            'data': sample_records(stored, sample, stratify is not None)
+        })
+
+    try:
+        offset, limit = get_page_params(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'offset and limit must be non-negative integers'}, status=400)
+
+    try:
+        query = parse_table_query(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    data, count = await aequipment_page(upload, offset, limit, query)
+
+    return JsonResponse({
+        'upload_id': upload.id,
+        'count': count,
+        'total_count': upload.num_records,
+        'offset': offset,
+        'limit': limit,
+        'next_cursor': page_cursor(data[-1], query['ordering']) if limit and len(data) == limit else None,
+        'data': data
+    })
+
+
+@async_login_required
+async def get_summary(request):
+    """
+    Get summary statistics for current user's latest upload
+    Query params: upload_id (defaults to the latest upload)
+    Returns: Summary statistics
+    """
+    upload = await aget_requested_upload(request)
+
+    if not upload:
+        return JsonResponse({
+            'message': 'No data available',
+            'upload_id': None,
+            'summary': None
+        })
+
+    return JsonResponse({'upload_id': upload.id, 'summary': await aupload_summary(upload)})
+
+
+@async_login_required
+async def get_dashboard(request):
+    """
+    Summary, upload history and the first page of data in one round trip
+    Query params: sections (comma-separated subset of summary,history,data), page_size
+    Returns: The requested sections for the user's latest upload
+    """
+    sections = request.GET.get('sections')
+    sections = set(sections.split(',')) if sections else set(DASHBOARD_SECTIONS)
+    unknown = sections.difference(DASHBOARD_SECTIONS)
+
+    if unknown:
+        return JsonResponse({'error': f"Unknown dashboard sections: {', '.join(sorted(unknown))}"}, status=400)
+
+    try:
+        page_size = min(int(request.GET.get('page_size', settings.DASHBOARD_PAGE_SIZE)),
+                        settings.DASHBOARD_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'page_size must be an integer'}, status=400)
+
+    # One history query serves both the history section and the latest upload
+    history = [
+        upload async for upload in
+        UploadHistory.objects.filter(user=request.user).select_related('user')[:5]
+    ]
+    latest_upload = history[0] if history else None
+
+    response = {'upload_id': latest_upload.id if latest_upload else None}
+
+    if 'summary' in sections:
+        response['summary'] = await aupload_summary(latest_upload) if latest_upload else None
+
+    if 'history' in sections:
+        response['history'] = UploadHistorySerializer(history, many=True).data
+
+    if 'data' in sections:
+        if latest_upload:
+            response['data'], response['data_count'] = await aequipment_page(latest_upload, 0, max(page_size, 0))
+        else:
+            response['data'], response['data_count'] = [], 0
+
+    return JsonResponse(response)
+
+
+@async_login_required
+async def get_history(request):
+    """
+    Get last 5 upload history records for current user
+    Query params: include_archived (also list archived uploads)
+    Returns: List of upload history
+    """
+    uploads = UploadHistory.objects.filter(user=request.user).select_related('user')
+    if request.GET.get('include_archived', '').lower() not in ('1', 'true'):
+        uploads = uploads[:5]
+    history = [upload async for upload in uploads]
+    serializer = UploadHistorySerializer(history, many=True)
+
+    return JsonResponse({'history': serializer.data})
+
+
+async def event_stream(request):
+    """
+    Server-Sent Events stream of the current user's upload and retention events
+    Auth: Token header, session, or ?ticket= from /api/events/ticket/
+          (EventSource cannot set headers)
+    Query params: last_event_id (when reopening a stream; the Last-Event-ID
+                  header takes precedence)
+    Returns: text/event-stream; resumes after the last event id
+    """
+    if request.method != 'GET':
+        return method_not_allowed_response(request.method)
+
+    user, error = await aauthenticate(request, allow_ticket=True)
+    if user is None:
+        return unauthorized_response(error)
+
+    broker = get_broker()
+    subscription = AsyncSubscription()
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    broker.subscribe(user.pk, subscription, parse_last_event_id(last_event_id))
+
+    async def stream():
+        try:
+            yield b'retry: 5000\n\n'
+            # End the stream periodically; the client reconnects with Last-Event-ID.
+            # This also bounds streams whose client went away unnoticed.
+            deadline = time.monotonic() + settings.EVENTS_STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                event = await subscription.get(timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+                yield format_sse(event) if event else KEEPALIVE
+        finally:
+            broker.unsubscribe(user.pk, subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,140 @@
+"""
+Authentication helpers for views that cannot use DRF's @api_view
+
+Native async views and Server-Sent Event streams return plain Django
+responses, so they authenticate here with the same credentials the DRF
+views accept: an ``Authorization: Token <key>`` header or a session cookie.
+
+The browser EventSource API cannot set request headers, so event streams
+also accept ``?ticket=``: a signed ticket naming the user, issued by
+/api/events/ticket/ and valid for EVENT_STREAM_TICKET_MAX_AGE seconds.
+The long-lived token never appears in a URL.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.contrib.auth.models import User
+from django.core import signing
+from django.http import JsonResponse
+from rest_framework.authtoken.models import Token
+
+STREAM_TICKET_SALT = 'api.authentication.stream-ticket'
+
+
+def _token_key(request):
+    """Return (token key or None, error message or None)"""
+    parts = request.headers.get('Authorization', '').split()
+
+    if parts and parts[0].lower() == 'token':
+        if len(parts) != 2:
+            return None, 'Invalid token header.'
+        return parts[1], None
+
+    return None, None
+
+
+def issue_stream_ticket(user):
+    """Signed, short-lived ticket that opens the user's event stream"""
+    return signing.TimestampSigner(salt=STREAM_TICKET_SALT).sign(str(user.pk))
+
+
+def _ticket_user_id(request, allow_ticket):
+    """Return (user id or None, error message or None)"""
+    ticket = request.GET.get('ticket') if allow_ticket else None
+    if not ticket:
+        return None, None
+
+    signer = signing.TimestampSigner(salt=STREAM_TICKET_SALT)
+    try:
+        return int(signer.unsign(ticket, max_age=settings.EVENT_STREAM_TICKET_MAX_AGE)), None
+    except (signing.BadSignature, ValueError):
+        return None, 'Invalid or expired ticket.'
+
+
+def _check_user(user):
+    if user is None or not user.is_active:
+        return None, 'User inactive or deleted.'
+    return user, None
+
+
+def _check_token(token):
+    if token is None:
+        return None, 'Invalid token.'
+    if not token.user.is_active:
+        return None, 'User inactive or deleted.'
+    return token.user, None
+
+
+def authenticate_request(request, allow_ticket=False):
+    """
+    Authenticate a plain Django request
+
+    Args:
+        request: Django HttpRequest
+        allow_ticket: Also accept a stream ticket as the ``ticket`` query parameter
+
+    Returns:
+        Tuple of (User or None, error message or None)
+    """
+    key, error = _token_key(request)
+    if error:
+        return None, error
+
+    if key is not None:
+        return _check_token(Token.objects.select_related('user').filter(key=key).first())
+
+    user_id, error = _ticket_user_id(request, allow_ticket)
+    if error:
+        return None, error
+
+    if user_id is not None:
+        return _check_user(User.objects.filter(pk=user_id).first())
+
+    user = get_user(request)
+    if user.is_authenticated:
+        return user, None
+
+    return None, 'Authentication credentials were not provided.'
+
+
+async def aauthenticate(request, allow_ticket=False):
+    """
+    Authenticate a request without blocking the event loop
+
+    Args:
+        request: Django HttpRequest
+        allow_ticket: Also accept a stream ticket as the ``ticket`` query parameter
+
+    Returns:
+        Tuple of (User or None, error message or None)
+    """
+    key, error = _token_key(request)
+    if error:
+        return None, error
+
+    if key is not None:
+        return _check_token(await Token.objects.select_related('user').filter(key=key).afirst())
+
+    user_id, error = _ticket_user_id(request, allow_ticket)
+    if error:
+        return None, error
+
+    if user_id is not None:
+        return _check_user(await User.objects.filter(pk=user_id).afirst())
+
+    user = await sync_to_async(get_user)(request)
+    if user.is_authenticated:
+        return user, None
+
+    return None, 'Authentication credentials were not provided.'
+
+
+def unauthorized_response(error):
+    """The same 401 body and challenge DRF returns"""
+    response = JsonResponse({'detail': error}, status=401)
+    response['WWW-Authenticate'] = 'Token'
+    return response
+
+
+def method_not_allowed_response(method):
+    return JsonResponse({'detail': f'Method "{method}" not allowed.'}, status=405)
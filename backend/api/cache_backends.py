@@ -0,0 +1,66 @@
+"""
+Cache backends for the ChemLizer API
+
+LocMemCache bounds itself by entry count only, so a few large values can
+grow a worker by any amount. ByteLimitedLocMemCache also bounds the total
+pickled size of its entries by OPTIONS['MAX_BYTES'], evicting the least
+recently used entries first; a single value larger than that is not
+stored at all.
+"""
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64 MB
+
+# Pickled size per key, per named cache (shared like LocMemCache's entries)
+_sizes = {}
+
+
+class ByteLimitedLocMemCache(LocMemCache):
+    """LocMemCache bounded by the pickled size of its entries as well as their number"""
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._max_bytes = int(params.get('OPTIONS', {}).get('MAX_BYTES', DEFAULT_MAX_BYTES))
+        self._sizes = _sizes.setdefault(name, {})
+
+    def size_bytes(self):
+        """Total pickled size of the entries"""
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self._delete(key)
+        if len(value) > self._max_bytes:
+            return
+        super()._set(key, value, timeout)
+        self._sizes[key] = len(value)
+
+        total = sum(self._sizes.values())
+        while total > self._max_bytes:
+            # The least recently used entry is last
+            oldest = next(reversed(self._cache))
+            total -= self._sizes.get(oldest, 0)
+            self._delete(oldest)
+
+    def _delete(self, key):
+        self._sizes.pop(key, None)
+        return super()._delete(key)
+
+    def _cull(self):
+        super()._cull()
+        for key in [key for key in self._sizes if key not in self._cache]:
+            del self._sizes[key]
+
+    def incr(self, key, delta=1, version=None):
+        value = super().incr(key, delta, version)
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            if key in self._cache:
+                self._sizes[key] = len(self._cache[key])
+        return value
+
+    def clear(self):
+        super().clear()
+        with self._lock:
+            self._sizes.clear()
@@ -0,0 +1,134 @@
+"""
+Columnar sidecar files for upload numerics
+
+At ingest each upload's numeric columns and dictionary-encoded equipment
+types are written as .npy files under settings.COLUMNAR_STORAGE_DIR.
+Analytics memory-map them (np.load(mmap_mode='r')) and run vectorized over
+the OS page cache instead of materializing Equipment rows through the ORM.
+Uploads without a sidecar (ingested before it existed, or whose write
+failed) fall back to the ORM.
+"""
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Sidecar column name -> CSV column
+NUMERIC_COLUMNS = {
+    'flowrate': 'Flowrate',
+    'pressure': 'Pressure',
+    'temperature': 'Temperature',
+}
+TYPE_CODES_FILE = 'type_codes.npy'
+TYPES_FILE = 'types.json'
+
+
+def upload_columns_dir(upload_id):
+    """Directory holding the sidecar files of an upload"""
+    return os.path.join(settings.COLUMNAR_STORAGE_DIR, str(upload_id))
+
+
+class UploadColumns:
+    """Read-only, memory-mapped view of an upload's sidecar columns"""
+
+    def __init__(self, path):
+        for name in NUMERIC_COLUMNS:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+        self.type_codes = np.load(os.path.join(path, TYPE_CODES_FILE), mmap_mode='r')
+        with open(os.path.join(path, TYPES_FILE)) as f:
+            self.types = json.load(f)
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    def type_distribution(self):
+        """Equipment count per type, most common first (like value_counts())"""
+        codes = np.asarray(self.type_codes)
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.types))
+        order = np.argsort(-counts, kind='stable')
+        return {self.types[i]: int(counts[i]) for i in order if counts[i]}
+
+    def summary(self):
+        """Summary statistics with the same keys as calculate_summary_statistics()"""
+        summary = {'total_count': len(self)}
+        for name in NUMERIC_COLUMNS:
+            values = getattr(self, name)
+            if len(values):
+                summary[f'avg_{name}'] = round(float(np.nanmean(values)), 2)
+        for name in NUMERIC_COLUMNS:
+            values = getattr(self, name)
+            if len(values):
+                summary[f'min_{name}'] = round(float(np.nanmin(values)), 2)
+                summary[f'max_{name}'] = round(float(np.nanmax(values)), 2)
+        summary['type_distribution'] = self.type_distribution()
+        return summary
+
+
+def write_upload_columns(upload_history, df):
+    """
+    Write the sidecar files of an upload
+
+    Files are written to a temporary directory and renamed into place, so
+    readers never see a partial sidecar. A failed write is logged and the
+    upload keeps working through the ORM.
+
+    Args:
+        upload_history: UploadHistory instance
+        df: pandas DataFrame with equipment data
+
+    Returns:
+        True if the sidecar was written
+    """
+    import pandas as pd  # Only needed at ingest, which has already loaded it
+
+    path = upload_columns_dir(upload_history.id)
+    tmp_path = f'{path}.tmp'
+
+    try:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        for name, column in NUMERIC_COLUMNS.items():
+            np.save(os.path.join(tmp_path, f'{name}.npy'), df[column].to_numpy(dtype=np.float64))
+
+        codes, types = pd.factorize(df['Type'])
+        np.save(os.path.join(tmp_path, TYPE_CODES_FILE), codes.astype(np.int32))
+        with open(os.path.join(tmp_path, TYPES_FILE), 'w') as f:
+            json.dump([str(t) for t in types], f)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        logger.warning('Could not write columnar sidecar for upload %s', upload_history.id, exc_info=True)
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return False
+
+
+def load_upload_columns(upload_history):
+    """
+    Memory-map the sidecar columns of an upload
+
+    Args:
+        upload_history: UploadHistory instance
+
+    Returns:
+        UploadColumns, or None if the upload has no sidecar
+    """
+    path = upload_columns_dir(upload_history.id)
+    if not os.path.isdir(path):
+        return None
+    try:
+        return UploadColumns(path)
+    except (OSError, ValueError):
+        return None
+
+
+def delete_upload_columns(upload_id):
+    """Remove the sidecar files of an upload, if any"""
+    shutil.rmtree(upload_columns_dir(upload_id), ignore_errors=True)
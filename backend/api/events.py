@@ -0,0 +1,155 @@
+"""
+Per-user server-push events (served as Server-Sent Events)
+
+Ingest and retention code publishes events through publish_event(); the
+/api/events/ stream subscribes to the broker configured in
+settings.EVENTS_BROKER. The default InMemoryBroker fans events out to
+subscribers in the current process, which is enough for local testing and
+single-process deployments.
+"""
+import asyncio
+import itertools
+import json
+import queue
+import threading
+from collections import defaultdict, deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+# Event types
+UPLOAD_STARTED = 'upload.started'
+UPLOAD_PROGRESS = 'upload.progress'
+UPLOAD_COMPLETED = 'upload.completed'
+UPLOAD_FAILED = 'upload.failed'
+RETENTION_CLEANUP = 'retention.cleanup'
+
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class Subscription:
+    """Event queue consumed by a synchronous (WSGI) stream"""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            pass  # Slow consumer; it can catch up with Last-Event-ID on reconnect
+
+    def get(self, timeout):
+        """Return the next event, or None after `timeout` seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription:
+    """Event queue consumed by an async (ASGI) stream; publishers may run in any thread"""
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, event):
+        self._loop.call_soon_threadsafe(self._put_nowait, event)
+
+    def _put_nowait(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self, timeout):
+        """Return the next event, or None after `timeout` seconds"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InMemoryBroker:
+    """
+    Single-process event broker
+
+    Keeps the last few events per user so a reconnecting client can
+    resume from its Last-Event-ID.
+    """
+
+    def __init__(self, history_size=50):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers = defaultdict(set)
+        self._history = defaultdict(lambda: deque(maxlen=history_size))
+
+    def publish(self, user_id, event_type, data):
+        """Send an event to every subscriber of a user"""
+        with self._lock:
+            event = {'id': next(self._ids), 'type': event_type, 'data': data}
+            self._history[user_id].append(event)
+            subscribers = list(self._subscribers[user_id])
+
+        for subscription in subscribers:
+            subscription.put(event)
+        return event
+
+    def subscribe(self, user_id, subscription, last_event_id=None):
+        """Register a subscription, replaying buffered events newer than last_event_id"""
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+            missed = [e for e in self._history[user_id]
+                      if last_event_id is not None and e['id'] > last_event_id]
+
+        for event in missed:
+            subscription.put(event)
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            self._subscribers[user_id].discard(subscription)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """Return the process-wide broker configured by settings.EVENTS_BROKER"""
+    return import_string(settings.EVENTS_BROKER)()
+
+
+def publish_event(user, event_type, data):
+    """
+    Publish an event to all of a user's open event streams
+
+    Args:
+        user: User instance (or user id)
+        event_type: One of the event type constants
+        data: JSON-serializable payload
+
+    Returns:
+        The published event dictionary
+    """
+    user_id = getattr(user, 'pk', user)
+    return get_broker().publish(user_id, event_type, data)
+
+
+def parse_last_event_id(value):
+    """Parse a Last-Event-ID header value, ignoring garbage"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_sse(event):
+    """Encode an event in text/event-stream format"""
+    payload = json.dumps(event['data'], cls=JSONEncoder)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n".encode('utf-8')
+
+
+# Comment line that keeps proxies and clients from timing out an idle stream
+KEEPALIVE = b': keepalive\n\n'
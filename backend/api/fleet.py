@@ -0,0 +1,188 @@
+"""
+Fleet-wide equipment aggregates, maintained incrementally
+
+FleetAggregate keeps running totals per (user, equipment type): uploads,
+equipment, anomalies and parameter sums. Ingest adds an upload's per-type
+stats. Retention cleanup subtracts them when an upload is deleted, or moves
+them to the archived count when it is archived. Cross-user views (the admin
+dashboard and /api/fleet/) read this small table instead of aggregating the
+Equipment table.
+
+Averages are derived from the sums, so every total can be decremented
+exactly. Min/max and percentiles cannot and are left to the per-upload
+summaries and sketches. rebuild_fleet_aggregates() recomputes everything
+from the uploads (manage.py rebuild_fleet_aggregates).
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .archive import load_archived_upload
+from .columnar import NUMERIC_COLUMNS
+from .models import Equipment, FleetAggregate, UploadHistory
+
+SUM_FIELDS = [f'{name}_sum' for name in NUMERIC_COLUMNS]
+COUNT_FIELDS = ['equipment_count', 'archived_equipment_count', 'anomaly_count']
+
+
+def type_stats(type_codes, types, columns, is_anomaly):
+    """
+    Per-type stats of an upload from its columns
+
+    Args:
+        type_codes: Integer equipment type code per row (-1 for missing)
+        types: Equipment type name per code
+        columns: Mapping of parameter name (NUMERIC_COLUMNS keys) to values
+        is_anomaly: Boolean anomaly flag per row
+
+    Returns:
+        {type: {'equipment_count', 'anomaly_count', 'flowrate_sum', ...}}
+    """
+    type_codes = np.asarray(type_codes)
+    valid = type_codes >= 0
+    codes = type_codes[valid]
+    size = len(types)
+
+    counts = np.bincount(codes, minlength=size)
+    anomalies = np.bincount(codes, weights=np.asarray(is_anomaly, dtype=np.float64)[valid], minlength=size)
+    sums = {
+        name: np.bincount(codes, weights=np.nan_to_num(np.asarray(columns[name], dtype=np.float64)[valid]),
+                          minlength=size)
+        for name in NUMERIC_COLUMNS
+    }
+
+    return {
+        str(type_name): {
+            'equipment_count': int(counts[i]),
+            'anomaly_count': int(anomalies[i]),
+            **{f'{name}_sum': float(sums[name][i]) for name in NUMERIC_COLUMNS},
+        }
+        for i, type_name in enumerate(types)
+        if counts[i]
+    }
+
+
+def upload_type_stats(upload_history):
+    """Per-type stats of a stored upload, from its archive or one grouped query"""
+    if upload_history.archived_at:
+        archived = load_archived_upload(upload_history)
+        return type_stats(
+            archived.type_codes,
+            archived.types,
+            {name: getattr(archived, name) for name in NUMERIC_COLUMNS},
+            archived.is_anomaly
+        )
+
+    rows = (
+        Equipment.objects.filter(upload_session=upload_history)
+        .order_by()
+        .values('equipment_type')
+        .annotate(
+            equipment_count=Count('id'),
+            anomaly_count=Count('id', filter=Q(is_anomaly=True)),
+            **{f'{name}_sum': Sum(name) for name in NUMERIC_COLUMNS}
+        )
+    )
+    return {row.pop('equipment_type'): row for row in rows}
+
+
+def _apply(user, stats, upload_sign, count_sign, archived_sign):
+    now = timezone.now()
+    with transaction.atomic():
+        for equipment_type, values in stats.items():
+            aggregate, _ = FleetAggregate.objects.get_or_create(user=user, equipment_type=equipment_type)
+            count = values['equipment_count']
+            # F() increments, so concurrent ingests of one user don't lose updates
+            FleetAggregate.objects.filter(pk=aggregate.pk).update(
+                upload_count=F('upload_count') + upload_sign,
+                equipment_count=F('equipment_count') + count_sign * count,
+                archived_equipment_count=F('archived_equipment_count') + archived_sign * count,
+                anomaly_count=F('anomaly_count') + count_sign * values['anomaly_count'],
+                **{field: F(field) + count_sign * (values[field] or 0) for field in SUM_FIELDS},
+                updated_at=now
+            )
+        if upload_sign < 0:
+            FleetAggregate.objects.filter(user=user, upload_count__lte=0).delete()
+
+
+def record_ingest(user, stats):
+    """Add a new upload's per-type stats"""
+    _apply(user, stats, upload_sign=1, count_sign=1, archived_sign=0)
+
+
+def record_archive(user, stats):
+    """Count an upload's equipment as archived"""
+    _apply(user, stats, upload_sign=0, count_sign=0, archived_sign=1)
+
+
+def record_delete(user, stats, archived=False):
+    """Subtract a deleted upload's per-type stats"""
+    _apply(user, stats, upload_sign=-1, count_sign=-1, archived_sign=-1 if archived else 0)
+
+
+def rebuild_fleet_aggregates():
+    """
+    Recompute every aggregate from the stored uploads
+
+    Returns:
+        Number of uploads counted
+    """
+    uploads = UploadHistory.objects.select_related('user').order_by('id')
+    with transaction.atomic():
+        FleetAggregate.objects.all().delete()
+        for upload in uploads.iterator():
+            stats = upload_type_stats(upload)
+            record_ingest(upload.user, stats)
+            if upload.archived_at:
+                record_archive(upload.user, stats)
+    return uploads.count()
+
+
+def hot_equipment_count():
+    """Rows in the Equipment table, from the aggregates rather than a table scan"""
+    totals = FleetAggregate.objects.aggregate(
+        equipment=Sum('equipment_count'), archived=Sum('archived_equipment_count')
+    )
+    return (totals['equipment'] or 0) - (totals['archived'] or 0)
+
+
+def _totals_row(row):
+    """Strip the total_ prefix from summed columns and add averages"""
+    for field in COUNT_FIELDS + SUM_FIELDS:
+        row[field] = row.pop(f'total_{field}') or 0
+    count = row['equipment_count']
+    for name in NUMERIC_COLUMNS:
+        total = row.pop(f'{name}_sum')
+        row[f'avg_{name}'] = round(total / count, 2) if count else None
+    return row
+
+
+def fleet_summary():
+    """
+    Fleet-wide totals, per user and per equipment type
+
+    Returns:
+        Dictionary with 'totals', 'by_user' and 'by_type'
+    """
+    # Annotations may not reuse the model's field names
+    sums = {f'total_{field}': Sum(field) for field in COUNT_FIELDS + SUM_FIELDS}
+    aggregates = FleetAggregate.objects.order_by()
+
+    totals = _totals_row(aggregates.aggregate(
+        **sums, users=Count('user', distinct=True), types=Count('equipment_type', distinct=True)
+    ))
+    by_user = [
+        _totals_row(row) for row in
+        aggregates.values('user_id', username=F('user__username'))
+        .annotate(**sums, types=Count('id'))
+        .order_by('-total_equipment_count')
+    ]
+    by_type = [
+        _totals_row(row) for row in
+        aggregates.values('equipment_type')
+        .annotate(**sums, uploads=Sum('upload_count'), users=Count('user'))
+        .order_by('-total_equipment_count')
+    ]
+
+    return {'totals': totals, 'by_user': by_user, 'by_type': by_type}
@@ -0,0 +1,211 @@
+"""
+Idempotency-Key support for the ingest endpoints
+
+A client that retries an upload after a timeout sends the same
+``Idempotency-Key`` header with every attempt. The first request with a key
+claims it and runs; its response is stored against (user, key) together
+with a SHA-256 fingerprint of the request (path, query params, form fields
+and uploaded file contents). A repeat of a completed key gets the stored
+response back (marked with an ``Idempotent-Replayed: true`` header) without
+ingesting anything. A key sent again with a different request is
+refused with 422.
+
+A repeat of a key that is still in flight is answered 409 with Retry-After
+at once. The request holding the key renews a lease on it every third of
+IDEMPOTENCY_LEASE_SECONDS; if its worker dies the lease runs out and the
+next retry takes the key over and runs.
+
+Only successes and client errors are stored. Responses that say nothing was
+ingested (429 busy, 413 too large, 5xx) release the key so a retry runs
+again. Keys expire after IDEMPOTENCY_KEY_TTL_HOURS.
+"""
+import hashlib
+import json
+import threading
+import uuid
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import DatabaseError, connection
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .admission import check_content_length
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Responses that released no work and must not be replayed
+RELEASED_STATUSES = (status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _lease_expiry():
+    return timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+
+
+def purge_expired_keys(user):
+    """Delete a user's keys older than IDEMPOTENCY_KEY_TTL_HOURS"""
+    cutoff = timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    IdempotencyKey.objects.filter(user=user, created_at__lt=cutoff).delete()
+
+
+def request_fingerprint(request):
+    """
+    SHA-256 of what a request asks for
+
+    Covers the path, the query params and the body's fields; uploaded
+    files are hashed by content, a chunk at a time.
+    """
+    digest = hashlib.sha256()
+
+    def add(*parts):
+        for part in parts:
+            digest.update(part.encode('utf-8') if isinstance(part, str) else part)
+            digest.update(b'\0')
+
+    add(request.method, request.path)
+    for name, values in sorted(request.query_params.lists()):
+        add('query', name, *values)
+
+    data = request.data
+    if hasattr(data, 'lists'):
+        for name, values in sorted(data.lists()):
+            add('field', name)
+            for value in values:
+                if isinstance(value, UploadedFile):
+                    for chunk in value.chunks():
+                        digest.update(chunk)
+                    value.seek(0)
+                    add('file', value.name or '')
+                else:
+                    add(str(value))
+    else:
+        add('json', json.dumps(data, sort_keys=True, default=str))
+
+    return digest.hexdigest()
+
+
+class LeaseHeartbeat:
+    """Renew the lease of a claimed key from a background thread until stopped"""
+
+    def __init__(self, record):
+        self.record = record
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        interval = settings.IDEMPOTENCY_LEASE_SECONDS / 3
+        try:
+            while not self._stopped.wait(interval):
+                try:
+                    IdempotencyKey.objects.filter(pk=self.record.pk, claim=self.record.claim).update(
+                        lease_expires_at=_lease_expiry()
+                    )
+                except DatabaseError:
+                    pass  # e.g. SQLite busy with the ingest; the next beat tries again
+        finally:
+            connection.close()
+
+
+def _claim(user, key, fingerprint):
+    """
+    Claim a key for this request
+
+    Returns:
+        Tuple of (IdempotencyKey claimed by this request or None,
+        response to send instead or None)
+    """
+    record, created = IdempotencyKey.objects.get_or_create(
+        user=user, key=key,
+        defaults={'request_hash': fingerprint, 'lease_expires_at': _lease_expiry()}
+    )
+    if created:
+        return record, None
+
+    # Keys stored before fingerprints were kept have no hash to compare
+    if record.request_hash and record.request_hash != fingerprint:
+        return None, Response(
+            {'error': f'This {IDEMPOTENCY_HEADER} was already used with a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record.status == IdempotencyKey.STATUS_COMPLETE:
+        return None, _replay(record)
+
+    if record.lease_expires_at is None or record.lease_expires_at <= timezone.now():
+        # The request holding the key stopped renewing it; take it over
+        claim = uuid.uuid4()
+        taken = IdempotencyKey.objects.filter(pk=record.pk, claim=record.claim).update(
+            claim=claim, request_hash=fingerprint, lease_expires_at=_lease_expiry()
+        )
+        if taken:
+            record.claim = claim
+            return record, None
+
+    response = Response(
+        {'error': f'A request with this {IDEMPOTENCY_HEADER} is still in progress'},
+        status=status.HTTP_409_CONFLICT
+    )
+    response['Retry-After'] = str(settings.IDEMPOTENCY_RETRY_AFTER_SECONDS)
+    return None, response
+
+
+def idempotent(view):
+    """
+    Make a DRF view function honor the Idempotency-Key request header
+
+    Apply below @api_view so request.user is authenticated.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # The fingerprint reads the body, so refuse oversized ones first
+        check_content_length(request)
+        purge_expired_keys(request.user)
+        record, response = _claim(request.user, key, request_fingerprint(request))
+        if response is not None:
+            return response
+
+        # Writes below only apply while this request still holds the claim
+        claimed = IdempotencyKey.objects.filter(pk=record.pk, claim=record.claim)
+        try:
+            with LeaseHeartbeat(record):
+                response = view(request, *args, **kwargs)
+        except BaseException:
+            claimed.delete()
+            raise
+
+        if response.status_code >= 500 or response.status_code in RELEASED_STATUSES:
+            claimed.delete()
+        else:
+            claimed.update(
+                status=IdempotencyKey.STATUS_COMPLETE,
+                response_status=response.status_code,
+                response_body=response.data
+            )
+        return response
+    return wrapper
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.fleet import rebuild_fleet_aggregates
+from api.result_cache import invalidate_results
+
+
+class Command(BaseCommand):
+    help = 'Recompute the fleet-wide aggregates from all stored uploads'
+
+    def handle(self, *args, **options):
+        count = rebuild_fleet_aggregates()
+        invalidate_results()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt fleet aggregates from {count} uploads'))
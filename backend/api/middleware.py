@@ -0,0 +1,128 @@
+"""
+Middleware for the ChemLizer API
+"""
+import gzip
+import re
+import zlib
+
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import zstandard
+except ImportError:  # zstd responses are only offered when the package is installed
+    zstandard = None
+
+# Only text-like payloads are worth compressing (PDFs and images already are)
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+# Event streams must reach the client as soon as each event is written
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+MIN_COMPRESS_LENGTH = 200
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+_coding_re = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def choose_encoding(accept_encoding):
+    """
+    Pick the best supported content coding from an Accept-Encoding header
+
+    Args:
+        accept_encoding: Raw Accept-Encoding header value
+
+    Returns:
+        'zstd', 'gzip' or None
+    """
+    supported = ['zstd', 'gzip'] if zstandard is not None else ['gzip']
+    weights = {}
+
+    for part in accept_encoding.split(','):
+        match = _coding_re.match(part)
+        if not match:
+            continue
+        coding, q = match.group(1).lower(), match.group(2)
+        try:
+            weights[coding] = float(q) if q is not None else 1.0
+        except ValueError:
+            continue
+
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = weights.get(coding, weights.get('*', 0.0))
+        # Ties keep the earlier (preferred) coding
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _compressor(coding):
+    """A compressobj for the coding, and the flush mode that ends a chunk but not the stream"""
+    if coding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj(), zstandard.COMPRESSOBJ_FLUSH_BLOCK
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS), zlib.Z_SYNC_FLUSH
+
+
+def _compress_stream(coding, chunks):
+    """Compress an iterable of byte chunks incrementally"""
+    compressor, flush_mode = _compressor(coding)
+    for chunk in chunks:
+        # Flushed per chunk, or the client gets nothing until the compressor's buffer fills
+        if chunk:
+            yield compressor.compress(chunk) + compressor.flush(flush_mode)
+    yield compressor.flush()
+
+
+async def _acompress_stream(coding, chunks):
+    """Compress an async iterable of byte chunks incrementally"""
+    compressor, flush_mode = _compressor(coding)
+    async for chunk in chunks:
+        if chunk:
+            yield compressor.compress(chunk) + compressor.flush(flush_mode)
+    yield compressor.flush()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress JSON and text responses with zstd or gzip according to
+    the request's Accept-Encoding header (works under WSGI and ASGI)
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or content_type.startswith(UNCOMPRESSED_TYPES):
+            return response
+        if not response.streaming and len(response.content) < MIN_COMPRESS_LENGTH:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        coding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            if getattr(response, 'is_async', False):
+                response.streaming_content = _acompress_stream(coding, response.streaming_content)
+            else:
+                response.streaming_content = _compress_stream(coding, response.streaming_content)
+            del response['Content-Length']
+        else:
+            if coding == 'zstd':
+                compressed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(response.content)
+            else:
+                compressed = gzip.compress(response.content, compresslevel=GZIP_LEVEL, mtime=0)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(response.content))
+
+        # A compressed body is no longer byte-identical, so weaken any strong ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+
+        return response
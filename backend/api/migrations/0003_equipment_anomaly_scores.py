@@ -0,0 +1,42 @@
+# Generated by Django 4.2.9 on 2026-10-19 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipment',
+            name='anomaly_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='flowrate_z',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='is_anomaly',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='pressure_z',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='temperature_z',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['upload_session', '-anomaly_score'], name='equipment_anomaly_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-19 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_equipment_anomaly_scores'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['upload_session', 'equipment_name', 'id'], name='equipment_page_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-19 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_equipment_page_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadhistory',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
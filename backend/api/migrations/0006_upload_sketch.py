@@ -0,0 +1,21 @@
+# Generated by Django 4.2.9 on 2026-10-19 05:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_upload_archived_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSketch',
+            fields=[
+                ('upload', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='quantile_sketch', serialize=False, to='api.uploadhistory')),
+                ('sketches', models.JSONField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.9 on 2026-10-19 05:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0006_upload_sketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FleetAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipment_type', models.CharField(max_length=100)),
+                ('upload_count', models.IntegerField(default=0)),
+                ('equipment_count', models.BigIntegerField(default=0)),
+                ('archived_equipment_count', models.BigIntegerField(default=0)),
+                ('anomaly_count', models.BigIntegerField(default=0)),
+                ('flowrate_sum', models.FloatField(default=0)),
+                ('pressure_sum', models.FloatField(default=0)),
+                ('temperature_sum', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fleet_aggregates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'equipment_type'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='fleetaggregate',
+            constraint=models.UniqueConstraint(fields=('user', 'equipment_type'), name='fleet_aggregate_user_type'),
+        ),
+    ]
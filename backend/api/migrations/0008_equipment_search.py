@@ -0,0 +1,84 @@
+# Generated by Django 4.2.9 on 2026-10-19 05:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Trigram full-text index over the entries, kept in sync by triggers (SQLite only;
+# other databases fall back to LIKE queries in api.search)
+CREATE_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE api_equipment_search USING fts5(
+        equipment_name, equipment_type,
+        content='api_equipmentsearchentry', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER api_equipment_search_insert AFTER INSERT ON api_equipmentsearchentry BEGIN
+        INSERT INTO api_equipment_search(rowid, equipment_name, equipment_type)
+        VALUES (new.id, new.equipment_name, new.equipment_type);
+    END
+    """,
+    """
+    CREATE TRIGGER api_equipment_search_delete AFTER DELETE ON api_equipmentsearchentry BEGIN
+        INSERT INTO api_equipment_search(api_equipment_search, rowid, equipment_name, equipment_type)
+        VALUES ('delete', old.id, old.equipment_name, old.equipment_type);
+    END
+    """,
+    """
+    CREATE TRIGGER api_equipment_search_update AFTER UPDATE ON api_equipmentsearchentry BEGIN
+        INSERT INTO api_equipment_search(api_equipment_search, rowid, equipment_name, equipment_type)
+        VALUES ('delete', old.id, old.equipment_name, old.equipment_type);
+        INSERT INTO api_equipment_search(rowid, equipment_name, equipment_type)
+        VALUES (new.id, new.equipment_name, new.equipment_type);
+    END
+    """,
+]
+
+DROP_FTS_SQL = [
+    'DROP TRIGGER IF EXISTS api_equipment_search_update',
+    'DROP TRIGGER IF EXISTS api_equipment_search_delete',
+    'DROP TRIGGER IF EXISTS api_equipment_search_insert',
+    'DROP TABLE IF EXISTS api_equipment_search',
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in CREATE_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0007_fleet_aggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentSearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipment_name', models.CharField(max_length=255)),
+                ('equipment_type', models.CharField(max_length=100)),
+                ('flowrate', models.FloatField()),
+                ('pressure', models.FloatField()),
+                ('temperature', models.FloatField()),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='api.uploadhistory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Equipment search entries',
+                'indexes': [models.Index(fields=['user', 'equipment_name'], name='search_entry_user_name_idx')],
+            },
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
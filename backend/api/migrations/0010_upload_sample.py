@@ -0,0 +1,24 @@
+# Generated by Django 4.2.9 on 2026-10-19 05:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSample',
+            fields=[
+                ('upload', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sample', serialize=False, to='api.uploadhistory')),
+                ('rows', models.JSONField()),
+                ('sample_size', models.PositiveIntegerField()),
+                ('per_type_size', models.PositiveIntegerField()),
+                ('type_counts', models.JSONField()),
+            ],
+        ),
+    ]
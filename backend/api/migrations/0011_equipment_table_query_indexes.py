@@ -0,0 +1,33 @@
+# Generated by Django 4.2.9 on 2026-10-19 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_upload_sample'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['upload_session', 'equipment_type', 'id'], name='equipment_type_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['upload_session', 'flowrate', 'id'], name='equipment_flowrate_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['upload_session', 'pressure', 'id'], name='equipment_pressure_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['upload_session', 'temperature', 'id'], name='equipment_temp_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['upload_session', 'is_anomaly', 'equipment_name', 'id'], name='equipment_flag_page_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.9 on 2026-10-19 06:13
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_equipment_table_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='claim',
+            field=models.UUIDField(default=uuid.uuid4),
+        ),
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='request_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
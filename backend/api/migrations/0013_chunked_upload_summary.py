@@ -0,0 +1,19 @@
+# Generated by Django 4.2.9 on 2026-10-19 06:14
+
+from django.db import migrations, models
+import rest_framework.utils.encoders
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_idempotency_key_fingerprint_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunkedupload',
+            name='summary',
+            field=models.JSONField(blank=True, encoder=rest_framework.utils.encoders.JSONEncoder, null=True),
+        ),
+    ]
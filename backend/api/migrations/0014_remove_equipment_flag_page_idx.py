@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-19 06:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_chunked_upload_summary'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='equipment_flag_page_idx',
+        ),
+    ]
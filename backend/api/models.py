@@ -1,4 +1,7 @@
+import uuid
+
 from django.db import models
+from rest_framework.utils.encoders import JSONEncoder
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -15,6 +18,9 @@ class UploadHistory(models.Model):
     avg_pressure = models.FloatField(null=True, blank=True)
     avg_temperature = models.FloatField(null=True, blank=True)
     
+    # Set once the equipment rows have been moved to the archive tier
+    archived_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         ordering = ['-uploaded_at']
         verbose_name_plural = 'Upload Histories'
@@ -23,6 +29,31 @@ class UploadHistory(models.Model):
         return f"{self.filename} - {self.uploaded_at.strftime('%Y-%m-%d %H:%M')}"
 
 
+class UploadSketch(models.Model):
+    """Quantile sketches of an upload's parameters (see api.sketches)"""
+    upload = models.OneToOneField(UploadHistory, on_delete=models.CASCADE, primary_key=True,
+                                  related_name='quantile_sketch')
+    sketches = models.JSONField()
+    
+    def __str__(self):
+        return f"Sketches of {self.upload}"
+
+
+class UploadSample(models.Model):
+    """Random rows of an upload taken at ingest, for previews (see api.sampling)"""
+    upload = models.OneToOneField(UploadHistory, on_delete=models.CASCADE, primary_key=True,
+                                  related_name='sample')
+    # Rows in sampling order: the first sample_size are a uniform sample, and the
+    # first per_type_size of each type a uniform sample of that type
+    rows = models.JSONField()
+    sample_size = models.PositiveIntegerField()
+    per_type_size = models.PositiveIntegerField()
+    type_counts = models.JSONField()
+    
+    def __str__(self):
+        return f"Sample of {self.upload}"
+
+
 class Equipment(models.Model):
     """Model to store chemical equipment data"""
     upload_session = models.ForeignKey(UploadHistory, on_delete=models.CASCADE, related_name='equipment')
@@ -32,9 +63,130 @@ class Equipment(models.Model):
     pressure = models.FloatField()
     temperature = models.FloatField()
     
+    # Robust (median/MAD) z-scores within the equipment type, computed at ingest
+    flowrate_z = models.FloatField(default=0)
+    pressure_z = models.FloatField(default=0)
+    temperature_z = models.FloatField(default=0)
+    anomaly_score = models.FloatField(default=0)
+    is_anomaly = models.BooleanField(default=False)
+    
     class Meta:
         ordering = ['equipment_name']
         verbose_name_plural = 'Equipment'
+        indexes = [
+            models.Index(fields=['upload_session', '-anomaly_score'], name='equipment_anomaly_idx'),
+            models.Index(fields=['upload_session', 'equipment_name', 'id'], name='equipment_page_idx'),
+            # Pages of /api/data/ ordered by the other columns
+            models.Index(fields=['upload_session', 'equipment_type', 'id'], name='equipment_type_page_idx'),
+            models.Index(fields=['upload_session', 'flowrate', 'id'], name='equipment_flowrate_page_idx'),
+            models.Index(fields=['upload_session', 'pressure', 'id'], name='equipment_pressure_page_idx'),
+            models.Index(fields=['upload_session', 'temperature', 'id'], name='equipment_temp_page_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.equipment_name} ({self.equipment_type})"
+
+
+class EquipmentSearchEntry(models.Model):
+    """Searchable equipment name, type and readings of one retained upload (see api.search)"""
+    upload = models.ForeignKey(UploadHistory, on_delete=models.CASCADE, related_name='search_entries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    equipment_name = models.CharField(max_length=255)
+    equipment_type = models.CharField(max_length=100)
+    flowrate = models.FloatField()
+    pressure = models.FloatField()
+    temperature = models.FloatField()
+    
+    class Meta:
+        verbose_name_plural = 'Equipment search entries'
+        indexes = [
+            models.Index(fields=['user', 'equipment_name'], name='search_entry_user_name_idx'),
+        ]
     
     def __str__(self):
         return f"{self.equipment_name} ({self.equipment_type})"
+
+
+class FleetAggregate(models.Model):
+    """Running totals of a user's retained equipment of one type (see api.fleet)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='fleet_aggregates')
+    equipment_type = models.CharField(max_length=100)
+    upload_count = models.IntegerField(default=0)
+    equipment_count = models.BigIntegerField(default=0)
+    # Part of equipment_count held in the archive tier rather than the Equipment table
+    archived_equipment_count = models.BigIntegerField(default=0)
+    anomaly_count = models.BigIntegerField(default=0)
+    flowrate_sum = models.FloatField(default=0)
+    pressure_sum = models.FloatField(default=0)
+    temperature_sum = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['user', 'equipment_type']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'equipment_type'], name='fleet_aggregate_user_type'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} / {self.equipment_type}"
+
+
+class IdempotencyKey(models.Model):
+    """Stored result of an ingest request sent with an Idempotency-Key header (see api.idempotency)"""
+    STATUS_IN_PROGRESS = 'in_progress'
+    STATUS_COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (STATUS_IN_PROGRESS, 'In progress'),
+        (STATUS_COMPLETE, 'Complete'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    # SHA-256 of the request's path, query params, fields and files
+    request_hash = models.CharField(max_length=64, blank=True, default='')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_IN_PROGRESS)
+    # Identifies the request holding an in-progress key; a takeover replaces it
+    claim = models.UUIDField(default=uuid.uuid4)
+    # Renewed while the request runs; an in-progress key past it can be taken over
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    response_status = models.IntegerField(null=True, blank=True)
+    # DRF's encoder, since ingest summaries may hold numpy scalars
+    response_body = models.JSONField(null=True, blank=True, encoder=JSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_key_user_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.key} ({self.status})"
+
+
+class ChunkedUpload(models.Model):
+    """Model to track a resumable, chunk-by-chunk CSV upload"""
+    STATUS_ACTIVE = 'active'
+    STATUS_COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, 'Active'),
+        (STATUS_COMPLETE, 'Complete'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    offset = models.BigIntegerField(default=0)
+    next_chunk = models.IntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    created_at = models.DateTimeField(default=timezone.now)
+    upload_history = models.ForeignKey(UploadHistory, on_delete=models.SET_NULL, null=True, blank=True)
+    # Ingest summary returned on completion, replayed if completion is repeated
+    summary = models.JSONField(null=True, blank=True, encoder=JSONEncoder)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.total_size} bytes)"
@@ -0,0 +1,154 @@
+"""
+Process pool for PDF report rendering
+
+ReportLab layout is pure Python, so a report rendered in a request thread
+holds the GIL and stalls every other request of that worker. Reports are
+rendered in a pool of settings.REPORT_RENDER_WORKERS processes instead;
+the request thread only waits for the PDF bytes. Independent reports
+render concurrently, one per pool process.
+
+The pool uses the 'spawn' start method: a child never inherits the
+parent's open database connections, and sets Django up on its own.
+With REPORT_RENDER_WORKERS = 0 reports render in the calling thread.
+
+Reports are written to a file per upload under settings.REPORT_STORAGE_DIR,
+so only a path travels back from the pool and into the result cache.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .archive import load_archived_upload
+from .models import Equipment, UploadHistory
+from .report_worker import init_render_worker
+
+REPORT_FIELDS = ['equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+REPORT_BATCH_SIZE = 2000
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ReportRenderingFailed(Exception):
+    """Rendering raised, timed out or lost its pool process"""
+
+
+def get_report_pool():
+    """Return the process-wide render pool, starting it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.REPORT_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_render_worker,
+                initargs=(os.getpid(),)
+            )
+        return _pool
+
+
+def _reset_pool(pool):
+    """Drop a broken pool so the next report starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def report_rows(upload):
+    """Yield an upload's report rows in name order, a batch at a time"""
+    if upload.archived_at:
+        # Archives are stored in (equipment_name, id) order
+        archived = load_archived_upload(upload)
+        for start in range(0, upload.num_records, REPORT_BATCH_SIZE):
+            yield from archived.rows(REPORT_FIELDS, slice(start, start + REPORT_BATCH_SIZE))
+        return
+
+    yield from (
+        Equipment.objects.filter(upload_session=upload)
+        .order_by('equipment_name', 'id')
+        .values_list(*REPORT_FIELDS)
+        .iterator(chunk_size=REPORT_BATCH_SIZE)
+    )
+
+
+def report_path(upload_id):
+    """Path of the rendered report of an upload"""
+    return os.path.join(settings.REPORT_STORAGE_DIR, f'{upload_id}.pdf')
+
+
+def delete_upload_report(upload_id):
+    """Remove the rendered report of an upload, if any"""
+    try:
+        os.remove(report_path(upload_id))
+    except FileNotFoundError:
+        pass
+
+
+def render_report_file(upload_id):
+    """
+    Render the report of an upload to its file (runs in the pool processes)
+
+    The PDF is written straight to a temporary file, which is renamed
+    into place when complete.
+
+    Returns:
+        Path of the report
+    """
+    from .reports import render_report
+
+    upload = UploadHistory.objects.get(id=upload_id)
+    path = report_path(upload_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            render_report(upload, report_rows(upload), f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def render_upload_report(upload_id):
+    """
+    Render the report of an upload in the pool and wait for it
+
+    Returns:
+        Path of the report file
+
+    Raises:
+        ReportRenderingFailed: If rendering raises, exceeds
+            REPORT_RENDER_TIMEOUT or a pool process dies
+    """
+    if not settings.REPORT_RENDER_WORKERS:
+        try:
+            return render_report_file(upload_id)
+        except Exception as e:
+            logger.warning('Could not render the report of upload %s', upload_id, exc_info=True)
+            raise ReportRenderingFailed(f'Report rendering failed: {e}')
+
+    pool = get_report_pool()
+    try:
+        future = pool.submit(render_report_file, upload_id)
+        return future.result(timeout=settings.REPORT_RENDER_TIMEOUT)
+    except TimeoutError:
+        # The process keeps rendering, but nobody is waiting for it
+        future.cancel()
+        raise ReportRenderingFailed(f'Report rendering took longer than {settings.REPORT_RENDER_TIMEOUT}s')
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        raise ReportRenderingFailed('Report rendering process exited unexpectedly')
+    except Exception as e:
+        logger.warning('Could not render the report of upload %s', upload_id, exc_info=True)
+        raise ReportRenderingFailed(f'Report rendering failed: {e}')
@@ -0,0 +1,27 @@
+"""
+Start-up of the report pool's processes (see api.report_pool)
+
+Imports nothing from the app: a pool process runs this before Django is
+set up, and importing models any earlier fails.
+"""
+import os
+import threading
+import time
+
+
+def init_render_worker(parent_pid):
+    """
+    Set Django up, then exit the process once its parent is gone
+
+    A server that exits without shutting the pool down would otherwise
+    leave its processes behind.
+    """
+    import django
+    django.setup()
+
+    def watch_parent():
+        while os.getppid() == parent_pid:
+            time.sleep(1)
+        os._exit(0)
+
+    threading.Thread(target=watch_parent, daemon=True).start()
@@ -0,0 +1,184 @@
+"""
+PDF report rendering for the ChemLizer API
+
+Kept out of api.views so that ReportLab is only imported by workers that
+actually render a report (see api.report_pool).
+
+The equipment table is laid out one page at a time with the documented
+Frame / Canvas API: each page gets the header row, then Tables of rows
+pulled from an iterator in batches. A batch that does not fit what is
+left of the page is split at its actual (wrapped) row heights with
+Frame.split(), and the rows that did not fit start the next page. Memory
+stays at about a page of rows, and the PDF is written straight to the
+output file.
+"""
+import itertools
+from xml.sax.saxutils import escape
+
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Frame, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus.doctemplate import LayoutError
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+PAGE_SIZE = letter
+# Page margins, as SimpleDocTemplate's defaults
+MARGIN = inch
+# Frame padding, on every side
+FRAME_PADDING = 6
+TABLE_HEADER = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+# Share of the page width per column, so every page's table lines up
+COLUMN_SHARES = [0.3, 0.22, 0.16, 0.16, 0.16]
+# Rows per Table; a batch is split where the page ends
+TABLE_BATCH_ROWS = 50
+HEADER_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#0A4D68')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+ROW_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('BACKGROUND', (0, 0), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+# Names and types too wide for their column, or with line breaks, wrap in a
+# Paragraph in the table's own font; the rest stay plain strings, which lay
+# out several times faster
+CELL_STYLE = ParagraphStyle('EquipmentCell', fontName='Helvetica', fontSize=10, leading=12, alignment=TA_CENTER)
+# Table cells' left plus right padding
+CELL_PADDING = 12
+
+
+def column_widths(width):
+    return [share * width for share in COLUMN_SHARES]
+
+
+def header_table(width):
+    """The equipment table's header row"""
+    table = Table([TABLE_HEADER], colWidths=column_widths(width))
+    table.setStyle(HEADER_STYLE)
+    return table
+
+
+def rows_table(rows, width):
+    """Table of formatted equipment rows"""
+    table = Table(rows, colWidths=column_widths(width))
+    table.setStyle(ROW_STYLE)
+    return table
+
+
+def text_cell(text, width):
+    """A name or type cell of a column `width` points wide"""
+    text = str(text)
+    if '\n' not in text and stringWidth(text, CELL_STYLE.fontName, CELL_STYLE.fontSize) <= width - CELL_PADDING:
+        return text
+    return Paragraph(escape(text).replace('\n', '<br/>'), CELL_STYLE)
+
+
+def format_row(row, widths):
+    name, equipment_type, flowrate, pressure, temperature = row
+    return [
+        text_cell(name, widths[0]), text_cell(equipment_type, widths[1]),
+        f"{flowrate:.2f}", f"{pressure:.2f}", f"{temperature:.2f}"
+    ]
+
+
+def page_frame():
+    """A fresh Frame filling the page inside the margins"""
+    width, height = PAGE_SIZE
+    return Frame(MARGIN, MARGIN, width - 2 * MARGIN, height - 2 * MARGIN)
+
+
+def render_report(upload, rows, output):
+    """
+    Render the equipment report of an upload
+    
+    Args:
+        upload: UploadHistory instance
+        rows: Iterable of its (name, type, flowrate, pressure, temperature)
+            rows, consumed a batch at a time
+        output: Path or binary file to write the PDF to
+
+    Raises:
+        LayoutError: If a single row is taller than a page, or the table
+            does not hold every row of the upload
+    """
+    canvas = Canvas(output, pagesize=PAGE_SIZE)
+    frame = page_frame()
+    elements = []
+    
+    # Styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#0A4D68'),
+        spaceAfter=30,
+    )
+    
+    # Title
+    title = Paragraph("ChemLizer Equipment Report", title_style)
+    elements.append(title)
+    elements.append(Spacer(1, 0.2*inch))
+    
+    # Summary
+    summary_text = f"""
+    <b>Upload Date:</b> {upload.uploaded_at.strftime('%Y-%m-%d %H:%M')}<br/>
+    <b>File:</b> {escape(upload.filename)}<br/>
+    <b>Total Records:</b> {upload.num_records}<br/>
+    <b>Average Flowrate:</b> {upload.avg_flowrate:.2f}<br/>
+    <b>Average Pressure:</b> {upload.avg_pressure:.2f}<br/>
+    <b>Average Temperature:</b> {upload.avg_temperature:.2f}
+    """
+    summary_para = Paragraph(summary_text, styles['BodyText'])
+    elements.append(summary_para)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Frame.add() reports a flowable that does not fit instead of dropping it
+    for element in elements:
+        if not frame.add(element, canvas):
+            raise LayoutError('Report summary does not fit the first page')
+    
+    # Equipment table: the header, then batches of rows until the page is full
+    width = PAGE_SIZE[0] - 2 * (MARGIN + FRAME_PADDING)
+    widths = column_widths(width)
+    rows = iter(rows)
+    pulled = 0
+    pending = None
+    fresh_page = False
+    if not frame.add(header_table(width), canvas):
+        raise LayoutError('Equipment table header does not fit the first page')
+    while True:
+        if pending is None:
+            batch = [format_row(row, widths) for row in itertools.islice(rows, TABLE_BATCH_ROWS)]
+            if not batch:
+                break
+            pulled += len(batch)
+            pending = rows_table(batch, width)
+        if frame.add(pending, canvas):
+            pending, fresh_page = None, False
+            continue
+        # Draw the rows that fit, at their wrapped heights, and carry the rest to the next page
+        parts = frame.split(pending, canvas)
+        if parts:
+            if not frame.add(parts[0], canvas):
+                raise LayoutError('Split equipment rows do not fit their page')
+            pending = parts[1] if len(parts) > 1 else None
+        elif fresh_page:
+            raise LayoutError('An equipment row is taller than a page')
+        canvas.showPage()
+        frame = page_frame()
+        frame.add(header_table(width), canvas)
+        fresh_page = True
+    if pulled != upload.num_records:
+        raise LayoutError(f'Report has {pulled} of the upload\'s {upload.num_records} rows')
+    canvas.save()
@@ -0,0 +1,196 @@
+"""
+Shared cache of derived results
+
+Upload summaries (with their type distribution and percentiles), PDF
+reports and the fleet totals are computed once and kept in the Django
+cache named by settings.RESULT_CACHE_ALIAS. With a filesystem or Redis
+backend the results are shared by every worker process; the default
+locmem backend keeps them per process.
+
+Keys are built from the computation's name, its version in
+RESULT_VERSIONS and the upload id, e.g. ``summary:v1:42``. Bumping a
+version retires all of its entries at once. ingest_csv() and
+cleanup_old_uploads() call invalidate_results() for the uploads they
+create, archive or delete.
+
+Concurrent misses of one key compute it once: threads of a worker queue
+on an in-process lock, and workers claim the key with cache.add() while
+the others poll for the result. A claim expires after
+RESULT_CACHE_LOCK_TIMEOUT seconds, after which waiters compute the result
+themselves.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+# Bump a version whenever its computation's output changes
+RESULT_VERSIONS = {
+    'summary': 1,
+    'report': 1,
+    'fleet': 1,
+}
+# Results that do not belong to one upload
+GLOBAL_RESULTS = ('fleet',)
+# How often a worker waiting for another worker's computation checks for the result
+POLL_INTERVAL = 0.05
+MISSING = object()
+
+
+def get_result_store():
+    return caches[settings.RESULT_CACHE_ALIAS]
+
+
+def result_key(name, upload_id=None):
+    """Cache key of a computation's result, for one upload or global"""
+    key = f'{name}:v{RESULT_VERSIONS[name]}'
+    return key if upload_id is None else f'{key}:{upload_id}'
+
+
+class ResultCache:
+    """
+    Get-or-compute over the result store, with stampede protection
+
+    Counters are kept per process and per computation name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'coalesced': 0, 'lock_timeouts': 0})
+        self._invalidations = 0
+
+    def _count(self, name, counter):
+        with self._lock:
+            self._stats[name][counter] += 1
+
+    @contextmanager
+    def _key_lock(self, key):
+        # One lock per key in flight; dropped once nobody holds or waits for it
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def get_or_compute(self, name, upload_id, compute, timeout=None):
+        """
+        Return a cached result, computing and storing it on a miss
+
+        Args:
+            name: Computation name (a key of RESULT_VERSIONS)
+            upload_id: Upload the result belongs to, None for global results
+            compute: Zero-argument callable producing the result (picklable)
+            timeout: Seconds to keep the result (default: the cache's TIMEOUT)
+        """
+        store = get_result_store()
+        key = result_key(name, upload_id)
+        value = store.get(key, MISSING)
+        if value is not MISSING:
+            self._count(name, 'hits')
+            return value
+
+        with self._key_lock(key):
+            value = store.get(key, MISSING)
+            if value is not MISSING:
+                # Another thread of this worker computed it while we waited
+                self._count(name, 'coalesced')
+                return value
+
+            claim_key = f'{key}:computing'
+            deadline = time.monotonic() + settings.RESULT_CACHE_LOCK_TIMEOUT
+            claimed = store.add(claim_key, True, settings.RESULT_CACHE_LOCK_TIMEOUT)
+            while not claimed:
+                time.sleep(POLL_INTERVAL)
+                value = store.get(key, MISSING)
+                if value is not MISSING:
+                    # Another worker computed it
+                    self._count(name, 'coalesced')
+                    return value
+                if time.monotonic() >= deadline:
+                    self._count(name, 'lock_timeouts')
+                    break
+                claimed = store.add(claim_key, True, settings.RESULT_CACHE_LOCK_TIMEOUT)
+
+            self._count(name, 'misses')
+            try:
+                value = compute()
+                if timeout is None:
+                    store.set(key, value)
+                else:
+                    store.set(key, value, timeout)
+            finally:
+                if claimed:
+                    store.delete(claim_key)
+            return value
+
+    async def aget_or_compute(self, name, upload_id, acompute, timeout=None):
+        """get_or_compute() for async views; `acompute` is a zero-argument coroutine function"""
+        value = await get_result_store().aget(result_key(name, upload_id), MISSING)
+        if value is not MISSING:
+            self._count(name, 'hits')
+            return value
+        # Waiting on the locks blocks, so misses go to a worker thread and compute back on the event loop
+        return await sync_to_async(self.get_or_compute, thread_sensitive=False)(
+            name, upload_id, async_to_sync(acompute), timeout
+        )
+
+    def invalidate(self, upload_ids=()):
+        """Drop the results of the given uploads, and the global results"""
+        keys = [result_key(name) for name in GLOBAL_RESULTS]
+        keys += [
+            result_key(name, upload_id)
+            for name in RESULT_VERSIONS if name not in GLOBAL_RESULTS
+            for upload_id in upload_ids
+        ]
+        get_result_store().delete_many(keys)
+        with self._lock:
+            self._invalidations += 1
+
+    def metrics(self):
+        """Snapshot of the counters, per computation and in total"""
+        with self._lock:
+            by_name = {name: dict(stats) for name, stats in self._stats.items()}
+            invalidations = self._invalidations
+        totals = {'hits': 0, 'misses': 0, 'coalesced': 0, 'lock_timeouts': 0}
+        for stats in by_name.values():
+            for counter, count in stats.items():
+                totals[counter] += count
+        lookups = sum(totals.values()) - totals['lock_timeouts']
+        store = get_result_store()
+        return {
+            'backend': type(store).__name__,
+            # Only the in-process backend knows its size
+            'size_bytes': store.size_bytes() if hasattr(store, 'size_bytes') else None,
+            **totals,
+            'hit_ratio': round((totals['hits'] + totals['coalesced']) / lookups, 4) if lookups else None,
+            'invalidations': invalidations,
+            'by_name': by_name,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_result_cache():
+    """Return the process-wide result cache"""
+    return ResultCache()
+
+
+def cached_result(name, upload_id, compute, timeout=None):
+    """Shortcut for get_result_cache().get_or_compute()"""
+    return get_result_cache().get_or_compute(name, upload_id, compute, timeout)
+
+
+def invalidate_results(upload_ids=()):
+    """Shortcut for get_result_cache().invalidate()"""
+    get_result_cache().invalidate(upload_ids)
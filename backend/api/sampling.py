@@ -0,0 +1,201 @@
+"""
+Preview samples of uploads
+
+Ingest gives every row a uniform random key and keeps the rows with the
+smallest keys: the UPLOAD_SAMPLE_SIZE smallest overall and the
+UPLOAD_SAMPLE_PER_TYPE smallest of each equipment type. This is the
+vectorized form of reservoir sampling (a reservoir keeps the k smallest
+random priorities seen), done in one pass over the parsed columns. The
+rows are stored in key order in an UploadSample, so
+
+- the first N stored rows are a uniform sample of N rows for any N up to
+  the sample size, and
+- the first n stored rows of a type are a uniform sample of that type,
+  from which stratified samples are assembled.
+
+/api/data/?sample=N answers from the stored rows without touching the
+Equipment table. Uploads ingested before samples existed get theirs built
+on first use.
+"""
+import math
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+
+from .archive import load_archived_upload
+from .models import Equipment, UploadSample
+
+SAMPLE_FIELDS = ['id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+# Stored rows are matched to their Equipment ids this many names per query
+ID_LOOKUP_BATCH_SIZE = 500
+
+
+def sample_positions(type_codes, sample_size, per_type_size, rng=None):
+    """
+    Rows to keep in an upload's sample
+
+    Args:
+        type_codes: Integer equipment type code per row (-1 for missing)
+        sample_size: Rows of the uniform sample
+        per_type_size: Rows kept of every type
+        rng: numpy Generator (default: a fresh one)
+
+    Returns:
+        Row positions in sampling (random key) order
+    """
+    type_codes = np.asarray(type_codes)
+    rng = rng or np.random.default_rng()
+    order = np.argsort(rng.random(len(type_codes)))
+
+    # Rank of each row within its type, in key order
+    codes = type_codes[order]
+    by_type = np.argsort(codes, kind='stable')
+    starts = np.searchsorted(codes[by_type], codes[by_type])
+    rank = np.empty(len(codes), dtype=np.int64)
+    rank[by_type] = np.arange(len(codes)) - starts
+
+    keep = (np.arange(len(codes)) < sample_size) | ((rank < per_type_size) & (codes >= 0))
+    return order[keep]
+
+
+def _attach_ids(upload_history, rows):
+    """Fill in the Equipment ids of freshly saved sample rows, matched by name"""
+    names = [row['equipment_name'] for row in rows]
+    ids = {}
+    for start in range(0, len(names), ID_LOOKUP_BATCH_SIZE):
+        # Names are unique within an upload (duplicates fail validation)
+        ids.update(
+            Equipment.objects.filter(
+                upload_session=upload_history,
+                equipment_name__in=names[start:start + ID_LOOKUP_BATCH_SIZE]
+            ).values_list('equipment_name', 'id')
+        )
+    for row in rows:
+        row['id'] = ids.get(row['equipment_name'])
+    return rows
+
+
+def save_upload_sample(upload_history, df, type_codes, types):
+    """
+    Sample a freshly ingested upload and store the sample
+
+    Call after the Equipment rows are saved, so their ids can be recorded.
+
+    Args:
+        upload_history: UploadHistory instance
+        df: pandas DataFrame the upload was saved from
+        type_codes: Integer equipment type code per row
+        types: Equipment type name per code
+
+    Returns:
+        The stored UploadSample
+    """
+    positions = sample_positions(type_codes, settings.UPLOAD_SAMPLE_SIZE, settings.UPLOAD_SAMPLE_PER_TYPE)
+    picked = df.iloc[positions]
+    rows = [
+        {
+            'id': None,
+            'equipment_name': str(name),
+            'equipment_type': str(equipment_type),
+            'flowrate': flowrate,
+            'pressure': pressure,
+            'temperature': temperature,
+        }
+        for name, equipment_type, flowrate, pressure, temperature in zip(
+            picked['Equipment Name'].tolist(),
+            picked['Type'].tolist(),
+            picked['Flowrate'].astype(float).tolist(),
+            picked['Pressure'].astype(float).tolist(),
+            picked['Temperature'].astype(float).tolist()
+        )
+    ]
+    counts = np.bincount(np.asarray(type_codes)[np.asarray(type_codes) >= 0], minlength=len(types))
+    return _store(upload_history, _attach_ids(upload_history, rows),
+                  {str(t): int(counts[i]) for i, t in enumerate(types) if counts[i]})
+
+
+def _store(upload_history, rows, type_counts):
+    sample, _ = UploadSample.objects.update_or_create(upload=upload_history, defaults={
+        'rows': rows,
+        'sample_size': settings.UPLOAD_SAMPLE_SIZE,
+        'per_type_size': settings.UPLOAD_SAMPLE_PER_TYPE,
+        'type_counts': type_counts,
+    })
+    return sample
+
+
+def build_upload_sample(upload_history):
+    """Sample a stored upload, from its archive or the Equipment table"""
+    if upload_history.archived_at:
+        archived = load_archived_upload(upload_history)
+        type_codes, types = archived.type_codes, archived.types
+        positions = sample_positions(type_codes, settings.UPLOAD_SAMPLE_SIZE, settings.UPLOAD_SAMPLE_PER_TYPE)
+        records = archived.records(SAMPLE_FIELDS, positions)
+    else:
+        rows = list(Equipment.objects.filter(upload_session=upload_history).order_by('id').values(*SAMPLE_FIELDS))
+        types, type_codes = np.unique(np.asarray([row['equipment_type'] for row in rows], dtype=object),
+                                      return_inverse=True)
+        types = types.tolist()
+        positions = sample_positions(type_codes, settings.UPLOAD_SAMPLE_SIZE, settings.UPLOAD_SAMPLE_PER_TYPE)
+        records = [rows[i] for i in positions]
+
+    counts = np.bincount(np.asarray(type_codes, dtype=np.int64), minlength=len(types))
+    return _store(upload_history, records, {str(t): int(counts[i]) for i, t in enumerate(types) if counts[i]})
+
+
+def load_upload_sample(upload_history):
+    """The stored sample of an upload, building it if it is missing"""
+    sample = UploadSample.objects.filter(upload=upload_history).first()
+    return sample if sample is not None else build_upload_sample(upload_history)
+
+
+def stratified_quotas(type_counts, size, per_type_size):
+    """
+    Rows per type in a stratified sample
+
+    Types get rows in proportion to their share of the upload (largest
+    remainder), every type at least one while the size allows, and none
+    more than the stored per_type_size.
+
+    Returns:
+        {type: row count}
+    """
+    caps = {t: min(count, per_type_size) for t, count in type_counts.items()}
+    size = min(size, sum(caps.values()))
+    total = sum(type_counts.values())
+    share = {t: size * count / total for t, count in type_counts.items()}
+    quotas = {t: min(caps[t], math.floor(share[t])) for t in type_counts}
+
+    # Hand out the rest one row at a time: types without a row first, then by remainder
+    for _ in range(size - sum(quotas.values())):
+        t = max((t for t in quotas if quotas[t] < caps[t]), key=lambda t: (quotas[t] == 0, share[t] - quotas[t]))
+        quotas[t] += 1
+    return quotas
+
+
+def sample_records(sample, size, stratify=False):
+    """
+    Records of a stored sample
+
+    Args:
+        sample: UploadSample
+        size: Rows wanted (capped at what the sample holds)
+        stratify: Sample every equipment type in proportion, instead of uniformly
+
+    Returns:
+        List of records in (equipment_name, id) order, like /api/data/ pages
+    """
+    if stratify:
+        quotas = stratified_quotas(sample.type_counts, size, sample.per_type_size)
+        taken = Counter()
+        records = []
+        for row in sample.rows:
+            equipment_type = row['equipment_type']
+            if taken[equipment_type] < quotas.get(equipment_type, 0):
+                taken[equipment_type] += 1
+                records.append(row)
+    else:
+        records = sample.rows[:min(size, sample.sample_size)]
+
+    return sorted(records, key=lambda row: (row['equipment_name'], row['id'] or 0))
@@ -0,0 +1,227 @@
+"""
+Equipment name search across a user's retained uploads
+
+Ingest copies each upload's equipment names, types and readings into
+EquipmentSearchEntry. On SQLite an FTS5 table with the trigram tokenizer
+indexes the name and type columns (created in migration 0008 and kept in
+sync by triggers). Entries are deleted with their upload and survive
+archiving, so every retained upload is searchable.
+
+A query of three or more characters is matched as a substring through the
+index. Names starting with the query rank first as prefix matches. If that
+finds fewer hits than requested, the query's trigrams are OR-ed to collect
+near misses, which are kept when their trigram (Jaccard) similarity to the
+query is high enough. Shorter queries are prefix matches. Hits are grouped
+by (name, type) and report the latest upload containing the equipment and
+its readings there.
+"""
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .archive import load_archived_upload
+from .models import Equipment, EquipmentSearchEntry, UploadHistory
+
+FTS_TABLE = 'api_equipment_search'
+# Near misses ranked by the index and rescored by trigram similarity, per requested hit
+FUZZY_CANDIDATES_PER_HIT = 10
+FUZZY_MIN_SIMILARITY = 0.3
+MATCH_ORDER = {'prefix': 0, 'substring': 1, 'fuzzy': 2}
+
+
+def index_upload(upload_history):
+    """
+    Add an upload's saved Equipment rows to the search index
+
+    Args:
+        upload_history: UploadHistory instance whose equipment has been saved
+    """
+    entries = EquipmentSearchEntry._meta.db_table
+    equipment = Equipment._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {entries} '
+            f'(upload_id, user_id, equipment_name, equipment_type, flowrate, pressure, temperature) '
+            f'SELECT upload_session_id, %s, equipment_name, equipment_type, flowrate, pressure, temperature '
+            f'FROM {equipment} WHERE upload_session_id = %s',
+            [upload_history.user_id, upload_history.id]
+        )
+
+
+def index_rows(upload_history, rows, batch_size=5000):
+    """Add (name, type, flowrate, pressure, temperature) rows of an upload to the search index"""
+    entries = (
+        EquipmentSearchEntry(
+            upload=upload_history,
+            user_id=upload_history.user_id,
+            equipment_name=name,
+            equipment_type=equipment_type,
+            flowrate=flowrate,
+            pressure=pressure,
+            temperature=temperature
+        )
+        for name, equipment_type, flowrate, pressure, temperature in rows
+    )
+    EquipmentSearchEntry.objects.bulk_create(entries, batch_size=batch_size)
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def _trigrams(text):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _similarity(query_trigrams, text):
+    trigrams = _trigrams(text)
+    if not trigrams:
+        return 0.0
+    return len(query_trigrams & trigrams) / len(query_trigrams | trigrams)
+
+
+def _quote(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _match_keys(user, match, limit):
+    """Distinct (name, type) pairs of the user matching an FTS5 query, best first"""
+    entries = EquipmentSearchEntry._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT e.equipment_name, e.equipment_type FROM {FTS_TABLE} s JOIN {entries} e ON e.id = s.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND e.user_id = %s '
+            f'GROUP BY e.equipment_name, e.equipment_type ORDER BY MIN(s.rank) LIMIT %s',
+            [match, user.id, limit]
+        )
+        return cursor.fetchall()
+
+
+def matching_names_sql(upload_history, query):
+    """
+    Names of an upload's equipment whose name or type contains the query
+
+    Returns:
+        RawSQL subquery for an equipment_name__in lookup, or None when the
+        index cannot answer (query shorter than a trigram, or no FTS5)
+    """
+    if len(query) < 3 or not fts_available():
+        return None
+    entries = EquipmentSearchEntry._meta.db_table
+    # CROSS JOIN pins the join order: the match drives, rather than an FTS lookup per entry of the upload
+    return RawSQL(
+        f'SELECT e.equipment_name FROM {FTS_TABLE} s CROSS JOIN {entries} e ON e.id = s.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s AND e.upload_id = %s',
+        [_quote(query), upload_history.id]
+    )
+
+
+def _hits(user, keys, match):
+    """
+    One hit per (name, type), with the latest upload containing it and its readings there
+
+    Every entry of the keys is read (through the user/name index), so upload_ids is complete.
+    """
+    keys = set(keys)
+    entries = (
+        EquipmentSearchEntry.objects
+        .filter(user=user, equipment_name__in={name for name, _ in keys})
+        .select_related('upload')
+    )
+
+    hits = {}
+    for entry in sorted(entries, key=lambda e: (e.upload.uploaded_at, e.id), reverse=True):
+        key = (entry.equipment_name, entry.equipment_type)
+        if key not in keys:
+            continue
+        hit = hits.get(key)
+        if hit is None:
+            hits[key] = {
+                'equipment_name': entry.equipment_name,
+                'equipment_type': entry.equipment_type,
+                'match': match(entry),
+                'upload_id': entry.upload_id,
+                'uploaded_at': entry.upload.uploaded_at,
+                'flowrate': entry.flowrate,
+                'pressure': entry.pressure,
+                'temperature': entry.temperature,
+                'upload_ids': [entry.upload_id],
+            }
+        elif entry.upload_id not in hit['upload_ids']:
+            hit['upload_ids'].append(entry.upload_id)
+    return list(hits.values())
+
+
+def search_equipment(user, query, limit=20):
+    """
+    Search a user's retained uploads by equipment name or type
+
+    Args:
+        user: User instance
+        query: Search text
+        limit: Maximum number of hits
+
+    Returns:
+        List of hits, prefix matches first, then substring, then fuzzy
+    """
+    query = query.strip()
+    lowered = query.lower()
+
+    def match(entry):
+        name, equipment_type = entry.equipment_name.lower(), entry.equipment_type.lower()
+        return 'prefix' if name.startswith(lowered) or equipment_type.startswith(lowered) else 'substring'
+
+    def by_match(hit):
+        return MATCH_ORDER[hit['match']], hit['equipment_name']
+
+    # Too short for trigrams (or no FTS5): a LIKE scan of the user's entries
+    if len(query) < 3 or not fts_available():
+        lookup = 'istartswith' if len(query) < 3 else 'icontains'
+        entries = EquipmentSearchEntry.objects.filter(user=user)
+        keys = (
+            (entries.filter(**{f'equipment_name__{lookup}': query})
+             | entries.filter(**{f'equipment_type__{lookup}': query}))
+            .order_by('equipment_name', 'equipment_type')
+            .values_list('equipment_name', 'equipment_type')
+            .distinct()[:limit]
+        )
+        return sorted(_hits(user, keys, match), key=by_match)
+
+    hits = sorted(_hits(user, _match_keys(user, _quote(query), limit), match), key=by_match)
+
+    if len(hits) < limit:
+        query_trigrams = _trigrams(query)
+        seen = {(hit['equipment_name'], hit['equipment_type']) for hit in hits}
+        candidates = _match_keys(
+            user, ' OR '.join(_quote(t) for t in sorted(query_trigrams)), limit * FUZZY_CANDIDATES_PER_HIT
+        )
+        scored = sorted(
+            ((_similarity(query_trigrams, name), (name, equipment_type))
+             for name, equipment_type in candidates if (name, equipment_type) not in seen),
+            reverse=True
+        )
+        keys = [key for score, key in scored if score >= FUZZY_MIN_SIMILARITY][:limit - len(hits)]
+        order = {key: i for i, key in enumerate(keys)}
+        fuzzy = _hits(user, keys, lambda entry: 'fuzzy')
+        hits.extend(sorted(fuzzy, key=lambda hit: order[(hit['equipment_name'], hit['equipment_type'])]))
+
+    return hits
+
+
+def rebuild_search_index():
+    """
+    Rebuild the search entries of every upload, reading archived ones from their archive
+
+    Returns:
+        Number of uploads indexed
+    """
+    fields = ['equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+    uploads = UploadHistory.objects.order_by('id')
+    with transaction.atomic():
+        EquipmentSearchEntry.objects.all().delete()
+        for upload in uploads.iterator():
+            if upload.archived_at:
+                index_rows(upload, load_archived_upload(upload).iter_rows(fields))
+            else:
+                index_upload(upload)
+    return uploads.count()
@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Equipment, UploadHistory
+from .models import ChunkedUpload, Equipment, UploadHistory
+from .utils import is_csv_filename
 
 
 class EquipmentSerializer(serializers.ModelSerializer):
@@ -10,6 +12,14 @@ class EquipmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
 
 
+class AnomalySerializer(serializers.ModelSerializer):
+    """Serializer for Equipment with its anomaly scores"""
+    class Meta:
+        model = Equipment
+        fields = ['id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature',
+                  'flowrate_z', 'pressure_z', 'temperature_z', 'anomaly_score', 'is_anomaly']
+
+
 class UploadHistorySerializer(serializers.ModelSerializer):
     """Serializer for UploadHistory model"""
     username = serializers.CharField(source='user.username', read_only=True)
@@ -17,7 +27,7 @@ class UploadHistorySerializer(serializers.ModelSerializer):
     class Meta:
         model = UploadHistory
         fields = ['id', 'filename', 'username', 'uploaded_at', 'num_records',
-                  'avg_flowrate', 'avg_pressure', 'avg_temperature']
+                  'avg_flowrate', 'avg_pressure', 'avg_temperature', 'archived_at']
 
 
 class CSVUploadSerializer(serializers.Serializer):
@@ -25,7 +35,46 @@ class CSVUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
     
     def validate_file(self, value):
-        """Validate that uploaded file is CSV"""
-        if not value.name.endswith('.csv'):
-            raise serializers.ValidationError("Only CSV files are allowed.")
+        """Validate that uploaded file is CSV (optionally gzip/bz2/zstd compressed)"""
+        if not is_csv_filename(value.name):
+            raise serializers.ValidationError("Only CSV files (.csv, .csv.gz, .csv.bz2, .csv.zst) are allowed.")
+        return value
+
+
+class ChunkedUploadInitSerializer(serializers.Serializer):
+    """Serializer for starting a resumable chunked upload"""
+    filename = serializers.CharField(max_length=255)
+    total_size = serializers.IntegerField(min_value=1)
+    chunk_size = serializers.IntegerField(min_value=1, required=False)
+    
+    def validate_filename(self, value):
+        """Validate that the file being uploaded is CSV (optionally compressed)"""
+        if not is_csv_filename(value):
+            raise serializers.ValidationError("Only CSV files (.csv, .csv.gz, .csv.bz2, .csv.zst) are allowed.")
         return value
+    
+    def validate_total_size(self, value):
+        """Validate file size against the upload limit"""
+        if value > settings.UPLOAD_MAX_FILE_SIZE:
+            raise serializers.ValidationError(
+                f"File size cannot exceed {settings.UPLOAD_MAX_FILE_SIZE} bytes."
+            )
+        return value
+    
+    def validate_chunk_size(self, value):
+        """Validate chunk size against the server limit"""
+        if value > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+            raise serializers.ValidationError(
+                f"Chunk size cannot exceed {settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes."
+            )
+        return value
+
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    """Serializer for ChunkedUpload progress"""
+    upload_id = serializers.UUIDField(source='id', read_only=True)
+    
+    class Meta:
+        model = ChunkedUpload
+        fields = ['upload_id', 'filename', 'total_size', 'chunk_size', 'offset',
+                  'next_chunk', 'status', 'created_at']
@@ -0,0 +1,264 @@
+"""
+Mergeable quantile sketches (t-digest) for upload parameters
+
+Ingest builds one t-digest per parameter for the whole upload and one per
+equipment type, and stores them as JSON in an UploadSketch row next to the
+upload's summary. Percentiles of one upload, or of several uploads merged, are then read
+from a few hundred centroids instead of scanning Equipment rows.
+
+The digest is the merging variant with the k1 scale function: centroids
+are sorted by mean, and neighbours are merged while their quantile range
+spans at most one unit of k(q) = compression / (2 pi) * asin(2q - 1). That
+keeps centroids small near the tails, where p95/p99 are read. Compression
+is done in one vectorized pass over sorted centroids, for raw values at
+ingest and for centroids when digests are merged.
+
+Uploads ingested before sketches existed get theirs built on first use.
+"""
+import math
+
+import numpy as np
+
+from .archive import load_archived_upload
+from .columnar import NUMERIC_COLUMNS, load_upload_columns
+from .models import Equipment, UploadSketch
+
+# Upper bound on centroids is about compression / 2
+DEFAULT_COMPRESSION = 200
+
+
+class TDigest:
+    """
+    Quantile sketch over float values
+
+    Args:
+        means: Centroid means
+        weights: Centroid weights (value counts)
+        minimum: Smallest value seen
+        maximum: Largest value seen
+        compression: Accuracy parameter; larger keeps more centroids
+    """
+
+    def __init__(self, means=(), weights=(), minimum=None, maximum=None, compression=DEFAULT_COMPRESSION):
+        self.means = np.asarray(means, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.compression = compression
+
+    @classmethod
+    def from_values(cls, values, compression=DEFAULT_COMPRESSION):
+        """Build a digest from raw values; NaNs are ignored"""
+        values = np.asarray(values, dtype=np.float64)
+        values = np.sort(values[~np.isnan(values)])
+        if not len(values):
+            return cls(compression=compression)
+        digest = cls(values, np.ones(len(values)), float(values[0]), float(values[-1]), compression)
+        return digest._compressed(presorted=True)
+
+    @classmethod
+    def merge(cls, digests, compression=DEFAULT_COMPRESSION):
+        """Combine digests into one over all their values"""
+        digests = [d for d in digests if d.count]
+        if not digests:
+            return cls(compression=compression)
+        merged = cls(
+            np.concatenate([d.means for d in digests]),
+            np.concatenate([d.weights for d in digests]),
+            min(d.minimum for d in digests),
+            max(d.maximum for d in digests),
+            compression
+        )
+        return merged._compressed()
+
+    @property
+    def count(self):
+        return int(self.weights.sum())
+
+    def _compressed(self, presorted=False):
+        if not presorted:
+            order = np.argsort(self.means, kind='stable')
+            self.means, self.weights = self.means[order], self.weights[order]
+
+        total = self.weights.sum()
+        # Quantile at the middle of each centroid, mapped onto the k1 scale
+        q = (np.cumsum(self.weights) - self.weights / 2) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * q - 1)
+        bins = np.floor(k - k[0]).astype(np.int64)
+
+        weights = np.bincount(bins, weights=self.weights)
+        means = np.bincount(bins, weights=self.means * self.weights)
+        occupied = weights > 0
+        self.weights = weights[occupied]
+        self.means = means[occupied] / self.weights
+        return self
+
+    def quantiles(self, qs):
+        """
+        Estimate quantiles
+
+        Args:
+            qs: Quantiles in [0, 1]
+
+        Returns:
+            List of floats (None for an empty digest)
+        """
+        if not self.count:
+            return [None] * len(qs)
+
+        # Interpolate between centroid centres, pinned to the exact min and max
+        total = self.weights.sum()
+        centres = np.cumsum(self.weights) - self.weights / 2
+        xs = np.concatenate(([0.0], centres, [total]))
+        ys = np.concatenate(([self.minimum], self.means, [self.maximum]))
+        return [float(v) for v in np.interp(np.asarray(qs, dtype=np.float64) * total, xs, ys)]
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'min': self.minimum,
+            'max': self.maximum,
+            'means': self.means.tolist(),
+            'weights': self.weights.astype(np.int64).tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data, compression=DEFAULT_COMPRESSION):
+        return cls(data['means'], data['weights'], data['min'], data['max'], compression)
+
+
+def build_upload_sketches(columns, type_codes, types, compression=DEFAULT_COMPRESSION):
+    """
+    Build the stored sketches of an upload
+
+    Args:
+        columns: Mapping of parameter name (NUMERIC_COLUMNS keys) to values
+        type_codes: Integer equipment type code per row (-1 for missing)
+        types: Equipment type name per code
+        compression: t-digest compression
+
+    Returns:
+        JSON-serializable dictionary:
+        {parameter: {'all': digest, 'by_type': {type: digest}}}
+    """
+    type_codes = np.asarray(type_codes)
+    order = np.argsort(type_codes, kind='stable')
+    bounds = np.searchsorted(type_codes[order], np.arange(len(types) + 1))
+
+    sketches = {}
+    for name in NUMERIC_COLUMNS:
+        values = np.asarray(columns[name], dtype=np.float64)
+        grouped = values[order]
+        sketches[name] = {
+            'all': TDigest.from_values(values, compression).to_dict(),
+            'by_type': {
+                str(type_name): TDigest.from_values(grouped[bounds[i]:bounds[i + 1]], compression).to_dict()
+                for i, type_name in enumerate(types)
+                if bounds[i + 1] > bounds[i]
+            },
+        }
+    return sketches
+
+
+def merge_upload_sketches(sketches_list):
+    """
+    Merge the stored sketches of several uploads
+
+    Returns:
+        {parameter: {'all': TDigest, 'by_type': {type: TDigest}}}
+    """
+    merged = {}
+    for name in NUMERIC_COLUMNS:
+        type_names = sorted({t for sketches in sketches_list for t in sketches[name]['by_type']})
+        merged[name] = {
+            'all': TDigest.merge([TDigest.from_dict(s[name]['all']) for s in sketches_list]),
+            'by_type': {
+                t: TDigest.merge([
+                    TDigest.from_dict(s[name]['by_type'][t]) for s in sketches_list if t in s[name]['by_type']
+                ])
+                for t in type_names
+            },
+        }
+    return merged
+
+
+def percentile_key(percentile):
+    """Response key of a percentile: 50 -> 'p50', 99.9 -> 'p99.9'"""
+    return f'p{percentile:g}'
+
+
+def sketch_percentiles(sketches, percentiles, by_type=False):
+    """
+    Read percentiles from stored or merged sketches
+
+    Args:
+        sketches: Stored sketches of one upload, or merge_upload_sketches() output
+        percentiles: Percentiles in [0, 100]
+        by_type: Also report them per equipment type
+
+    Returns:
+        {parameter: {'p50': ..., ...}}, plus 'by_type': {type: {parameter: {...}}}
+        when by_type is set
+    """
+    def read(digest):
+        if isinstance(digest, dict):
+            digest = TDigest.from_dict(digest)
+        values = digest.quantiles([p / 100 for p in percentiles])
+        return {percentile_key(p): None if v is None else round(v, 2) for p, v in zip(percentiles, values)}
+
+    result = {name: read(sketches[name]['all']) for name in NUMERIC_COLUMNS}
+    if by_type:
+        result['by_type'] = {}
+        for name in NUMERIC_COLUMNS:
+            for type_name, digest in sketches[name]['by_type'].items():
+                result['by_type'].setdefault(type_name, {})[name] = read(digest)
+    return result
+
+
+def _sketch_source(upload_history):
+    """Columns, type codes and type names of an upload, from the cheapest store that has them"""
+    columns = load_archived_upload(upload_history) if upload_history.archived_at else load_upload_columns(upload_history)
+    if columns is not None:
+        return {name: getattr(columns, name) for name in NUMERIC_COLUMNS}, columns.type_codes, columns.types
+
+    rows = Equipment.objects.filter(upload_session=upload_history).values_list('equipment_type', *NUMERIC_COLUMNS)
+    equipment_types, *values = zip(*rows) if rows else ((),) * (len(NUMERIC_COLUMNS) + 1)
+    types, type_codes = np.unique(np.asarray(equipment_types, dtype=object), return_inverse=True)
+    return dict(zip(NUMERIC_COLUMNS, values)), type_codes, types.tolist()
+
+
+def save_upload_sketches(upload_history, columns, type_codes, types):
+    """
+    Build and store the sketches of an upload
+
+    Args:
+        upload_history: UploadHistory instance
+        columns: Mapping of parameter name (NUMERIC_COLUMNS keys) to values
+        type_codes: Integer equipment type code per row
+        types: Equipment type name per code
+
+    Returns:
+        The stored sketches
+    """
+    sketches = build_upload_sketches(columns, type_codes, types)
+    UploadSketch.objects.update_or_create(upload=upload_history, defaults={'sketches': sketches})
+    return sketches
+
+
+def load_upload_sketches(uploads):
+    """
+    Stored sketches of several uploads, building any that are missing
+
+    Args:
+        uploads: UploadHistory instances
+
+    Returns:
+        List of sketches, in the order of uploads
+    """
+    stored = dict(
+        UploadSketch.objects.filter(upload__in=[u.id for u in uploads]).values_list('upload_id', 'sketches')
+    )
+    for upload in uploads:
+        if upload.id not in stored:
+            stored[upload.id] = save_upload_sketches(upload, *_sketch_source(upload))
+    return [stored[upload.id] for upload in uploads]
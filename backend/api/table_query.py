@@ -0,0 +1,276 @@
+"""
+Server-side ordering, filtering and search for /api/data/
+
+A table query is parsed from the request's query params:
+
+- ordering: comma-separated fields, '-' for descending, e.g.
+  ``ordering=equipment_type,-flowrate``
+- equipment_type: one or more types (comma-separated or repeated)
+- flowrate_min, flowrate_max, pressure_min, ...: inclusive ranges
+- is_anomaly: true or false
+- search: case-insensitive text contained in the name or type
+- after: a page's next_cursor, to continue right after its last row
+
+Rows are always ordered by id after the requested fields, in the direction
+of the first one, so pages have stable boundaries and a descending order
+scans the (upload_session, field, id) index backwards. Stored uploads are
+queried through the ORM (search goes through the equipment search index);
+archived uploads through their rehydrated numpy columns.
+
+A cursor holds the last row's values of the ordering fields and its id.
+Paging with it seeks to the next row through the ordering's index
+(keyset pagination) instead of stepping over every earlier row as OFFSET
+does, so deep pages cost the same as the first.
+"""
+import json
+import math
+
+import numpy as np
+from django.db.models import Q
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .search import matching_names_sql
+
+ORDERING_FIELDS = ('equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature')
+RANGE_FIELDS = ('flowrate', 'pressure', 'temperature')
+DEFAULT_ORDERING = ['equipment_name']
+BOOLEAN_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+TEXT_FIELDS = ('equipment_name', 'equipment_type')
+
+
+def default_table_query():
+    """Every row, in name order"""
+    return {
+        'ordering': DEFAULT_ORDERING, 'equipment_types': [], 'ranges': {}, 'is_anomaly': None, 'search': '',
+        'after': None,
+    }
+
+
+def is_default(query):
+    """Whether a query is every row in name order"""
+    return query['ordering'] == DEFAULT_ORDERING and not is_filtered(query) and query['after'] is None
+
+
+def page_cursor(record, ordering):
+    """Cursor continuing after a record (serialized, with its id) in the given ordering"""
+    values = [record[field.lstrip('-')] for field in order_fields(ordering)]
+    return urlsafe_base64_encode(json.dumps(values, separators=(',', ':')).encode('utf-8'))
+
+
+def parse_cursor(cursor, ordering):
+    """
+    Values of the ordering fields and id held by a cursor
+
+    Raises:
+        ValueError: If the cursor is not one of this ordering's
+    """
+    error = ValueError('after must be a next_cursor of the same ordering')
+    try:
+        values = json.loads(urlsafe_base64_decode(cursor))
+    except (ValueError, UnicodeDecodeError):
+        raise error
+    fields = [field.lstrip('-') for field in order_fields(ordering)]
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise error
+    for field, value in zip(fields, values):
+        if field in TEXT_FIELDS:
+            valid = isinstance(value, str)
+        elif field == 'id':
+            valid = isinstance(value, int) and not isinstance(value, bool)
+        else:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+        if not valid:
+            raise error
+    return values
+
+
+def parse_table_query(query_params):
+    """
+    Parse ordering, filter and search query params
+
+    Args:
+        query_params: QueryDict of the request
+
+    Returns:
+        Dictionary with 'ordering', 'equipment_types', 'ranges', 'is_anomaly',
+        'search' and 'after' (the cursor's values, or None)
+
+    Raises:
+        ValueError: If a field, number or flag is invalid
+    """
+    ordering = []
+    for field in (query_params.get('ordering') or '').split(','):
+        field = field.strip()
+        if not field:
+            continue
+        if field.lstrip('-') not in ORDERING_FIELDS:
+            raise ValueError(f"ordering fields must be among: {', '.join(ORDERING_FIELDS)}")
+        if field.lstrip('-') not in (f.lstrip('-') for f in ordering):
+            ordering.append(field)
+
+    ranges = {}
+    for field in RANGE_FIELDS:
+        bounds = []
+        for bound in ('min', 'max'):
+            value = query_params.get(f'{field}_{bound}')
+            if value in (None, ''):
+                bounds.append(None)
+                continue
+            try:
+                value = float(value)
+            except ValueError:
+                value = math.nan
+            if not math.isfinite(value):
+                raise ValueError(f'{field}_{bound} must be a number')
+            bounds.append(value)
+        if bounds != [None, None]:
+            ranges[field] = tuple(bounds)
+
+    is_anomaly = query_params.get('is_anomaly')
+    if is_anomaly not in (None, ''):
+        if is_anomaly.lower() not in BOOLEAN_VALUES:
+            raise ValueError('is_anomaly must be true or false')
+        is_anomaly = BOOLEAN_VALUES[is_anomaly.lower()]
+    else:
+        is_anomaly = None
+
+    ordering = ordering or DEFAULT_ORDERING
+    after = query_params.get('after')
+
+    return {
+        'ordering': ordering,
+        'equipment_types': [
+            equipment_type
+            for value in query_params.getlist('equipment_type')
+            for equipment_type in value.split(',') if equipment_type
+        ],
+        'ranges': ranges,
+        'is_anomaly': is_anomaly,
+        'search': (query_params.get('search') or '').strip(),
+        'after': parse_cursor(after, ordering) if after else None,
+    }
+
+
+def is_filtered(query):
+    """Whether a query selects fewer than all rows"""
+    return bool(query['equipment_types'] or query['ranges'] or query['is_anomaly'] is not None or query['search'])
+
+
+def order_fields(ordering):
+    """order_by() arguments: the fields, then id in the direction of the first"""
+    return [*ordering, '-id' if ordering[0].startswith('-') else 'id']
+
+
+def query_equipment(equipment, upload, query):
+    """
+    Apply a table query to an upload's Equipment queryset
+
+    Returns:
+        Filtered and ordered queryset
+    """
+    if query['equipment_types']:
+        equipment = equipment.filter(equipment_type__in=query['equipment_types'])
+    for field, (low, high) in query['ranges'].items():
+        if low is not None:
+            equipment = equipment.filter(**{f'{field}__gte': low})
+        if high is not None:
+            equipment = equipment.filter(**{f'{field}__lte': high})
+    if query['is_anomaly'] is not None:
+        equipment = equipment.filter(is_anomaly=query['is_anomaly'])
+    if query['search']:
+        # Names are unique within an upload, so matching names select the rows
+        names = matching_names_sql(upload, query['search'])
+        if names is not None:
+            equipment = equipment.filter(equipment_name__in=names)
+        else:
+            equipment = (equipment.filter(equipment_name__icontains=query['search'])
+                         | equipment.filter(equipment_type__icontains=query['search']))
+    return equipment.order_by(*order_fields(query['ordering']))
+
+
+def seek_equipment(equipment, query):
+    """
+    Rows of a query_equipment() queryset after the query's cursor
+
+    (a, b, id) > (x, y, z) is spelled out as a > x OR (a = x AND b > y) OR
+    (a = x AND b = y AND id > z), with each field compared in its own
+    direction. The bound on the first field alone lets SQLite start its
+    index scan at the cursor.
+    """
+    if query['after'] is None:
+        return equipment
+
+    fields = order_fields(query['ordering'])
+    first = fields[0]
+    bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": query['after'][0]})
+    following, equal = Q(), {}
+    for field, value in zip(fields, query['after']):
+        name = field.lstrip('-')
+        following |= Q(**equal, **{f"{name}__{'lt' if field.startswith('-') else 'gt'}": value})
+        equal[name] = value
+    return equipment.filter(bound, following)
+
+
+def _sort_key(archived, field):
+    """Numeric key per row that sorts like the field"""
+    if field == 'equipment_type':
+        # Type codes follow first appearance; rank them by type name
+        ranks = np.argsort(np.argsort(np.asarray(archived.types, dtype=object)))
+        return ranks[archived.type_codes]
+    if field == 'equipment_name':
+        # Archives are stored in (equipment_name, id) order
+        return np.arange(len(archived.id))
+    return getattr(archived, field)
+
+
+def query_archived(archived, query):
+    """
+    Apply a table query to a rehydrated archive
+
+    Returns:
+        Integer index array of the selected rows, in order
+    """
+    mask = np.ones(len(archived.id), dtype=bool)
+    if query['equipment_types']:
+        codes = [archived.types.index(t) for t in query['equipment_types'] if t in archived.types]
+        mask &= np.isin(archived.type_codes, codes)
+    for field, (low, high) in query['ranges'].items():
+        values = getattr(archived, field)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+    if query['is_anomaly'] is not None:
+        mask &= archived.is_anomaly == query['is_anomaly']
+    if query['search']:
+        text = query['search'].lower()
+        types = np.array([text in t.lower() for t in archived.types], dtype=bool)
+        names = np.char.find(np.char.lower(archived.equipment_name.astype(str)), text) >= 0
+        mask &= names | types[archived.type_codes]
+
+    index = np.flatnonzero(mask)
+    # np.lexsort sorts by its last key first
+    keys = []
+    for field in reversed(order_fields(query['ordering'])):
+        key = archived.id if field.lstrip('-') == 'id' else _sort_key(archived, field.lstrip('-'))
+        key = key[index]
+        keys.append(-key if field.startswith('-') else key)
+    return index[np.lexsort(keys)]
+
+
+def seek_archived(archived, index, query):
+    """Rows of a query_archived() index after the query's cursor, compared as in seek_equipment()"""
+    if query['after'] is None:
+        return index
+
+    following = np.zeros(len(index), dtype=bool)
+    equal = np.ones(len(index), dtype=bool)
+    for field, value in zip(order_fields(query['ordering']), query['after']):
+        name = field.lstrip('-')
+        if name == 'equipment_type':
+            values = np.asarray(archived.types, dtype=object)[archived.type_codes[index]]
+        else:
+            values = getattr(archived, name)[index]
+        following |= equal & ((values < value) if field.startswith('-') else (values > value))
+        equal &= values == value
+    return index[following]
@@ -1,11 +1,31 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_READ_VIEWS:
+    # Native async read endpoints for ASGI deployments
+    from . import async_views as read_views
+else:
+    read_views = views
+
 urlpatterns = [
     path('auth/login/', views.login_view, name='login'),
     path('upload/', views.upload_csv, name='upload-csv'),
-    path('data/', views.get_data, name='get-data'),
-    path('summary/', views.get_summary, name='get-summary'),
-    path('history/', views.get_history, name='get-history'),
+    path('upload/chunked/', views.chunked_upload_init, name='chunked-upload-init'),
+    path('upload/chunked/<uuid:upload_id>/', views.chunked_upload_status, name='chunked-upload-status'),
+    path('upload/chunked/<uuid:upload_id>/chunks/<int:index>/', views.chunked_upload_chunk, name='chunked-upload-chunk'),
+    path('upload/chunked/<uuid:upload_id>/complete/', views.chunked_upload_complete, name='chunked-upload-complete'),
+    path('data/', read_views.get_data, name='get-data'),
+    path('summary/', read_views.get_summary, name='get-summary'),
+    path('history/', read_views.get_history, name='get-history'),
+    path('dashboard/', read_views.get_dashboard, name='get-dashboard'),
+    path('anomalies/', views.get_anomalies, name='get-anomalies'),
+    path('percentiles/', views.get_percentiles, name='get-percentiles'),
+    path('search/', views.search_equipment_view, name='search-equipment'),
     path('report/', views.generate_report, name='generate-report'),
+    path('export/<str:file_format>/', views.export_data, name='export-data'),
+    path('events/', read_views.event_stream, name='event-stream'),
+    path('events/ticket/', views.event_stream_ticket, name='event-stream-ticket'),
+    path('fleet/', views.get_fleet, name='fleet'),
+    path('metrics/', views.get_metrics, name='metrics'),
 ]
@@ -1,31 +1,128 @@
 """
 Utility functions for CSV parsing and data analysis
 """
-import pandas as pd
+import numpy as np
+import bz2
+import csv
+import gzip
+import hashlib
 import io
-from .models import Equipment, UploadHistory
+import itertools
+import logging
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ChunkedUpload, Equipment, UploadHistory
+from .columnar import NUMERIC_COLUMNS, write_upload_columns, delete_upload_columns
+from .archive import archive_upload, delete_upload_archive, load_archived_upload
+from .sketches import save_upload_sketches, sketch_percentiles
+from .sampling import save_upload_sample
+from .search import index_upload
+from .fleet import type_stats, upload_type_stats, record_ingest, record_archive, record_delete
+from .report_pool import delete_upload_report
+from .result_cache import invalidate_results
+from .events import (
+    publish_event,
+    UPLOAD_STARTED,
+    UPLOAD_PROGRESS,
+    UPLOAD_COMPLETED,
+    UPLOAD_FAILED,
+    RETENTION_CLEANUP
+)
 
+# Accepted upload extensions; compressed variants are decompressed while parsing
+CSV_EXTENSIONS = ('.csv', '.csv.gz', '.csv.bz2', '.csv.zst')
 
-def parse_csv_file(file_obj):
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+
+logger = logging.getLogger(__name__)
+
+
+class CSVValidationError(ValueError):
+    """A CSV file rejected for invalid rows; report is the validate_equipment_rows() report"""
+    
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+def is_csv_filename(filename):
+    """
+    Check whether a file name has a plain or compressed CSV extension
+    
+    Args:
+        filename: File name to check
+        
+    Returns:
+        True if the extension is one of CSV_EXTENSIONS
+    """
+    return filename.lower().endswith(CSV_EXTENSIONS)
+
+
+def open_csv_stream(file_obj, filename):
+    """
+    Wrap an uploaded file in a streaming decompressor based on its extension
+    
+    Args:
+        file_obj: Binary file-like object
+        filename: Original file name, used to pick the codec
+        
+    Returns:
+        File-like object yielding the decompressed CSV bytes
+        
+    Raises:
+        ValueError: If the codec is not available
+    """
+    name = filename.lower()
+    
+    if name.endswith('.gz'):
+        return gzip.GzipFile(fileobj=file_obj, mode='rb')
+    if name.endswith('.bz2'):
+        return bz2.BZ2File(file_obj, mode='rb')
+    if name.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Zstandard-compressed uploads require the 'zstandard' package")
+        return zstandard.ZstdDecompressor().stream_reader(file_obj)
+    
+    return file_obj
+
+
+def parse_csv_file(file_obj, filename=None, max_rows=None):
     """
     Parse uploaded CSV file and return pandas DataFrame
     
     Args:
-        file_obj: Uploaded file object
+        file_obj: Uploaded file object (plain or gzip/bz2/zstd compressed)
+        filename: Original file name; defaults to file_obj.name
+        max_rows: Row limit; defaults to settings.UPLOAD_MAX_ROWS
         
     Returns:
-        DataFrame with parsed CSV data
+        DataFrame with parsed CSV data; row values are checked separately
+        by validate_equipment_rows()
         
     Raises:
-        ValueError: If CSV format is invalid
+        ValueError: If CSV format is invalid or has too many rows
     """
+    # Imported here so workers that only serve reads boot without pandas
+    import pandas as pd
+    
+    if max_rows is None:
+        max_rows = settings.UPLOAD_MAX_ROWS
+    
     try:
-        # Read CSV file
-        df = pd.read_csv(file_obj)
+        # Read CSV file, decompressing on the fly; stop one row past the limit
+        stream = open_csv_stream(file_obj, filename or getattr(file_obj, 'name', '') or '')
+        df = pd.read_csv(stream, nrows=max_rows + 1)
+        
+        if len(df) > max_rows:
+            raise ValueError(f"CSV file exceeds the limit of {max_rows} rows")
         
         # Validate required columns
-        required_columns = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
         
         if missing_columns:
             raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
@@ -37,15 +134,6 @@ def parse_csv_file(file_obj):
         # Clean column names (remove extra spaces)
         df.columns = df.columns.str.strip()
         
-        # Validate numeric columns
-        numeric_columns = ['Flowrate', 'Pressure', 'Temperature']
-        for col in numeric_columns:
-            if not pd.api.types.is_numeric_dtype(df[col]):
-                try:
-                    df[col] = pd.to_numeric(df[col])
-                except:
-                    raise ValueError(f"Column '{col}' must contain numeric values")
-        
         return df
         
     except pd.errors.EmptyDataError:
@@ -56,6 +144,100 @@ def parse_csv_file(file_obj):
         raise ValueError(f"Error parsing CSV: {str(e)}")
 
 
+def validate_equipment_rows(df, value_ranges=None, max_reported_rows=None):
+    """
+    Check every row of a parsed CSV file in one vectorized pass
+    
+    Each check is a boolean mask over all rows: missing equipment name or
+    type, duplicate equipment name (the first occurrence is kept), and per
+    numeric column a missing value, a non-numeric (or infinite) value, or a
+    value outside its allowed range. Numeric columns are converted with
+    to_numeric(errors='coerce'), so one bad value no longer fails the file.
+    
+    Args:
+        df: DataFrame from parse_csv_file(); numeric columns are converted in place
+        value_ranges: {column: (min, max)}, None for an open side
+            (default: settings.UPLOAD_VALUE_RANGES)
+        max_reported_rows: Row numbers listed per check
+            (default: settings.UPLOAD_VALIDATION_MAX_REPORTED_ROWS)
+        
+    Returns:
+        Tuple of (boolean array of valid rows, report dictionary). The report
+        has total_rows, valid_rows, invalid_rows and errors, a list of
+        {'column', 'check', 'count', 'rows'} for each failed check, where rows
+        are the first CSV line numbers (the header is line 1).
+    """
+    import pandas as pd
+    
+    if value_ranges is None:
+        value_ranges = settings.UPLOAD_VALUE_RANGES
+    if max_reported_rows is None:
+        max_reported_rows = settings.UPLOAD_VALIDATION_MAX_REPORTED_ROWS
+    
+    def factorize_text(column):
+        # Blank values are found among the distinct values, not row by row
+        codes, uniques = pd.factorize(df[column])
+        blank = np.zeros(len(uniques), dtype=bool)
+        if uniques.dtype == object:
+            values = pd.Series(uniques, dtype=object)
+            blank = (values.str.isspace().eq(True) | (values == '')).to_numpy()
+        missing = (codes < 0) | blank[codes]
+        return codes, missing
+    
+    checks = []
+    
+    name_codes, missing_name = factorize_text('Equipment Name')
+    duplicate = np.ones(len(df), dtype=bool)
+    duplicate[np.unique(name_codes, return_index=True)[1]] = False
+    checks.append(('Equipment Name', 'missing', missing_name))
+    checks.append(('Equipment Name', 'duplicate', duplicate & ~missing_name))
+    checks.append(('Type', 'missing', factorize_text('Type')[1]))
+    
+    for column in NUMERIC_COLUMNS.values():
+        missing = df[column].isna().to_numpy()
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype(float)
+        values = df[column].to_numpy()
+        checks.append((column, 'missing', missing))
+        checks.append((column, 'non_numeric', ~np.isfinite(values) & ~missing))
+        
+        low, high = value_ranges.get(column, (None, None))
+        out_of_range = np.zeros(len(values), dtype=bool)
+        # NaN compares False, so non-numeric values are not counted twice
+        if low is not None:
+            out_of_range |= values < low
+        if high is not None:
+            out_of_range |= values > high
+        checks.append((column, 'out_of_range', out_of_range))
+    
+    invalid = np.zeros(len(df), dtype=bool)
+    errors = []
+    for column, check, mask in checks:
+        count = int(np.count_nonzero(mask))
+        if count:
+            invalid |= mask
+            errors.append({
+                'column': column,
+                'check': check,
+                'count': count,
+                'rows': (np.flatnonzero(mask)[:max_reported_rows] + 2).tolist()
+            })
+    
+    invalid_rows = int(np.count_nonzero(invalid))
+    report = {
+        'total_rows': len(df),
+        'valid_rows': len(df) - invalid_rows,
+        'invalid_rows': invalid_rows,
+        'errors': errors
+    }
+    return ~invalid, report
+
+
+def describe_validation_errors(report):
+    """One-line description of a validation report: '3 of 1000 rows are invalid (Flowrate: 2 non_numeric, ...)'"""
+    checks = ', '.join(f"{error['column']}: {error['count']} {error['check']}" for error in report['errors'])
+    return f"{report['invalid_rows']} of {report['total_rows']} rows are invalid ({checks})"
+
+
 def calculate_summary_statistics(df):
     """
     Calculate summary statistics from DataFrame
@@ -83,47 +265,521 @@ def calculate_summary_statistics(df):
     return summary
 
 
-def save_equipment_data(df, upload_history):
+# Parameters scored for anomalies: (CSV column, Equipment z-score field)
+ANOMALY_PARAMETERS = [
+    ('Flowrate', 'flowrate_z'),
+    ('Pressure', 'pressure_z'),
+    ('Temperature', 'temperature_z'),
+]
+
+# Scale factors that make MAD / mean absolute deviation consistent with the standard deviation
+MAD_SCALE = 1.4826
+MEAN_AD_SCALE = 1.2533
+
+
+def score_anomalies(df, threshold=None):
+    """
+    Compute per-type robust z-scores and anomaly flags for every row
+    
+    Each parameter is scored as (value - median) / (1.4826 * MAD) within its
+    equipment type. Where the MAD is zero the mean absolute deviation is
+    used instead. The row's anomaly score is its largest absolute z-score.
+    
+    Args:
+        df: pandas DataFrame with equipment data
+        threshold: Score above which a row is flagged (default: settings.ANOMALY_Z_THRESHOLD)
+        
+    Returns:
+        The DataFrame with z-score, anomaly_score and is_anomaly columns added
+    """
+    import pandas as pd
+    
+    if threshold is None:
+        threshold = settings.ANOMALY_Z_THRESHOLD
+    
+    # Group on integer codes; far cheaper than grouping on the string column
+    groups, _ = pd.factorize(df['Type'])
+    scores = np.zeros(len(df))
+    
+    for column, z_field in ANOMALY_PARAMETERS:
+        values = df[column].astype(float)
+        deviation = values - values.groupby(groups).transform('median')
+        abs_deviation = deviation.abs()
+        
+        spread = abs_deviation.groupby(groups).transform('median') * MAD_SCALE
+        fallback = abs_deviation.groupby(groups).transform('mean') * MEAN_AD_SCALE
+        spread = spread.where(spread > 0, fallback).to_numpy()
+        
+        # Types whose values are all identical have zero spread and zero deviation
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(spread > 0, deviation.to_numpy() / spread, 0.0)
+        z = np.nan_to_num(z, nan=0.0)
+        
+        df[z_field] = z
+        scores = np.maximum(scores, np.abs(z))
+    
+    df['anomaly_score'] = scores
+    df['is_anomaly'] = scores > threshold
+    
+    return df
+
+
+SAVE_BATCH_SIZE = 10000
+
+
+def save_equipment_data(df, upload_history, progress_callback=None):
     """
     Save equipment data from DataFrame to database
     
     Args:
         df: pandas DataFrame with equipment data
         upload_history: UploadHistory instance
+        progress_callback: Optional callable(saved_rows, total_rows) run after each batch
         
     Returns:
         Number of records saved
     """
-    equipment_objects = []
+    if 'anomaly_score' not in df.columns:
+        score_anomalies(df)
+    
+    # Iterate over plain column lists rather than iterrows() to avoid a Series per row
+    columns = zip(
+        df['Equipment Name'].tolist(),
+        df['Type'].tolist(),
+        df['Flowrate'].astype(float).tolist(),
+        df['Pressure'].astype(float).tolist(),
+        df['Temperature'].astype(float).tolist(),
+        df['flowrate_z'].tolist(),
+        df['pressure_z'].tolist(),
+        df['temperature_z'].tolist(),
+        df['anomaly_score'].tolist(),
+        df['is_anomaly'].tolist()
+    )
     
-    for _, row in df.iterrows():
-        equipment = Equipment(
+    equipment_objects = (
+        Equipment(
             upload_session=upload_history,
-            equipment_name=row['Equipment Name'],
-            equipment_type=row['Type'],
-            flowrate=row['Flowrate'],
-            pressure=row['Pressure'],
-            temperature=row['Temperature']
+            equipment_name=name,
+            equipment_type=equipment_type,
+            flowrate=flowrate,
+            pressure=pressure,
+            temperature=temperature,
+            flowrate_z=flowrate_z,
+            pressure_z=pressure_z,
+            temperature_z=temperature_z,
+            anomaly_score=anomaly_score,
+            is_anomaly=is_anomaly
         )
-        equipment_objects.append(equipment)
+        for (name, equipment_type, flowrate, pressure, temperature,
+             flowrate_z, pressure_z, temperature_z, anomaly_score, is_anomaly) in columns
+    )
     
-    # Bulk create for better performance
-    Equipment.objects.bulk_create(equipment_objects)
+    # Bulk create for better performance, one batch at a time
+    total = len(df)
+    saved = 0
+    while saved < total:
+        batch = list(itertools.islice(equipment_objects, SAVE_BATCH_SIZE))
+        Equipment.objects.bulk_create(batch)
+        saved += len(batch)
+        if progress_callback:
+            progress_callback(saved, total)
     
-    return len(equipment_objects)
+    return saved
 
 
 def cleanup_old_uploads(user, keep_count=5):
     """
-    Delete old upload history records, keeping only the latest N
+    Retire old uploads, keeping only the latest N in the database
+    
+    Depending on settings.UPLOAD_RETENTION_MODE, uploads beyond the latest N
+    are deleted ('delete') or have their equipment rows moved to the archive
+    tier ('archive'). An upload whose archive cannot be written is kept.
     
     Args:
         user: User instance
         keep_count: Number of recent uploads to keep (default: 5)
     """
+    archive = settings.UPLOAD_RETENTION_MODE == 'archive'
     uploads = UploadHistory.objects.filter(user=user).order_by('-uploaded_at')
+    if archive:
+        uploads = uploads.filter(archived_at__isnull=True)
     
     if uploads.count() > keep_count:
         old_uploads = uploads[keep_count:]
+        deleted_ids = []
+        archived_ids = []
         for upload in old_uploads:
+            stats = upload_type_stats(upload)
+            if archive:
+                if archive_upload(upload):
+                    record_archive(user, stats)
+                    archived_ids.append(upload.id)
+                    # Reports are only served for the latest upload
+                    delete_upload_report(upload.id)
+                continue
+            deleted_ids.append(upload.id)
+            record_delete(user, stats, archived=bool(upload.archived_at))
             upload.delete()
+            delete_upload_columns(deleted_ids[-1])
+            delete_upload_archive(deleted_ids[-1])
+            delete_upload_report(deleted_ids[-1])
+        
+        # Cached summaries and reports of retired uploads, and the fleet totals
+        invalidate_results(deleted_ids + archived_ids)
+        
+        publish_event(user, RETENTION_CLEANUP, {
+            'deleted_upload_ids': deleted_ids,
+            'archived_upload_ids': archived_ids
+        })
+
+
+def ingest_csv(user, file_obj, filename, skip_invalid_rows=None):
+    """
+    Run the full ingest pipeline for an uploaded CSV file
+    
+    The upload and everything stored with it (rows, sketches, sample,
+    search entries, fleet totals) are written in one transaction, and the
+    columnar sidecar is removed again if the ingest fails, so a failed
+    ingest leaves nothing behind for a retry to duplicate.
+    
+    Args:
+        user: User instance that owns the upload
+        file_obj: File-like object with CSV content
+        filename: Original file name
+        skip_invalid_rows: Ingest only the valid rows instead of rejecting a
+            file with invalid ones (default: settings.UPLOAD_SKIP_INVALID_ROWS)
+        
+    Returns:
+        Tuple of (UploadHistory instance, summary dictionary); the summary's
+        'validation' entry is the row validation report
+        
+    Raises:
+        CSVValidationError: If rows are invalid and not skipped, or no row is valid
+        ValueError: If CSV format is invalid
+    """
+    if skip_invalid_rows is None:
+        skip_invalid_rows = settings.UPLOAD_SKIP_INVALID_ROWS
+    
+    publish_event(user, UPLOAD_STARTED, {'filename': filename})
+    
+    # Parse CSV and check its rows
+    try:
+        df = parse_csv_file(file_obj, filename)
+        valid, validation = validate_equipment_rows(df)
+        if validation['invalid_rows']:
+            if not skip_invalid_rows:
+                raise CSVValidationError(
+                    f"{describe_validation_errors(validation)}; "
+                    f"upload again with skip_invalid_rows=true to ingest only the valid rows",
+                    validation
+                )
+            if not validation['valid_rows']:
+                raise CSVValidationError(f"{describe_validation_errors(validation)}; no valid rows left", validation)
+            df = df[valid].reset_index(drop=True)
+    except ValueError as e:
+        publish_event(user, UPLOAD_FAILED, {
+            'filename': filename,
+            'error': str(e),
+            **({'validation': e.report} if isinstance(e, CSVValidationError) else {})
+        })
+        raise
+    publish_event(user, UPLOAD_PROGRESS, {'filename': filename, 'stage': 'parsed', 'total_rows': len(df)})
+    
+    # Calculate summary statistics
+    summary = calculate_summary_statistics(df)
+    
+    # Score rows against their equipment type
+    score_anomalies(df)
+    summary['anomaly_count'] = int(df['is_anomaly'].sum())
+    summary['validation'] = validation
+    
+    type_codes, types = df['Type'].factorize()
+    columns = {name: df[column].to_numpy() for name, column in NUMERIC_COLUMNS.items()}
+    upload_history = None
+    try:
+        with transaction.atomic():
+            # Create upload history record
+            upload_history = UploadHistory.objects.create(
+                user=user,
+                filename=filename,
+                num_records=summary['total_count'],
+                avg_flowrate=summary['avg_flowrate'],
+                avg_pressure=summary['avg_pressure'],
+                avg_temperature=summary['avg_temperature']
+            )
+            
+            # Quantile sketches for percentile queries
+            sketches = save_upload_sketches(upload_history, columns, type_codes, types)
+            summary['percentiles'] = sketch_percentiles(sketches, settings.SUMMARY_PERCENTILES)
+            
+            # Save equipment data
+            save_equipment_data(
+                df,
+                upload_history,
+                lambda saved, total: publish_event(user, UPLOAD_PROGRESS, {
+                    'filename': filename,
+                    'upload_id': upload_history.id,
+                    'stage': 'saving',
+                    'saved_rows': saved,
+                    'total_rows': total
+                })
+            )
+            
+            # Random rows for previews (after saving, so they carry their ids)
+            save_upload_sample(upload_history, df, type_codes, types)
+            
+            # Name search across the user's uploads
+            index_upload(upload_history)
+            
+            # Fleet-wide totals for the admin dashboard
+            record_ingest(user, type_stats(type_codes, types, columns, df['is_anomaly'].to_numpy()))
+            
+            # Columnar sidecar for vectorized analytics
+            write_upload_columns(upload_history, df)
+    except Exception as e:
+        # The rows are rolled back; the sidecar is a file, and its upload id may be handed out again
+        if upload_history is not None and upload_history.id is not None:
+            delete_upload_columns(upload_history.id)
+        publish_event(user, UPLOAD_FAILED, {'filename': filename, 'error': str(e)})
+        raise
+    
+    # The upload is stored; failing the request now would only make a retry ingest it again
+    try:
+        # The fleet totals changed; results cached under a reused upload id are stale
+        invalidate_results([upload_history.id])
+        
+        # Cleanup old uploads (keep only last 5)
+        cleanup_old_uploads(user, keep_count=5)
+    except Exception:
+        logger.warning('Retention after ingesting upload %s failed', upload_history.id, exc_info=True)
+    
+    publish_event(user, UPLOAD_COMPLETED, {
+        'upload_id': upload_history.id,
+        'filename': filename,
+        'summary': summary
+    })
+    
+    return upload_history, summary
+
+
+def chunked_upload_path(chunked_upload):
+    """
+    Get the on-disk path where a chunked upload is assembled
+    
+    Args:
+        chunked_upload: ChunkedUpload instance
+        
+    Returns:
+        Path of the partial file
+    """
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f"{chunked_upload.id}.part")
+
+
+def write_upload_chunk(chunked_upload, stream, checksum):
+    """
+    Append the next chunk of a chunked upload to its partial file
+    
+    The chunk is streamed to disk at the current offset while its SHA-256
+    digest is computed; on a size or checksum mismatch the file is truncated
+    back to the previous offset.
+    
+    Args:
+        chunked_upload: ChunkedUpload instance (its offset is not modified)
+        stream: File-like object with the chunk body
+        checksum: Expected hex SHA-256 digest of the chunk
+        
+    Returns:
+        Number of bytes written
+        
+    Raises:
+        ValueError: If the chunk size or checksum does not match
+    """
+    expected_size = min(chunked_upload.chunk_size, chunked_upload.total_size - chunked_upload.offset)
+    path = chunked_upload_path(chunked_upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    digest = hashlib.sha256()
+    written = 0
+    
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+        f.seek(chunked_upload.offset)
+        try:
+            while True:
+                block = stream.read(64 * 1024)
+                if not block:
+                    break
+                written += len(block)
+                if written > expected_size:
+                    raise ValueError(f"Chunk is larger than the expected {expected_size} bytes")
+                digest.update(block)
+                f.write(block)
+            
+            if written != expected_size:
+                raise ValueError(f"Chunk has {written} bytes, expected {expected_size}")
+            if digest.hexdigest() != checksum.strip().lower():
+                raise ValueError("Chunk checksum mismatch")
+        except ValueError:
+            f.truncate(chunked_upload.offset)
+            raise
+        
+        f.truncate(chunked_upload.offset + written)
+    
+    return written
+
+
+def delete_chunked_upload_file(chunked_upload):
+    """
+    Remove the partial file of a chunked upload, if present
+    
+    Args:
+        chunked_upload: ChunkedUpload instance
+    """
+    try:
+        os.remove(chunked_upload_path(chunked_upload))
+    except FileNotFoundError:
+        pass
+
+
+def cleanup_stale_chunked_uploads(user):
+    """
+    Delete a user's chunked uploads older than CHUNKED_UPLOAD_EXPIRY_HOURS
+    
+    Args:
+        user: User instance
+    """
+    cutoff = timezone.now() - timedelta(hours=settings.CHUNKED_UPLOAD_EXPIRY_HOURS)
+    
+    for chunked_upload in ChunkedUpload.objects.filter(user=user, created_at__lt=cutoff):
+        delete_chunked_upload_file(chunked_upload)
+        chunked_upload.delete()
+
+
+# Column order used by the export endpoints
+EXPORT_FIELDS = ['equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+EXPORT_HEADERS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+EXPORT_BATCH_SIZE = 5000
+PARQUET_ROW_GROUP_SIZE = 65536
+
+
+class _StreamBuffer:
+    """Write-only file object whose contents are drained after every write batch"""
+    
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._position
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class _Echo:
+    """Pseudo-buffer that returns what csv.writer writes to it"""
+    
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(upload_history):
+    """
+    An upload's equipment rows as EXPORT_FIELDS tuples, in upload order
+    
+    Archived uploads are read from their rehydrated archive.
+    """
+    if upload_history.archived_at:
+        return load_archived_upload(upload_history).iter_rows(EXPORT_FIELDS, EXPORT_BATCH_SIZE)
+    
+    return (
+        Equipment.objects.filter(upload_session=upload_history)
+        .order_by('id')
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=EXPORT_BATCH_SIZE)
+    )
+
+
+def iter_equipment_csv(upload_history):
+    """
+    Stream an upload's equipment rows as CSV
+    
+    Args:
+        upload_history: UploadHistory instance
+        
+    Yields:
+        Encoded CSV chunks, starting with the header row
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_HEADERS).encode('utf-8')
+    
+    rows = iter_export_rows(upload_history)
+    
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow(row))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield ''.join(batch).encode('utf-8')
+            batch = []
+    if batch:
+        yield ''.join(batch).encode('utf-8')
+
+
+def iter_equipment_parquet(upload_history):
+    """
+    Stream an upload's equipment rows as a Parquet file, one row group at a time
+    
+    Args:
+        upload_history: UploadHistory instance
+        
+    Yields:
+        Chunks of the Parquet file
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema([
+        ('equipment_name', pa.string()),
+        ('equipment_type', pa.string()),
+        ('flowrate', pa.float64()),
+        ('pressure', pa.float64()),
+        ('temperature', pa.float64()),
+    ])
+    
+    rows = iter_export_rows(upload_history)
+    
+    sink = _StreamBuffer()
+    writer = pq.ParquetWriter(sink, schema)
+    
+    def write_row_group(batch):
+        columns = list(zip(*batch))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema
+        ))
+        return sink.drain()
+    
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= PARQUET_ROW_GROUP_SIZE:
+            yield write_row_group(batch)
+            batch = []
+    if batch:
+        yield write_row_group(batch)
+    
+    writer.close()
+    yield sink.drain()
@@ -4,22 +4,63 @@ from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from django.http import FileResponse
-from django.db.models import Avg
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import Avg, Count
+from django.shortcuts import get_object_or_404
 import io
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.units import inch
-
-from .models import Equipment, UploadHistory
-from .serializers import EquipmentSerializer, UploadHistorySerializer, CSVUploadSerializer
+import time
+
+from .admission import get_admission, check_content_length, AdmissionRejected, UploadTooLarge
+from .archive import get_archive_cache, load_archived_upload
+from .columnar import load_upload_columns
+from .authentication import authenticate_request, issue_stream_ticket, unauthorized_response, method_not_allowed_response
+from .events import (
+    get_broker,
+    publish_event,
+    parse_last_event_id,
+    format_sse,
+    Subscription,
+    KEEPALIVE,
+    UPLOAD_PROGRESS
+)
+from .models import ChunkedUpload, Equipment, UploadHistory
+from .fleet import fleet_summary
+from .idempotency import idempotent
+from .report_pool import render_upload_report, ReportRenderingFailed
+from .result_cache import cached_result, get_result_cache
+from .sampling import load_upload_sample, sample_records
+from .search import search_equipment
+from .sketches import load_upload_sketches, merge_upload_sketches, sketch_percentiles
+from .table_query import (
+    default_table_query,
+    is_default,
+    is_filtered,
+    page_cursor,
+    parse_table_query,
+    query_archived,
+    query_equipment,
+    seek_archived,
+    seek_equipment
+)
+from .serializers import (
+    EquipmentSerializer,
+    AnomalySerializer,
+    UploadHistorySerializer,
+    CSVUploadSerializer,
+    ChunkedUploadInitSerializer,
+    ChunkedUploadSerializer
+)
 from .utils import (
-    parse_csv_file,
-    calculate_summary_statistics,
-    save_equipment_data,
-    cleanup_old_uploads
+    CSVValidationError,
+    ingest_csv,
+    chunked_upload_path,
+    write_upload_chunk,
+    delete_chunked_upload_file,
+    cleanup_stale_chunked_uploads,
+    iter_equipment_csv,
+    iter_equipment_parquet
 )
 
 
@@ -56,48 +97,212 @@ def login_view(request):
 
 
 @api_view(['POST'])
+@idempotent
 def upload_csv(request):
     """
     Upload CSV file and parse equipment data
-    Returns: Uploaded data summary
+    Query params: skip_invalid_rows (ingest only the valid rows)
+    Returns: Uploaded data summary, with the row validation report
+    """
+    try:
+        # Refuse oversized uploads and take an ingest slot before reading the body
+        check_content_length(request)
+        
+        with get_admission().admit(request.user.pk):
+            serializer = CSVUploadSerializer(data=request.data)
+            
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            
+            csv_file = serializer.validated_data['file']
+            upload_history, summary = ingest_csv(
+                request.user, csv_file, csv_file.name, requested_skip_invalid_rows(request)
+            )
+        
+        return Response({
+            'message': 'File uploaded successfully',
+            'upload_id': upload_history.id,
+            'summary': summary
+        }, status=status.HTTP_201_CREATED)
+        
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except UploadTooLarge as e:
+        return Response({'error': str(e.detail)}, status=e.status_code)
+    except CSVValidationError as e:
+        return Response(
+            {'error': str(e), 'validation': e.report},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return Response(
+            {'error': f'Error processing file: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+def requested_skip_invalid_rows(request):
+    """The skip_invalid_rows query param, or None for settings.UPLOAD_SKIP_INVALID_ROWS"""
+    value = request.query_params.get('skip_invalid_rows')
+    if value is None:
+        return None
+    return value.lower() in ('1', 'true')
+
+
+def admission_rejected_response(error):
+    """429 for an upload turned away by admission control"""
+    response = Response(
+        {'error': f'{error}, please retry later', 'retry_after': error.retry_after},
+        status=status.HTTP_429_TOO_MANY_REQUESTS
+    )
+    response['Retry-After'] = str(error.retry_after)
+    return response
+
+
+@api_view(['POST'])
+def chunked_upload_init(request):
+    """
+    Start a resumable chunked CSV upload
+    Returns: Upload id, chunk size and current offset
     """
-    serializer = CSVUploadSerializer(data=request.data)
+    serializer = ChunkedUploadInitSerializer(data=request.data)
     
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    csv_file = serializer.validated_data['file']
+    cleanup_stale_chunked_uploads(request.user)
     
-    try:
-        # Parse CSV
-        df = parse_csv_file(csv_file)
+    chunked_upload = ChunkedUpload.objects.create(
+        user=request.user,
+        filename=serializer.validated_data['filename'],
+        total_size=serializer.validated_data['total_size'],
+        chunk_size=serializer.validated_data.get('chunk_size', settings.CHUNKED_UPLOAD_CHUNK_SIZE)
+    )
+    
+    return Response(ChunkedUploadSerializer(chunked_upload).data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+def chunked_upload_status(request, upload_id):
+    """
+    Get the received offset of a chunked upload
+    Returns: Upload progress
+    """
+    chunked_upload = get_object_or_404(ChunkedUpload, id=upload_id, user=request.user)
+    
+    return Response(ChunkedUploadSerializer(chunked_upload).data)
+
+
+@api_view(['PUT'])
+def chunked_upload_chunk(request, upload_id, index):
+    """
+    Receive one numbered chunk of a chunked upload
+    The raw request body is the chunk; the Chunk-Checksum header carries its hex SHA-256
+    Returns: Upload progress
+    """
+    checksum = request.headers.get('Chunk-Checksum')
+    
+    if not checksum:
+        return Response(
+            {'error': 'Missing Chunk-Checksum header'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    with transaction.atomic():
+        chunked_upload = get_object_or_404(
+            ChunkedUpload.objects.select_for_update(), id=upload_id, user=request.user
+        )
         
-        # Calculate summary statistics
-        summary = calculate_summary_statistics(df)
+        if chunked_upload.status != ChunkedUpload.STATUS_ACTIVE:
+            return Response(
+                {'error': 'Upload is already complete', **ChunkedUploadSerializer(chunked_upload).data},
+                status=status.HTTP_409_CONFLICT
+            )
         
-        # Create upload history record
-        upload_history = UploadHistory.objects.create(
-            user=request.user,
-            filename=csv_file.name,
-            num_records=summary['total_count'],
-            avg_flowrate=summary['avg_flowrate'],
-            avg_pressure=summary['avg_pressure'],
-            avg_temperature=summary['avg_temperature']
-        )
+        # Chunk already received (e.g. a retry after a lost response)
+        if index < chunked_upload.next_chunk:
+            return Response(ChunkedUploadSerializer(chunked_upload).data)
         
-        # Save equipment data
-        save_equipment_data(df, upload_history)
+        if index > chunked_upload.next_chunk or chunked_upload.offset >= chunked_upload.total_size:
+            return Response(
+                {'error': 'Unexpected chunk number', **ChunkedUploadSerializer(chunked_upload).data},
+                status=status.HTTP_409_CONFLICT
+            )
         
-        # Cleanup old uploads (keep only last 5)
-        cleanup_old_uploads(request.user, keep_count=5)
+        try:
+            written = write_upload_chunk(chunked_upload, request.stream or io.BytesIO(), checksum)
+        except ValueError as e:
+            return Response(
+                {'error': str(e), **ChunkedUploadSerializer(chunked_upload).data},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
+        chunked_upload.offset += written
+        chunked_upload.next_chunk += 1
+        chunked_upload.save(update_fields=['offset', 'next_chunk'])
+    
+    publish_event(request.user, UPLOAD_PROGRESS, {
+        'filename': chunked_upload.filename,
+        'chunked_upload_id': str(chunked_upload.id),
+        'stage': 'receiving',
+        'received_bytes': chunked_upload.offset,
+        'total_bytes': chunked_upload.total_size
+    })
+    
+    return Response(ChunkedUploadSerializer(chunked_upload).data)
+
+
+@api_view(['POST'])
+@idempotent
+def chunked_upload_complete(request, upload_id):
+    """
+    Finalize a chunked upload and run the assembled file through ingest
+    Query params: skip_invalid_rows (ingest only the valid rows)
+    Returns: Uploaded data summary, with the row validation report
+    """
+    chunked_upload = get_object_or_404(ChunkedUpload, id=upload_id, user=request.user)
+    
+    if chunked_upload.status == ChunkedUpload.STATUS_COMPLETE:
+        upload_history = chunked_upload.upload_history
+        if upload_history is None:
+            # Removed by retention cleanup since; there is nothing to summarize
+            return Response({'message': 'File already processed', 'upload_id': None, 'summary': None})
         return Response({
-            'message': 'File uploaded successfully',
+            'message': 'File already processed',
             'upload_id': upload_history.id,
-            'summary': summary
-        }, status=status.HTTP_201_CREATED)
-        
+            # Uploads completed before summaries were stored get the read-side summary
+            'summary': chunked_upload.summary or upload_summary(upload_history)
+        })
+    
+    if chunked_upload.offset != chunked_upload.total_size:
+        return Response(
+            {'error': 'Upload is incomplete', **ChunkedUploadSerializer(chunked_upload).data},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    try:
+        with get_admission().admit(request.user.pk), \
+                open(chunked_upload_path(chunked_upload), 'rb') as csv_file:
+            upload_history, summary = ingest_csv(
+                request.user, csv_file, chunked_upload.filename, requested_skip_invalid_rows(request)
+            )
+    except AdmissionRejected as e:
+        # The assembled file is kept, so completing again later is enough
+        return admission_rejected_response(e)
+    except CSVValidationError as e:
+        # Kept too, so it can be completed again with skip_invalid_rows
+        return Response(
+            {'error': str(e), 'validation': e.report},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except ValueError as e:
+        delete_chunked_upload_file(chunked_upload)
+        chunked_upload.delete()
         return Response(
             {'error': str(e)},
             status=status.HTTP_400_BAD_REQUEST
@@ -107,66 +312,395 @@ def upload_csv(request):
             {'error': f'Error processing file: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+    
+    delete_chunked_upload_file(chunked_upload)
+    chunked_upload.status = ChunkedUpload.STATUS_COMPLETE
+    chunked_upload.upload_history = upload_history
+    chunked_upload.summary = summary
+    chunked_upload.save(update_fields=['status', 'upload_history', 'summary'])
+    
+    return Response({
+        'message': 'File uploaded successfully',
+        'upload_id': upload_history.id,
+        'summary': summary
+    }, status=status.HTTP_201_CREATED)
+
+
+def get_requested_upload(request):
+    """The upload named by the upload_id query param, else the user's latest (or None)"""
+    uploads = UploadHistory.objects.filter(user=request.user)
+    upload_id = request.query_params.get('upload_id')
+    
+    if upload_id:
+        return uploads.filter(id=upload_id).first() if upload_id.isdigit() else None
+    return uploads.first()
+
+
+def get_page_params(query_params, default_limit=None):
+    """
+    Parse offset/limit query params
+    
+    Returns:
+        Tuple of (offset, limit or None for no limit)
+        
+    Raises:
+        ValueError: If either value is not a non-negative integer
+    """
+    offset = int(query_params.get('offset', 0))
+    limit = query_params.get('limit', default_limit)
+    limit = int(limit) if limit is not None else None
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ValueError('offset and limit must not be negative')
+    return offset, limit
+
+
+# Columns a sample can be stratified by
+SAMPLE_STRATA = ('equipment_type',)
+
+
+def get_sample_params(query_params):
+    """
+    Parse sample/stratify query params
+    
+    Returns:
+        Tuple of (sample size or None for no sampling, stratify column or None)
+        
+    Raises:
+        ValueError: If sample is not a positive integer or stratify is unknown
+    """
+    stratify = query_params.get('stratify') or None
+    if stratify is not None and stratify not in SAMPLE_STRATA:
+        raise ValueError(f"stratify must be one of: {', '.join(SAMPLE_STRATA)}")
+    
+    sample = query_params.get('sample')
+    if sample is None:
+        return None, stratify
+    if not sample.isdigit() or int(sample) == 0:
+        raise ValueError('sample must be a positive integer')
+    return int(sample), stratify
+
+
+def equipment_page(upload, offset=0, limit=None, query=None):
+    """
+    Serialized equipment records of an upload, optionally one page of them
+    
+    Args:
+        query: Table query to filter and order by (see api.table_query);
+               defaults to every record in name order
+    
+    Returns:
+        Tuple of (records, number of records the query selects)
+    """
+    query = query or default_table_query()
+    end = offset + limit if limit is not None else None
+    
+    if upload.archived_at:
+        archived = load_archived_upload(upload)
+        if is_default(query):
+            return archived.page(EquipmentSerializer.Meta.fields, offset, limit), upload.num_records
+        index = query_archived(archived, query)
+        page = seek_archived(archived, index, query)[offset:end]
+        return archived.records(EquipmentSerializer.Meta.fields, page), len(index)
+    
+    # Name alone is not unique, so the id keeps page boundaries stable
+    equipment = query_equipment(Equipment.objects.filter(upload_session=upload), upload, query)
+    
+    if limit is None and not offset and query['after'] is None:
+        data = EquipmentSerializer(equipment, many=True).data
+        return data, len(data)
+    
+    data = EquipmentSerializer(seek_equipment(equipment, query)[offset:end], many=True).data
+    return data, equipment.count() if is_filtered(query) else upload.num_records
+
+
+def upload_summary(upload):
+    """Summary statistics of an upload, from the result cache"""
+    return cached_result('summary', upload.id, lambda: compute_upload_summary(upload))
+
+
+def compute_upload_summary(upload):
+    """Summary statistics of an upload"""
+    # Vectorized over the memory-mapped sidecar (or rehydrated archive) when there is one
+    columns = load_archived_upload(upload) if upload.archived_at else load_upload_columns(upload)
+    if columns is not None:
+        summary = columns.summary()
+    else:
+        equipment = Equipment.objects.filter(upload_session=upload)
+        
+        # One grouped query instead of a COUNT per type
+        type_distribution = {
+            row['equipment_type']: row['count']
+            for row in equipment.order_by().values('equipment_type').annotate(count=Count('id'))
+        }
+        
+        summary = {
+            'total_count': equipment.count(),
+            'avg_flowrate': round(upload.avg_flowrate, 2) if upload.avg_flowrate else 0,
+            'avg_pressure': round(upload.avg_pressure, 2) if upload.avg_pressure else 0,
+            'avg_temperature': round(upload.avg_temperature, 2) if upload.avg_temperature else 0,
+            'type_distribution': type_distribution
+        }
+    
+    sketches = load_upload_sketches([upload])[0]
+    summary['percentiles'] = sketch_percentiles(sketches, settings.SUMMARY_PERCENTILES)
+    return summary
 
 
 @api_view(['GET'])
 def get_data(request):
     """
-    Get all equipment data for the current user's latest upload
-    Returns: List of equipment records
+    Get equipment data for the current user's latest upload
+    Query params: upload_id (defaults to the latest upload), offset, limit;
+                  ordering, equipment_type, <field>_min/<field>_max, is_anomaly,
+                  search, after (see api.table_query);
+                  sample (N random rows from the upload's stored preview sample
+                  instead of a page), stratify (equipment_type)
+    Returns: One page of equipment records, the number of records matching
+             (count) and in the upload (total_count), the page's offset/limit,
+             and next_cursor to pass as after for the next page (null after
+             a short page)
     """
-    # Get user's latest upload
-    latest_upload = UploadHistory.objects.filter(user=request.user).first()
+    upload = get_requested_upload(request)
     
-    if not latest_upload:
-        return Response({'data': []})
+    if not upload:
+        return Response({'upload_id': None, 'count': 0, 'data': []})
     
-    equipment = Equipment.objects.filter(upload_session=latest_upload)
-    serializer = EquipmentSerializer(equipment, many=True)
+    try:
+        sample, stratify = get_sample_params(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response({'data': serializer.data})
+    if sample:
+        data = sample_records(load_upload_sample(upload), sample, stratify is not None)
+        return Response({
+            'upload_id': upload.id,
+            'count': upload.num_records,
+            'sampled': True,
+            'stratify': stratify,
+            'data': data
+        })
+    
+    try:
+        offset, limit = get_page_params(request.query_params)
+    except ValueError:
+        return Response(
+            {'error': 'offset and limit must be non-negative integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        query = parse_table_query(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    data, count = equipment_page(upload, offset, limit, query)
+    
+    return Response({
+        'upload_id': upload.id,
+        'count': count,
+        'total_count': upload.num_records,
+        'offset': offset,
+        'limit': limit,
+        'next_cursor': page_cursor(data[-1], query['ordering']) if limit and len(data) == limit else None,
+        'data': data
+    })
 
 
 @api_view(['GET'])
 def get_summary(request):
     """
     Get summary statistics for current user's latest upload
+    Query params: upload_id (defaults to the latest upload)
     Returns: Summary statistics
     """
-    latest_upload = UploadHistory.objects.filter(user=request.user).first()
+    upload = get_requested_upload(request)
     
-    if not latest_upload:
+    if not upload:
         return Response({
             'message': 'No data available',
+            'upload_id': None,
             'summary': None
         })
     
-    equipment = Equipment.objects.filter(upload_session=latest_upload)
+    return Response({'upload_id': upload.id, 'summary': upload_summary(upload)})
+
+
+DASHBOARD_SECTIONS = ('summary', 'history', 'data')
+
+
+@api_view(['GET'])
+def get_dashboard(request):
+    """
+    Summary, upload history and the first page of data in one round trip
+    Query params: sections (comma-separated subset of summary,history,data), page_size
+    Returns: The requested sections for the user's latest upload
+    """
+    sections = request.query_params.get('sections')
+    sections = set(sections.split(',')) if sections else set(DASHBOARD_SECTIONS)
+    unknown = sections.difference(DASHBOARD_SECTIONS)
+    
+    if unknown:
+        return Response(
+            {'error': f"Unknown dashboard sections: {', '.join(sorted(unknown))}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        page_size = min(int(request.query_params.get('page_size', settings.DASHBOARD_PAGE_SIZE)),
+                        settings.DASHBOARD_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response(
+            {'error': 'page_size must be an integer'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # One history query serves both the history section and the latest upload
+    history = list(UploadHistory.objects.filter(user=request.user).select_related('user')[:5])
+    latest_upload = history[0] if history else None
+    
+    response = {'upload_id': latest_upload.id if latest_upload else None}
+    
+    if 'summary' in sections:
+        response['summary'] = upload_summary(latest_upload) if latest_upload else None
+    
+    if 'history' in sections:
+        response['history'] = UploadHistorySerializer(history, many=True).data
+    
+    if 'data' in sections:
+        if latest_upload:
+            response['data'], response['data_count'] = equipment_page(latest_upload, 0, max(page_size, 0))
+        else:
+            response['data'], response['data_count'] = [], 0
+    
+    return Response(response)
+
+
+@api_view(['GET'])
+def get_anomalies(request):
+    """
+    Get anomalous equipment for an upload, most severe first
+    Query params: upload_id (defaults to the latest upload), threshold, equipment_type, limit
+    Returns: List of equipment records with anomaly scores
+    """
+    upload = get_requested_upload(request)
+    
+    if not upload:
+        return Response({'upload_id': None, 'count': 0, 'anomalies': []})
+    
+    try:
+        threshold = float(request.query_params.get('threshold', settings.ANOMALY_Z_THRESHOLD))
+        limit = min(int(request.query_params.get('limit', 100)), 1000)
+    except ValueError:
+        return Response(
+            {'error': 'threshold and limit must be numeric'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    equipment_type = request.query_params.get('equipment_type')
+    
+    if upload.archived_at:
+        data, count = load_archived_upload(upload).anomalies(
+            AnomalySerializer.Meta.fields, threshold, equipment_type, limit
+        )
+        return Response({'upload_id': upload.id, 'threshold': threshold, 'count': count, 'anomalies': data})
+    
+    anomalies = Equipment.objects.filter(
+        upload_session=upload,
+        anomaly_score__gt=threshold
+    ).order_by('-anomaly_score')
+    
+    if equipment_type:
+        anomalies = anomalies.filter(equipment_type=equipment_type)
+    
+    serializer = AnomalySerializer(anomalies[:limit], many=True)
+    
+    return Response({
+        'upload_id': upload.id,
+        'threshold': threshold,
+        'count': anomalies.count(),
+        'anomalies': serializer.data
+    })
+
+
+@api_view(['GET'])
+def get_percentiles(request):
+    """
+    Get percentiles of one upload or of several uploads merged, from their quantile sketches
+    Query params: upload_ids (comma-separated) or last (the latest N uploads), defaults to the
+                  latest upload; percentiles (comma-separated, 0-100); by_type
+    Returns: Percentiles per parameter (and per equipment type)
+    """
+    uploads = UploadHistory.objects.filter(user=request.user)
+    
+    try:
+        percentiles = [
+            float(p) for p in request.query_params.get('percentiles', '').split(',') if p.strip()
+        ] or settings.SUMMARY_PERCENTILES
+        if not all(0 <= p <= 100 for p in percentiles):
+            raise ValueError
+        
+        if request.query_params.get('upload_ids'):
+            upload_ids = [int(i) for i in request.query_params['upload_ids'].split(',')]
+            uploads = list(uploads.filter(id__in=upload_ids))
+        else:
+            last = int(request.query_params.get('last', 1))
+            if last < 1:
+                raise ValueError
+            uploads = list(uploads[:last])
+    except ValueError:
+        return Response(
+            {'error': 'upload_ids and last must be positive integers, percentiles numbers between 0 and 100'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not uploads:
+        return Response({'error': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
+    
+    sketches = load_upload_sketches(uploads)
+    merged = sketches[0] if len(sketches) == 1 else merge_upload_sketches(sketches)
+    by_type = request.query_params.get('by_type', '').lower() in ('1', 'true')
+    
+    return Response({
+        'upload_ids': [upload.id for upload in uploads],
+        'count': sum(upload.num_records for upload in uploads),
+        'percentiles': sketch_percentiles(merged, percentiles, by_type)
+    })
+
+
+@api_view(['GET'])
+def search_equipment_view(request):
+    """
+    Search equipment by name or type across the current user's retained uploads
+    Query params: q, limit
+    Returns: Matches (prefix, substring, then fuzzy) with the latest upload and readings of each
+    """
+    query = request.query_params.get('q', '').strip()
+    
+    try:
+        limit = min(int(request.query_params.get('limit', 20)), 100)
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return Response({'error': 'limit must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Calculate type distribution
-    type_distribution = {}
-    for equip_type in equipment.values_list('equipment_type', flat=True).distinct():
-        count = equipment.filter(equipment_type=equip_type).count()
-        type_distribution[equip_type] = count
+    if not query:
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    summary = {
-        'total_count': equipment.count(),
-        'avg_flowrate': round(latest_upload.avg_flowrate, 2) if latest_upload.avg_flowrate else 0,
-        'avg_pressure': round(latest_upload.avg_pressure, 2) if latest_upload.avg_pressure else 0,
-        'avg_temperature': round(latest_upload.avg_temperature, 2) if latest_upload.avg_temperature else 0,
-        'type_distribution': type_distribution
-    }
+    results = search_equipment(request.user, query, limit)
     
-    return Response({'summary': summary})
+    return Response({'query': query, 'count': len(results), 'results': results})
 
 
 @api_view(['GET'])
 def get_history(request):
     """
     Get last 5 upload history records for current user
+    Query params: include_archived (also list archived uploads)
     Returns: List of upload history
     """
-    history = UploadHistory.objects.filter(user=request.user)[:5]
+    history = UploadHistory.objects.filter(user=request.user)
+    if request.query_params.get('include_archived', '').lower() not in ('1', 'true'):
+        history = history[:5]
     serializer = UploadHistorySerializer(history, many=True)
     
     return Response({'history': serializer.data})
@@ -186,73 +720,130 @@ def generate_report(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    equipment = Equipment.objects.filter(upload_session=latest_upload)
-    
-    # Create PDF in memory
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#0A4D68'),
-        spaceAfter=30,
-    )
-    
-    # Title
-    title = Paragraph("ChemLizer Equipment Report", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Summary
-    summary_text = f"""
-    <b>Upload Date:</b> {latest_upload.uploaded_at.strftime('%Y-%m-%d %H:%M')}<br/>
-    <b>File:</b> {latest_upload.filename}<br/>
-    <b>Total Records:</b> {latest_upload.num_records}<br/>
-    <b>Average Flowrate:</b> {latest_upload.avg_flowrate:.2f}<br/>
-    <b>Average Pressure:</b> {latest_upload.avg_pressure:.2f}<br/>
-    <b>Average Temperature:</b> {latest_upload.avg_temperature:.2f}
-    """
-    summary_para = Paragraph(summary_text, styles['BodyText'])
-    elements.append(summary_para)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Equipment table
-    table_data = [['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']]
-    for equip in equipment:
-        table_data.append([
-            equip.equipment_name,
-            equip.equipment_type,
-            f"{equip.flowrate:.2f}",
-            f"{equip.pressure:.2f}",
-            f"{equip.temperature:.2f}"
-        ])
-    
-    # Create table
-    table = Table(table_data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0A4D68')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(table)
-    
-    # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
+    try:
+        # Rendered in the report process pool, so this worker's other requests keep running;
+        # the file stays on disk and the result cache holds only its path
+        path = cached_result('report', latest_upload.id, lambda: render_upload_report(latest_upload.id))
+        try:
+            pdf = open(path, 'rb')
+        except FileNotFoundError:
+            # Removed since its path was cached (e.g. a cache shared between hosts)
+            pdf = open(render_upload_report(latest_upload.id), 'rb')
+    except ReportRenderingFailed as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     
     return FileResponse(
-        buffer,
+        pdf,
         as_attachment=True,
         filename=f'chemlizer_report_{latest_upload.id}.pdf'
     )
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_equipment_csv, 'text/csv'),
+    'parquet': (iter_equipment_parquet, 'application/vnd.apache.parquet'),
+}
+
+
+@api_view(['GET'])
+def export_data(request, file_format):
+    """
+    Stream equipment data of an upload as CSV or Parquet
+    Query params: upload_id (defaults to the latest upload)
+    Returns: File download
+    """
+    if file_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': f"Unsupported export format '{file_format}'"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    upload = get_requested_upload(request)
+    
+    if not upload:
+        return Response(
+            {'error': 'No data available to export'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    stream, content_type = EXPORT_FORMATS[file_format]
+    response = StreamingHttpResponse(stream(upload), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="chemlizer_export_{upload.id}.{file_format}"'
+    
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def event_stream_ticket(request):
+    """
+    Issue a short-lived ticket for opening the event stream
+    Returns: ticket (pass as ?ticket= to /api/events/) and its lifetime in seconds
+    """
+    return Response({
+        'ticket': issue_stream_ticket(request.user),
+        'expires_in': settings.EVENT_STREAM_TICKET_MAX_AGE
+    })
+
+
+def event_stream(request):
+    """
+    Server-Sent Events stream of the current user's upload and retention events
+    Auth: Token header, session, or ?ticket= from /api/events/ticket/
+          (EventSource cannot set headers)
+    Query params: last_event_id (when reopening a stream; the Last-Event-ID
+                  header takes precedence)
+    Returns: text/event-stream; resumes after the last event id
+    """
+    if request.method != 'GET':
+        return method_not_allowed_response(request.method)
+    
+    user, error = authenticate_request(request, allow_ticket=True)
+    if user is None:
+        return unauthorized_response(error)
+    
+    broker = get_broker()
+    subscription = Subscription()
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    broker.subscribe(user.pk, subscription, parse_last_event_id(last_event_id))
+    
+    def stream():
+        try:
+            yield b'retry: 5000\n\n'
+            # End the stream periodically; the client reconnects with Last-Event-ID
+            deadline = time.monotonic() + settings.EVENTS_STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+                yield format_sse(event) if event else KEEPALIVE
+        finally:
+            broker.unsubscribe(user.pk, subscription)
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def get_fleet(request):
+    """
+    Fleet-wide equipment totals for staff users, from the incrementally maintained aggregates
+    Returns: Totals, per-user and per-equipment-type counts and averages
+    """
+    return Response(cached_result('fleet', None, fleet_summary))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def get_metrics(request):
+    """
+    Operational metrics for staff users
+    Returns: Upload admission counters and current load, archive and result cache counters
+    """
+    return Response({
+        'admission': get_admission().metrics(),
+        'archive_cache': get_archive_cache().metrics(),
+        'result_cache': get_result_cache().metrics()
+    })
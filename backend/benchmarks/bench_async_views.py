@@ -0,0 +1,170 @@
+"""
+Benchmark: async (ASGI/uvicorn) vs sync (WSGI/gunicorn) read endpoints
+
+Starts one single-process server of each kind against a throwaway SQLite
+database, then drives /api/data/, /api/summary/ and /api/history/ with
+an increasing number of concurrent clients and reports throughput and
+latency percentiles.
+
+Requires the benchmark-only servers:
+    pip install uvicorn gunicorn
+
+Usage (from the backend directory):
+    python benchmarks/bench_async_views.py --rows 2000 --concurrency 10 100 300
+"""
+import argparse
+import asyncio
+import io
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ['/api/data/', '/api/summary/', '/api/history/']
+
+
+def setup_database(db_path, rows):
+    """Create a migrated database with one user, token and upload"""
+    os.environ['CHEMLIZER_DB_PATH'] = db_path
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    sys.path.insert(0, BACKEND_DIR)
+
+    import django
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+    from api.utils import ingest_csv
+
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user('bench', password='bench')
+    token = Token.objects.create(user=user)
+
+    lines = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+    types = ['Pump', 'Valve', 'Reactor', 'Heat Exchanger', 'Compressor']
+    for i in range(rows):
+        lines.append(f"Unit-{i},{types[i % len(types)]},{100 + i % 37}.5,{5 + i % 11}.2,{60 + i % 53}.0")
+    csv_file = io.BytesIO('\n'.join(lines).encode('utf-8'))
+    ingest_csv(user, csv_file, 'bench.csv')
+
+    return token.key
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, port, threads):
+    """Start a single-process WSGI or ASGI server"""
+    env = dict(os.environ)
+    if kind == 'asgi':
+        env['CHEMLIZER_ASYNC_VIEWS'] = '1'
+        cmd = [sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+               '--port', str(port), '--workers', '1', '--log-level', 'warning']
+    else:
+        env['CHEMLIZER_ASYNC_VIEWS'] = '0'
+        cmd = [sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+               '--bind', f'127.0.0.1:{port}', '--workers', '1', '--threads', str(threads),
+               '--log-level', 'warning']
+
+    process = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{kind} server did not start')
+
+
+async def fetch(port, path, token):
+    """Issue one GET over a fresh connection; return (status, seconds)"""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(
+        f'GET {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: Token {token}\r\n'
+        f'Connection: close\r\n\r\n'.encode('ascii')
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    status = int(status_line.split()[1]) if status_line else 0
+    return status, time.perf_counter() - start
+
+
+async def run_load(port, token, path, concurrency, duration):
+    """Keep `concurrency` requests in flight for `duration` seconds"""
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            try:
+                status, elapsed = await fetch(port, path, token)
+            except OSError:
+                errors += 1
+                continue
+            if status == 200:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000, help='rows in the benchmark upload')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 100, 300])
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per measurement')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads for the WSGI server')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        token = setup_database(os.path.join(tmp_dir, 'bench.sqlite3'), args.rows)
+
+        print(f"{'server':<6} {'endpoint':<15} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for kind in ('wsgi', 'asgi'):
+            port = free_port()
+            server = start_server(kind, port, args.threads)
+            try:
+                for path in ENDPOINTS:
+                    for concurrency in args.concurrency:
+                        latencies, errors, elapsed = asyncio.run(
+                            run_load(port, token, path, concurrency, args.duration)
+                        )
+                        print(
+                            f"{kind:<6} {path:<15} {concurrency:>5} {len(latencies) / elapsed:>8.1f} "
+                            f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+                            f"{percentile(latencies, 99) * 1000:>8.1f} {errors:>7}"
+                        )
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=10)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: PDF report rendering, in pages per second
+
+Ingests one upload per requested size into a throwaway SQLite database,
+then renders each upload's report
+  1. in this process, one after the other, and
+  2. through the report process pool, all sizes at once from concurrent
+     request threads (--concurrency copies of each),
+and reports pages, seconds and pages per second.
+
+Usage (from the backend directory):
+    python benchmarks/bench_reports.py --rows 1000 10000 50000 --workers 4 --concurrency 2
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TYPES = ['Pump', 'Valve', 'Reactor', 'Heat Exchanger', 'Compressor']
+
+
+def setup_database(tmp_dir, sizes):
+    """Create a migrated database with one upload per size; return their ids"""
+    os.environ['CHEMLIZER_DB_PATH'] = os.path.join(tmp_dir, 'bench.sqlite3')
+    os.environ['CHEMLIZER_MEDIA_ROOT'] = os.path.join(tmp_dir, 'media')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    sys.path.insert(0, BACKEND_DIR)
+
+    import django
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from api.utils import ingest_csv
+
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user('bench', password='bench')
+
+    upload_ids = []
+    for rows in sizes:
+        lines = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+        for i in range(rows):
+            lines.append(f"Unit-{i},{TYPES[i % len(TYPES)]},{100 + i % 37}.5,{5 + i % 11}.2,{60 + i % 53}.0")
+        upload, _ = ingest_csv(user, io.BytesIO('\n'.join(lines).encode('utf-8')), f'bench-{rows}.csv')
+        upload_ids.append(upload.id)
+    return upload_ids
+
+
+def count_pages(pdf):
+    return len(re.findall(rb'/Type /Page\b(?!s)', pdf))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 50000], help='upload sizes')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='report pool processes')
+    parser.add_argument('--concurrency', type=int, default=2, help='concurrent reports per upload size')
+    args = parser.parse_args()
+    if len(args.rows) > 5:
+        parser.error('at most 5 sizes (older uploads are retired)')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        upload_ids = setup_database(tmp_dir, args.rows)
+
+        from django.conf import settings
+        from api.report_pool import get_report_pool, render_report_file, render_upload_report
+
+        print(f"{'mode':<8} {'rows':>8} {'reports':>8} {'pages':>7} {'seconds':>8} {'pages/s':>8}")
+        serial_pages = serial_seconds = 0
+        for rows, upload_id in zip(args.rows, upload_ids):
+            start = time.perf_counter()
+            with open(render_report_file(upload_id), 'rb') as f:
+                pages = count_pages(f.read())
+            elapsed = time.perf_counter() - start
+            serial_pages += pages
+            serial_seconds += elapsed
+            print(f"{'serial':<8} {rows:>8} {1:>8} {pages:>7} {elapsed:>8.2f} {pages / elapsed:>8.1f}")
+
+        settings.REPORT_RENDER_WORKERS = args.workers
+        # Start the pool processes (and their Django setup) before timing
+        list(get_report_pool().map(int, range(args.workers)))
+
+        jobs = [upload_id for upload_id in upload_ids for _ in range(args.concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(jobs)) as threads:
+            paths = list(threads.map(render_upload_report, jobs))
+        elapsed = time.perf_counter() - start
+        pages = 0
+        for path in paths:
+            with open(path, 'rb') as f:
+                pages += count_pages(f.read())
+        get_report_pool().shutdown()
+
+        print(f"{'pool':<8} {'all':>8} {len(jobs):>8} {pages:>7} {elapsed:>8.2f} {pages / elapsed:>8.1f}")
+        print(f"\nserial {serial_pages / serial_seconds:.1f} pages/s; "
+              f"pool of {args.workers} processes {pages / elapsed:.1f} pages/s")
+
+
+if __name__ == '__main__':
+    main()
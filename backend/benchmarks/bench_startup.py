@@ -0,0 +1,79 @@
+"""
+Benchmark: backend worker boot time
+
+Boots a fresh interpreter the way a WSGI worker does (settings, apps,
+WSGI handler and URLconf, which imports every view module) several times
+and reports the wall-clock boot time. The last run is repeated under
+``python -X importtime`` to list the slowest imports and to check that
+heavy optional subsystems (ReportLab, pandas, pyarrow) stay unloaded
+until used.
+
+Usage (from the backend directory):
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT_CODE = (
+    "import os, sys\n"
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')\n"
+    "from config.wsgi import application\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+    "print(' '.join(m for m in ('reportlab', 'pyarrow', 'pandas') if m in sys.modules))\n"
+)
+
+
+def boot_once(extra_args=()):
+    """Run one worker boot; return (seconds, stdout, stderr)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *extra_args, '-c', BOOT_CODE],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return time.perf_counter() - start, result.stdout, result.stderr
+
+
+def parse_importtime(stderr):
+    """Return [(cumulative_us, module)] for top-level imports in -X importtime output"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under their parent; keep the top level only
+        if name[1:].startswith(' '):
+            continue
+        imports.append((int(cumulative), name.strip()))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='boots to time')
+    parser.add_argument('--top', type=int, default=10, help='slowest top-level imports to list')
+    args = parser.parse_args()
+
+    boot_once()  # Warm the filesystem cache and bytecode
+
+    times = [boot_once()[0] for _ in range(args.runs)]
+    print(f"worker boot over {args.runs} runs: median {statistics.median(times) * 1000:.0f} ms, "
+          f"min {min(times) * 1000:.0f} ms, max {max(times) * 1000:.0f} ms")
+
+    _, stdout, stderr = boot_once(('-X', 'importtime'))
+    loaded = stdout.strip()
+    print(f"heavy modules loaded at boot: {loaded or 'none'}")
+
+    print("\nslowest top-level imports (cumulative, -X importtime):")
+    for cumulative, name in sorted(parse_importtime(stderr), reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
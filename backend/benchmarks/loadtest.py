@@ -0,0 +1,287 @@
+"""
+Load test: simulated concurrent users against a local backend
+
+Starts a WSGI (gunicorn) and/or ASGI (uvicorn) server on a throwaway
+database and media directory, logs in N synthetic users through
+/api/auth/login/, then has every user issue a weighted random mix of
+/api/upload/, /api/data/, /api/summary/, /api/history/ and /api/report/
+calls, with a random think time between calls, for a fixed duration.
+Reports throughput, p50/p95/p99 latency, error rate and admission
+rejections (429) per endpoint.
+
+Scenarios (--scenario):
+    dashboard   viewers paging data and refreshing summaries and history
+    uploaders   users uploading files and checking the result
+    reports     users downloading PDF reports
+    mixed       mostly dashboard reads with some uploads and reports
+
+Running a scenario with --servers wsgi asgi (the default) compares the two
+deployments under the same load. --mix overrides a scenario's weights.
+
+Requires the benchmark-only servers:
+    pip install uvicorn gunicorn
+
+Usage (from the backend directory):
+    python benchmarks/loadtest.py --scenario dashboard --users 100
+    python benchmarks/loadtest.py --scenario mixed --users 20 --mix upload=1 report=0 --servers asgi
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+from bench_async_views import BACKEND_DIR, free_port, percentile, start_server
+
+PASSWORD = 'loadtest'
+TYPES = ['Pump', 'Valve', 'Reactor', 'Heat Exchanger', 'Compressor']
+
+# Endpoint name -> (method, path)
+ENDPOINTS = {
+    'upload': ('POST', '/api/upload/'),
+    'data': ('GET', '/api/data/'),
+    'summary': ('GET', '/api/summary/'),
+    'history': ('GET', '/api/history/'),
+    'report': ('GET', '/api/report/'),
+}
+
+# Endpoint weights and mean think time (seconds) between a user's calls
+SCENARIOS = {
+    'dashboard': {'mix': {'data': 4, 'summary': 3, 'history': 3}, 'think': 0.5},
+    'uploaders': {'mix': {'upload': 3, 'summary': 1, 'history': 1}, 'think': 1.0},
+    'reports': {'mix': {'report': 2, 'summary': 1, 'history': 1}, 'think': 1.0},
+    'mixed': {'mix': {'upload': 1, 'data': 6, 'summary': 5, 'history': 5, 'report': 1}, 'think': 0.5},
+}
+
+
+def make_csv(rows, prefix):
+    lines = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+    for i in range(rows):
+        lines.append(f"{prefix}-{i},{TYPES[i % len(TYPES)]},{100 + i % 37}.5,{5 + i % 11}.2,{60 + i % 53}.0")
+    return '\n'.join(lines).encode('utf-8')
+
+
+def setup_database(db_path, media_root, users, rows):
+    """Create a migrated database with `users` users holding one upload each"""
+    os.environ['CHEMLIZER_DB_PATH'] = db_path
+    os.environ['CHEMLIZER_MEDIA_ROOT'] = media_root
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    sys.path.insert(0, BACKEND_DIR)
+
+    import django
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from api.utils import ingest_csv
+
+    call_command('migrate', verbosity=0)
+    usernames = []
+    for i in range(users):
+        user = User.objects.create_user(f'loaduser{i}', password=PASSWORD)
+        ingest_csv(user, io.BytesIO(make_csv(rows, 'Seed')), 'seed.csv')
+        usernames.append(user.username)
+    return usernames
+
+
+def multipart(field, filename, content):
+    """Encode one file as a multipart/form-data body; return (content_type, body)"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f'Content-Type: text/csv\r\n\r\n'
+    ).encode('ascii') + content + f'\r\n--{boundary}--\r\n'.encode('ascii')
+    return f'multipart/form-data; boundary={boundary}', body
+
+
+async def request(port, method, path, token=None, body=b'', content_type=None):
+    """Issue one request over a fresh connection; return (status, response body)"""
+    headers = [f'{method} {path} HTTP/1.1', 'Host: localhost', 'Connection: close']
+    if token:
+        headers.append(f'Authorization: Token {token}')
+    if body:
+        headers += [f'Content-Type: {content_type}', f'Content-Length: {len(body)}']
+
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('ascii') + body)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    status_line, _, rest = response.partition(b'\r\n')
+    status = int(status_line.split()[1]) if status_line else 0
+    return status, rest.partition(b'\r\n\r\n')[2]
+
+
+async def login(port, username):
+    status, body = await request(
+        port, 'POST', '/api/auth/login/',
+        body=json.dumps({'username': username, 'password': PASSWORD}).encode('utf-8'),
+        content_type='application/json'
+    )
+    if status != 200:
+        raise RuntimeError(f'login of {username} failed with HTTP {status}')
+    return json.loads(body)['token']
+
+
+class Stats:
+    """Per endpoint latencies of successful calls, errors and 429 rejections"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.rejected = defaultdict(int)
+
+    def record(self, endpoint, status, elapsed):
+        if 200 <= status < 300:
+            self.latencies[endpoint].append(elapsed)
+        elif status == 429:
+            self.rejected[endpoint] += 1
+        else:
+            self.errors[endpoint] += 1
+
+
+async def run_user(port, token, number, mix, think, stop_at, upload_rows, timeout, stats, rng):
+    """Call endpoints picked from `mix` until `stop_at`, thinking between calls"""
+    names, weights = zip(*mix.items())
+    # Spread the users' first calls over one think time
+    await asyncio.sleep(rng.uniform(0, think))
+    calls = 0
+    while time.perf_counter() < stop_at:
+        endpoint = rng.choices(names, weights)[0]
+        method, path = ENDPOINTS[endpoint]
+        body, content_type = b'', None
+        if endpoint == 'upload':
+            calls += 1
+            content_type, body = multipart('file', f'load-{number}-{calls}.csv',
+                                           make_csv(upload_rows, f'U{number}-{calls}'))
+
+        start = time.perf_counter()
+        try:
+            status, _ = await asyncio.wait_for(request(port, method, path, token, body, content_type), timeout)
+        except (OSError, asyncio.TimeoutError):
+            status = 0
+        stats.record(endpoint, status, time.perf_counter() - start)
+        if think:
+            await asyncio.sleep(rng.expovariate(1 / think))
+
+
+async def run_scenario(port, usernames, mix, think, duration, upload_rows, timeout, seed):
+    """Log every user in, then run them all for `duration` seconds"""
+    started = time.perf_counter()
+    tokens = await asyncio.gather(*(login(port, username) for username in usernames))
+    login_seconds = time.perf_counter() - started
+
+    stats = Stats()
+    started = time.perf_counter()
+    stop_at = started + duration
+    await asyncio.gather(*(
+        run_user(port, token, number, mix, think, stop_at, upload_rows, timeout, stats,
+                 random.Random(seed + number))
+        for number, token in enumerate(tokens)
+    ))
+    # Calls still in flight at the deadline are waited for and counted
+    return stats, time.perf_counter() - started, login_seconds
+
+
+def print_report(kind, stats, elapsed, mix):
+    for endpoint in [name for name in ENDPOINTS if name in mix] + ['total']:
+        if endpoint == 'total':
+            latencies = [value for values in stats.latencies.values() for value in values]
+            errors, rejected = sum(stats.errors.values()), sum(stats.rejected.values())
+        else:
+            latencies = stats.latencies[endpoint]
+            errors, rejected = stats.errors[endpoint], stats.rejected[endpoint]
+        calls = len(latencies) + errors + rejected
+        print(
+            f"{kind:<6} {endpoint:<8} {calls:>7} {len(latencies) / elapsed:>8.1f} "
+            f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+            f"{percentile(latencies, 99) * 1000:>8.1f} {errors * 100 / max(calls, 1):>6.1f}% {rejected:>6}"
+        )
+
+
+def parse_mix(values):
+    """Parse ['upload=1', 'data=4'] into {'upload': 1.0, 'data': 4.0}"""
+    mix = {}
+    for value in values:
+        endpoint, _, weight = value.partition('=')
+        if endpoint not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{endpoint}' (choose from {', '.join(ENDPOINTS)})")
+        mix[endpoint] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=SCENARIOS, default='mixed')
+    parser.add_argument('--mix', nargs='+', default=[], metavar='ENDPOINT=WEIGHT',
+                        help="override scenario weights, e.g. upload=1 report=0")
+    parser.add_argument('--servers', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+    parser.add_argument('--users', type=int, default=20, help='synthetic users')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of load per server')
+    parser.add_argument('--think', type=float, help="mean seconds between a user's calls (default: the scenario's)")
+    parser.add_argument('--rows', type=int, default=2000, help="rows in each user's seed upload")
+    parser.add_argument('--upload-rows', type=int, default=500, help='rows in each uploaded file')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds before a call counts as an error')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads for the WSGI server')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the call sequences')
+    args = parser.parse_args()
+
+    scenario = SCENARIOS[args.scenario]
+    try:
+        mix = {**scenario['mix'], **parse_mix(args.mix)}
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    mix = {endpoint: weight for endpoint, weight in mix.items() if weight > 0}
+    if not mix:
+        parser.error('the endpoint mix is empty')
+    think = scenario['think'] if args.think is None else args.think
+
+    print(f"scenario {args.scenario}: {args.users} users, think {think}s, "
+          f"mix {', '.join(f'{endpoint}={weight:g}' for endpoint, weight in mix.items())}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Each server gets a fresh copy of the seeded database, so uploads from
+        # an earlier run do not change what the next one serves
+        template = os.path.join(tmp_dir, 'template.sqlite3')
+        template_media = os.path.join(tmp_dir, 'media')
+        usernames = setup_database(template, template_media, args.users, args.rows)
+
+        for kind in args.servers:
+            db_path = os.path.join(tmp_dir, f'{kind}.sqlite3')
+            media_root = os.path.join(tmp_dir, f'{kind}-media')
+            with open(template, 'rb') as src, open(db_path, 'wb') as dst:
+                dst.write(src.read())
+            if os.path.isdir(template_media):
+                shutil.copytree(template_media, media_root)
+            os.environ['CHEMLIZER_DB_PATH'] = db_path
+            os.environ['CHEMLIZER_MEDIA_ROOT'] = media_root
+
+            port = free_port()
+            server = start_server(kind, port, args.threads)
+            try:
+                stats, elapsed, login_seconds = asyncio.run(run_scenario(
+                    port, usernames, mix, think, args.duration, args.upload_rows, args.timeout, args.seed
+                ))
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=10)
+
+            print(f"\n{kind}: {len(usernames)} logins in {login_seconds:.2f}s, measured {elapsed:.1f}s")
+            print(f"{'server':<6} {'endpoint':<8} {'calls':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                  f"{'p99 ms':>8} {'errors':>7} {'429':>6}")
+            print_report(kind, stats, elapsed, mix)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +78,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Serve the read endpoints (data, summary, history) with native async views.
+# config/asgi.py turns this on; WSGI deployments keep the sync DRF views.
+ASYNC_READ_VIEWS = os.environ.get('CHEMLIZER_ASYNC_VIEWS', '0') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -83,7 +89,7 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('CHEMLIZER_DB_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
@@ -126,7 +132,131 @@ STATIC_URL = 'static/'
 
 # Media files (for CSV uploads and PDF reports)
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_ROOT = Path(os.environ.get('CHEMLIZER_MEDIA_ROOT', BASE_DIR / 'media'))
+
+# Resumable chunked uploads
+CHUNKED_UPLOAD_DIR = MEDIA_ROOT / 'chunked_uploads'
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8 MB
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 64 * 1024 * 1024  # 64 MB
+CHUNKED_UPLOAD_EXPIRY_HOURS = 24
+
+# Memory-mapped numeric columns of each upload, used by the analytics endpoints
+COLUMNAR_STORAGE_DIR = MEDIA_ROOT / 'columnar'
+
+# Retention beyond each user's latest 5 uploads: 'delete' removes old
+# uploads, 'archive' moves their equipment rows to compressed Parquet files
+# and keeps the summary row. Archived uploads are rehydrated on request and
+# the most recently used ones are kept in memory.
+UPLOAD_RETENTION_MODE = 'archive'
+UPLOAD_ARCHIVE_DIR = MEDIA_ROOT / 'archive'
+UPLOAD_ARCHIVE_CACHE_SIZE = 8
+
+# Derived results (upload summaries, PDF reports, fleet totals) are cached in
+# the 'results' cache. locmem keeps them per process, bounded by
+# RESULT_CACHE_MAX_BYTES of pickled values; set CHEMLIZER_RESULT_CACHE to a
+# directory or a redis:// URL to share them between workers. Reports are kept
+# as files under REPORT_STORAGE_DIR and only their paths are cached.
+# Concurrent misses of a result compute it once; a computation holds its key
+# for at most RESULT_CACHE_LOCK_TIMEOUT seconds before waiters give up and
+# compute it too.
+RESULT_CACHE_LOCATION = os.environ.get('CHEMLIZER_RESULT_CACHE', '')
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64 MB per process
+if RESULT_CACHE_LOCATION.startswith('redis://'):
+    RESULT_CACHE_BACKEND = 'django.core.cache.backends.redis.RedisCache'
+    # Redis passes OPTIONS on to its connection pool; memory is bounded by maxmemory
+    RESULT_CACHE_OPTIONS = {}
+elif RESULT_CACHE_LOCATION:
+    RESULT_CACHE_BACKEND = 'django.core.cache.backends.filebased.FileBasedCache'
+    RESULT_CACHE_OPTIONS = {'MAX_ENTRIES': 2000}
+else:
+    RESULT_CACHE_BACKEND = 'api.cache_backends.ByteLimitedLocMemCache'
+    RESULT_CACHE_OPTIONS = {'MAX_ENTRIES': 2000, 'MAX_BYTES': RESULT_CACHE_MAX_BYTES}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'results': {
+        'BACKEND': RESULT_CACHE_BACKEND,
+        'LOCATION': RESULT_CACHE_LOCATION or 'chemlizer-results',
+        'TIMEOUT': 24 * 3600,
+        'OPTIONS': RESULT_CACHE_OPTIONS,
+    },
+}
+RESULT_CACHE_ALIAS = 'results'
+RESULT_CACHE_LOCK_TIMEOUT = 30
+
+# PDF reports render in a pool of REPORT_RENDER_WORKERS processes, so a big
+# report doesn't hold the GIL of the worker serving other requests (0 renders
+# in the request thread). A report that takes longer than
+# REPORT_RENDER_TIMEOUT seconds is answered with 503.
+REPORT_RENDER_WORKERS = 2
+REPORT_RENDER_TIMEOUT = 300
+# Rendered reports, one file per upload; the result cache holds their paths
+REPORT_STORAGE_DIR = MEDIA_ROOT / 'reports'
+
+# Percentiles reported with every summary (read from the upload's quantile
+# sketches; /api/percentiles/ answers arbitrary ones)
+SUMMARY_PERCENTILES = [50, 95]
+
+# Preview samples taken at ingest for /api/data/?sample=N: a uniform sample
+# of UPLOAD_SAMPLE_SIZE rows, plus up to UPLOAD_SAMPLE_PER_TYPE rows of every
+# equipment type for stratified samples
+UPLOAD_SAMPLE_SIZE = 1000
+UPLOAD_SAMPLE_PER_TYPE = 200
+
+# Rows returned with /api/dashboard/ (the rest is paged through /api/data/)
+DASHBOARD_PAGE_SIZE = 1000
+DASHBOARD_MAX_PAGE_SIZE = 10000
+
+# Upload admission control: concurrent ingests (parse + save) allowed
+# globally and per user, and how many more requests may queue for a slot
+# before they are turned away with 429 + Retry-After
+UPLOAD_MAX_CONCURRENT_INGESTS = 4
+UPLOAD_MAX_CONCURRENT_INGESTS_PER_USER = 1
+UPLOAD_ADMISSION_QUEUE_SIZE = 8
+UPLOAD_ADMISSION_QUEUE_SIZE_PER_USER = 2
+UPLOAD_ADMISSION_TIMEOUT_SECONDS = 30
+
+# Upload limits, enforced while the upload streams in
+UPLOAD_MAX_FILE_SIZE = 2 * 1024 * 1024 * 1024  # 2 GB as sent (possibly compressed)
+UPLOAD_MAX_ROWS = 5000000
+
+# Row validation at ingest: allowed (min, max) per numeric column (None
+# leaves a side open), how many line numbers the error report lists per
+# check, and whether a file with invalid rows is rejected or ingested without
+# them (overridable per upload with ?skip_invalid_rows=)
+UPLOAD_VALUE_RANGES = {
+    'Flowrate': (0, None),
+    'Pressure': (0, None),
+    'Temperature': (-273.15, None),
+}
+UPLOAD_VALIDATION_MAX_REPORTED_ROWS = 20
+UPLOAD_SKIP_INVALID_ROWS = False
+
+# Idempotency-Key on upload requests: how long a key's result is kept, the
+# lease a running request renews on its key (a key whose lease ran out is
+# taken over by the next retry), and the Retry-After sent with the 409 for a
+# repeat of a key that is still being ingested
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+IDEMPOTENCY_LEASE_SECONDS = 60
+IDEMPOTENCY_RETRY_AFTER_SECONDS = 5
+
+FILE_UPLOAD_HANDLERS = [
+    'api.admission.UploadSizeLimitHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Server-sent events (/api/events/): broker class, heartbeat interval and
+# maximum stream lifetime (clients reconnect with Last-Event-ID)
+EVENTS_BROKER = 'api.events.InMemoryBroker'
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_STREAM_MAX_SECONDS = 300
+# Seconds a stream ticket (/api/events/ticket/) can be used to open a stream
+EVENT_STREAM_TICKET_MAX_AGE = 60
+
+# Robust z-score above which equipment is flagged as anomalous at ingest
+ANOMALY_Z_THRESHOLD = 3.5
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -0,0 +1,91 @@
+"""
+Benchmark: desktop cold start (time to login window)
+
+Launches the app in a fresh interpreter several times and measures the
+wall-clock time from process start until the login dialog is visible. The
+last run is repeated under ``python -X importtime`` to list the slowest
+imports and to check that matplotlib stays unloaded until the Charts tab
+is opened.
+
+Runs headless by default (QT_QPA_PLATFORM=offscreen).
+
+Usage (from the frontend-desktop directory):
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DESKTOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_CODE = (
+    "import sys\n"
+    "from PyQt5.QtWidgets import QApplication\n"
+    "app = QApplication(sys.argv)\n"
+    "from ui.main_window import MainWindow\n"
+    "window = MainWindow()\n"
+    "app.processEvents()\n"
+    "assert window.login_dialog.isVisible()\n"
+    "loaded = [m for m in ('matplotlib',) if m in sys.modules]\n"
+    "print('ready', *loaded, flush=True)\n"
+)
+
+
+def start_once(extra_args=()):
+    """Start the app once; return (seconds to login window, heavy modules loaded, stderr)"""
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, *extra_args, '-c', STARTUP_CODE],
+        cwd=DESKTOP_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    first_line = process.stdout.readline().split()
+    elapsed = time.perf_counter() - start
+    _, stderr = process.communicate()
+
+    if first_line[:1] != ['ready']:
+        raise RuntimeError(f'App did not start:\n{stderr}')
+    return elapsed, first_line[1:], stderr
+
+
+def parse_importtime(stderr):
+    """Return [(cumulative_us, module)] for top-level imports in -X importtime output"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under their parent; keep the top level only
+        if name[1:].startswith(' '):
+            continue
+        imports.append((int(cumulative), name.strip()))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='cold starts to time')
+    parser.add_argument('--top', type=int, default=10, help='slowest top-level imports to list')
+    args = parser.parse_args()
+
+    start_once()  # Warm the filesystem cache and bytecode
+
+    times = [start_once()[0] for _ in range(args.runs)]
+    print(f"time to login window over {args.runs} runs: median {statistics.median(times) * 1000:.0f} ms, "
+          f"min {min(times) * 1000:.0f} ms, max {max(times) * 1000:.0f} ms")
+
+    _, loaded, stderr = start_once(('-X', 'importtime'))
+    print(f"heavy modules loaded at startup: {' '.join(loaded) or 'none'}")
+
+    print("\nslowest top-level imports (cumulative, -X importtime):")
+    for cumulative, name in sorted(parse_importtime(stderr), reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
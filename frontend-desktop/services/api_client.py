@@ -4,19 +4,148 @@ Handles all communication with the Django backend
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+import gzip
+import hashlib
 import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
 
 API_BASE_URL = 'http://localhost:8000/api'
 
+# Files larger than this go through the resumable chunked upload API
+CHUNKED_UPLOAD_THRESHOLD = 16 * 1024 * 1024  # 16 MB
+CHUNK_SIZE = 8 * 1024 * 1024  # 8 MB
+CHUNK_RETRIES = 5
+# (connect, read) timeout of the chunked upload's requests, so a half-open
+# connection fails and the upload resumes instead of hanging
+CHUNK_TIMEOUT = (10, 120)
+# How often an upload turned away with 429 (server busy) is retried
+ADMISSION_RETRIES = 5
+MAX_RETRY_AFTER = 60
+# Ingest requests that time out or lose their connection are resent with the
+# same Idempotency-Key, so the server replays the result instead of re-ingesting
+UPLOAD_RETRIES = 3
+INGEST_TIMEOUT = (10, 300)
+# Files uploaded at once by the upload queue; also the starting cap on
+# concurrent ingest requests, which adapts to the server's admission limits
+UPLOAD_CONCURRENCY = 4
+# Plain CSVs are gzipped before upload; level 1 is fast and still shrinks CSVs several-fold
+UPLOAD_GZIP_LEVEL = 1
+# Uploads with more records than this open on a stratified random sample of
+# this many rows; the full data is fetched when the user asks for it
+PREVIEW_SAMPLE_SIZE = 1000
+# Records per /api/data/ request when loading a whole upload
+DATA_PAGE_SIZE = 5000
+# The event stream sends a keepalive every 15 s, so a longer silence means a dead connection
+EVENT_STREAM_READ_TIMEOUT = 60
+
+
+
+class UploadCancelled(Exception):
+    """Raised inside an upload whose cancel event was set"""
+    
+    def __init__(self):
+        super().__init__("Upload cancelled")
+
+
+class IngestLimiter:
+    """
+    Client-side cap on concurrent ingest requests
+    
+    Starts at UPLOAD_CONCURRENCY. A 429 (server busy) halves it, down to
+    one, and every accepted ingest raises it by one again, so concurrent
+    uploads settle at what the server's admission control lets in instead
+    of piling up retries. File bytes (chunks) are not limited.
+    """
+    
+    def __init__(self, limit):
+        self.max_limit = limit
+        self.limit = limit
+        self.active = 0
+        self._condition = threading.Condition()
+    
+    def acquire(self, cancel_event=None):
+        with self._condition:
+            while self.active >= self.limit:
+                self._condition.wait(0.5)
+                if cancel_event is not None and cancel_event.is_set():
+                    raise UploadCancelled()
+            self.active += 1
+    
+    def throttle(self):
+        with self._condition:
+            self.limit = max(1, self.limit // 2)
+    
+    def release(self, accepted):
+        with self._condition:
+            self.active -= 1
+            if accepted:
+                self.limit = min(self.max_limit, self.limit + 1)
+            self._condition.notify_all()
+
+
+def _pause(seconds, cancel_event=None):
+    """Sleep, raising UploadCancelled as soon as the upload is cancelled"""
+    if cancel_event is None:
+        time.sleep(seconds)
+    elif cancel_event.wait(seconds):
+        raise UploadCancelled()
+
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise UploadCancelled()
+
+
+def _is_bad_chunk(response):
+    """Whether a chunk was refused for its size or checksum (the server rolled it back)"""
+    if response.status_code != 400:
+        return False
+    try:
+        # Such refusals carry the upload's state, other 400s only an error
+        return 'offset' in response.json()
+    except ValueError:
+        return False
+
+
+def abort_stream(response):
+    """
+    Unblock a thread reading a streaming response, from another thread
+    
+    response.close() waits for the reader to let go of the connection, so the
+    socket is shut down instead; the reader then sees the stream end.
+    """
+    connection = getattr(response.raw, 'connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # Already closed
+
+
 class APIClient:
     def __init__(self):
         self.token = None
         self.username = None
+        self.offline = False
+        # One keep-alive connection pool shared by every request, sized for the upload queue
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=UPLOAD_CONCURRENCY + 2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.ingest_limiter = IngestLimiter(UPLOAD_CONCURRENCY)
     
     def login(self, username, password):
         """Authenticate user and store token"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f'{API_BASE_URL}/auth/login/',
                 json={'username': username, 'password': password}
             )
@@ -24,7 +153,11 @@ class APIClient:
             data = response.json()
             self.token = data['token']
             self.username = data['username']
+            self.offline = False
             return True, "Login successful"
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            self.offline = True
+            return False, f"Backend unreachable: {e}"
         except requests.exceptions.RequestException as e:
             return False, str(e)
     
@@ -35,26 +168,202 @@ class APIClient:
             headers['Authorization'] = f'Token {self.token}'
         return headers
     
-    def upload_csv(self, file_path):
-        """Upload CSV file"""
+    def upload_csv(self, file_path, progress_callback=None, cancel_event=None):
+        """
+        Upload CSV file
+        
+        Plain .csv files are gzipped first; already compressed files
+        (.csv.gz, .csv.bz2, .csv.zst) are sent as they are. Files above
+        CHUNKED_UPLOAD_THRESHOLD are sent through the resumable chunked
+        upload API. progress_callback(sent_bytes, total_bytes) is called
+        as bytes are acknowledged by the server. One Idempotency-Key is
+        used for all retries of this upload. Setting cancel_event (a
+        threading.Event) stops the upload between chunks and retries.
+        """
         try:
-            with open(file_path, 'rb') as f:
-                files = {'file': f}
-                response = requests.post(
+            filename = os.path.basename(file_path)
+            idempotency_key = str(uuid.uuid4())
+            if filename.lower().endswith('.csv'):
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    gz_path = os.path.join(tmp_dir, filename + '.gz')
+                    with open(file_path, 'rb') as src, gzip.open(gz_path, 'wb', compresslevel=UPLOAD_GZIP_LEVEL) as dst:
+                        for block in iter(lambda: src.read(1024 * 1024), b''):
+                            _check_cancelled(cancel_event)
+                            dst.write(block)
+                    return True, self._upload_file(gz_path, idempotency_key, progress_callback, cancel_event)
+            
+            return True, self._upload_file(file_path, idempotency_key, progress_callback, cancel_event)
+        except Exception as e:
+            return False, str(e)
+    
+    def _ingest_headers(self, idempotency_key):
+        headers = self._get_headers()
+        headers['Idempotency-Key'] = idempotency_key
+        return headers
+    
+    def _upload_file(self, file_path, idempotency_key, progress_callback=None, cancel_event=None):
+        """Upload a file as one multipart request, or in chunks above the threshold"""
+        total_size = os.path.getsize(file_path)
+        if total_size > CHUNKED_UPLOAD_THRESHOLD:
+            return self._upload_chunked(file_path, total_size, idempotency_key, progress_callback, cancel_event)
+        
+        with open(file_path, 'rb') as f:
+            def send():
+                f.seek(0)
+                return self.session.post(
                     f'{API_BASE_URL}/upload/',
-                    files=files,
-                    headers=self._get_headers()
+                    files={'file': (os.path.basename(file_path), f)},
+                    headers=self._ingest_headers(idempotency_key),
+                    timeout=INGEST_TIMEOUT
                 )
-                response.raise_for_status()
-                return True, response.json()
+            result = self._send_ingest(send, cancel_event)
+        if progress_callback:
+            progress_callback(total_size, total_size)
+        return result
+    
+    def _send_ingest(self, send, cancel_event=None):
+        """
+        Run an ingest request until it gets a final answer
+        
+        429 (server busy) and 409 with Retry-After (the same Idempotency-Key
+        is still being ingested) are waited out as Retry-After says. Timeouts
+        and dropped connections are resent; the Idempotency-Key makes the
+        server return the original result rather than ingest the file twice.
+        At most ingest_limiter.limit ingest requests are in flight at once.
+        """
+        self.ingest_limiter.acquire(cancel_event)
+        waits = failures = 0
+        try:
+            while True:
+                _check_cancelled(cancel_event)
+                try:
+                    response = send()
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    failures += 1
+                    if failures > UPLOAD_RETRIES:
+                        raise
+                    _pause(min(2 ** failures, 30), cancel_event)
+                    continue
+                
+                retry_after = response.headers.get('Retry-After', '')
+                if response.status_code == 429:
+                    self.ingest_limiter.throttle()
+                busy = response.status_code == 429 or (response.status_code == 409 and retry_after)
+                if not busy or waits == ADMISSION_RETRIES:
+                    break
+                waits += 1
+                _pause(min(int(retry_after) if retry_after.isdigit() else 5, MAX_RETRY_AFTER), cancel_event)
+        finally:
+            self.ingest_limiter.release(accepted=waits == 0 and failures == 0)
+        response.raise_for_status()
+        return response.json()
+    
+    def _upload_chunked(self, file_path, total_size, idempotency_key, progress_callback=None, cancel_event=None):
+        """Upload a file chunk by chunk, resuming from the server's offset after failures"""
+        response = self.session.post(
+            f'{API_BASE_URL}/upload/chunked/',
+            json={
+                'filename': os.path.basename(file_path),
+                'total_size': total_size,
+                'chunk_size': CHUNK_SIZE
+            },
+            headers=self._get_headers(),
+            timeout=CHUNK_TIMEOUT
+        )
+        response.raise_for_status()
+        state = response.json()
+        upload_url = f"{API_BASE_URL}/upload/chunked/{state['upload_id']}"
+        
+        failures = 0
+        with open(file_path, 'rb') as f:
+            while state['offset'] < total_size:
+                _check_cancelled(cancel_event)
+                f.seek(state['offset'])
+                chunk = f.read(state['chunk_size'])
+                headers = self._get_headers()
+                headers['Content-Type'] = 'application/octet-stream'
+                headers['Chunk-Checksum'] = hashlib.sha256(chunk).hexdigest()
+                
+                try:
+                    response = self.session.put(
+                        f"{upload_url}/chunks/{state['next_chunk']}/",
+                        data=chunk,
+                        headers=headers,
+                        timeout=CHUNK_TIMEOUT
+                    )
+                    if response.status_code != 409:
+                        # 409 carries the server's offset; anything else must be a success
+                        response.raise_for_status()
+                    state = response.json()
+                    failures = 0
+                except (requests.exceptions.ConnectionError,
+                        requests.exceptions.Timeout,
+                        requests.exceptions.HTTPError) as e:
+                    # Retry dropped connections, server errors and chunks the server
+                    # refused as corrupt or truncated; other client errors are final
+                    retryable = e.response is None or e.response.status_code >= 500 or _is_bad_chunk(e.response)
+                    failures += 1
+                    if failures > CHUNK_RETRIES or not retryable:
+                        raise
+                    _pause(min(2 ** failures, 30), cancel_event)
+                    state = self._chunked_upload_status(upload_url, state)
+                
+                if progress_callback:
+                    progress_callback(state['offset'], total_size)
+        
+        return self._send_ingest(lambda: self.session.post(
+            f'{upload_url}/complete/',
+            headers=self._ingest_headers(idempotency_key),
+            timeout=INGEST_TIMEOUT
+        ), cancel_event)
+    
+    def _chunked_upload_status(self, upload_url, fallback):
+        """Ask the server how much of a chunked upload it has received"""
+        try:
+            response = self.session.get(f'{upload_url}/', headers=self._get_headers(), timeout=CHUNK_TIMEOUT)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException:
+            return fallback
+    
+    def get_data(self, upload_id=None, offset=None, limit=None, after=None, ordering=None):
+        """
+        Get equipment data (of the latest upload unless upload_id is given)
+        
+        Without a limit every record comes back at once. With one, pass the
+        page's next_cursor as after to get the following page.
+        """
+        params = {}
+        if upload_id is not None:
+            params['upload_id'] = upload_id
+        if offset:
+            params['offset'] = offset
+        if limit is not None:
+            params['limit'] = limit
+        if after is not None:
+            params['after'] = after
+        if ordering:
+            params['ordering'] = ordering
+        try:
+            response = self.session.get(
+                f'{API_BASE_URL}/data/',
+                params=params,
+                headers=self._get_headers()
+            )
+            response.raise_for_status()
+            return True, response.json()
         except Exception as e:
             return False, str(e)
     
-    def get_data(self):
-        """Get equipment data"""
+    def get_sample(self, upload_id=None, size=PREVIEW_SAMPLE_SIZE):
+        """Get a random sample of an upload's records, stratified by equipment type"""
+        params = {'sample': size, 'stratify': 'equipment_type'}
+        if upload_id is not None:
+            params['upload_id'] = upload_id
         try:
-            response = requests.get(
+            response = self.session.get(
                 f'{API_BASE_URL}/data/',
+                params=params,
                 headers=self._get_headers()
             )
             response.raise_for_status()
@@ -62,10 +371,65 @@ class APIClient:
         except Exception as e:
             return False, str(e)
     
+    def get_preview(self, upload_id, total_count):
+        """
+        Get the records to show first for an upload
+        
+        All of them up to PREVIEW_SAMPLE_SIZE records, else a stratified sample.
+        Returns (success, {'data', 'count', 'preview'}) or (False, error).
+        """
+        preview = total_count > PREVIEW_SAMPLE_SIZE
+        success, result = self.get_sample(upload_id) if preview else self.get_data(upload_id)
+        if not success:
+            return False, result
+        return True, {'data': result.get('data', []), 'count': result.get('count', 0), 'preview': preview}
+    
+    def get_dashboard(self, sections=None):
+        """Get summary, history and the first page of data in one request"""
+        params = {'sections': ','.join(sections)} if sections else {}
+        try:
+            response = self.session.get(
+                f'{API_BASE_URL}/dashboard/',
+                params=params,
+                headers=self._get_headers()
+            )
+            response.raise_for_status()
+            return True, response.json()
+        except Exception as e:
+            return False, str(e)
+    
+    def get_dataset(self):
+        """
+        Get the latest upload's summary and the records to show first
+        
+        One dashboard request. Uploads with rows past its first page are
+        previewed with a stratified sample instead ('preview' is set), and
+        their full data is left to get_data().
+        Returns (success, {'upload_id', 'data', 'summary', 'count', 'preview'}) or (False, error).
+        """
+        success, result = self.get_dashboard(('summary', 'data'))
+        if not success:
+            return False, result
+        
+        dataset = {
+            'upload_id': result.get('upload_id'),
+            'data': result.get('data', []),
+            'summary': result.get('summary') or {},
+            'count': result.get('data_count', 0),
+            'preview': False
+        }
+        if dataset['count'] > len(dataset['data']):
+            success, sample = self.get_sample(dataset['upload_id'])
+            if not success:
+                return False, sample
+            dataset['data'] = sample.get('data', [])
+            dataset['preview'] = True
+        return True, dataset
+    
     def get_summary(self):
         """Get summary statistics"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f'{API_BASE_URL}/summary/',
                 headers=self._get_headers()
             )
@@ -74,10 +438,66 @@ class APIClient:
         except Exception as e:
             return False, str(e)
     
+    def get_history(self):
+        """Get upload history"""
+        try:
+            response = self.session.get(
+                f'{API_BASE_URL}/history/',
+                headers=self._get_headers()
+            )
+            response.raise_for_status()
+            return True, response.json()
+        except Exception as e:
+            return False, str(e)
+    
+    def iter_events(self, last_event_id=None, on_open=None):
+        """
+        Follow the server-sent event stream
+        
+        Yields (event_id, event_type, data) tuples, and None for keepalives so
+        callers get a chance to stop. Returns when the server ends the stream;
+        reconnect with the last event id seen to resume. Raises requests
+        exceptions on connection errors. on_open is called with the streaming
+        response, which abort_stream() can cut off from another thread.
+        """
+        headers = {**self._get_headers(), 'Accept': 'text/event-stream'}
+        if last_event_id is not None:
+            headers['Last-Event-ID'] = str(last_event_id)
+        
+        with self.session.get(
+            f'{API_BASE_URL}/events/',
+            headers=headers,
+            stream=True,
+            timeout=(10, EVENT_STREAM_READ_TIMEOUT)
+        ) as response:
+            response.raise_for_status()
+            if on_open:
+                on_open(response)
+            event_id, event_type, data_lines = None, 'message', []
+            
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    field, _, value = line.partition(':')
+                    value = value[1:] if value.startswith(' ') else value
+                    if field == 'id':
+                        event_id = int(value)
+                    elif field == 'event':
+                        event_type = value
+                    elif field == 'data':
+                        data_lines.append(value)
+                    elif field == '':
+                        yield None  # Comment (keepalive)
+                    continue
+                
+                # A blank line ends the event
+                if data_lines:
+                    yield event_id, event_type, json.loads('\n'.join(data_lines))
+                event_type, data_lines = 'message', []
+    
     def download_report(self, save_path):
         """Download PDF report"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f'{API_BASE_URL}/report/',
                 headers=self._get_headers(),
                 stream=True
@@ -0,0 +1,194 @@
+"""
+Local dataset cache for ChemLizer Desktop Application
+Keeps recently viewed uploads on disk so they open instantly and offline
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from contextlib import contextmanager
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+# PBKDF2 rounds for the offline login check
+PASSWORD_HASH_ITERATIONS = 200_000
+
+
+def default_cache_dir():
+    """Return the per-user cache directory for the desktop app"""
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'ChemLizer')
+
+
+class DatasetCache:
+    """
+    SQLite-backed cache of upload datasets, keyed by (username, upload_id).
+
+    Each entry stores the equipment rows and summary as compressed JSON.
+    When the total size exceeds ``max_bytes`` the least recently used
+    entries are evicted. A new connection is opened per operation so the
+    cache can be used from background threads.
+
+    A salted hash of each user's last successful password is kept too, so
+    the cached uploads can only be opened offline with that password.
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        if path is None:
+            path = os.path.join(default_cache_dir(), 'datasets.sqlite3')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS datasets (
+                    username TEXT NOT NULL,
+                    upload_id INTEGER NOT NULL,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (username, upload_id)
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS datasets_accessed ON datasets (accessed_at)"
+            )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS credentials (
+                    username TEXT PRIMARY KEY,
+                    salt BLOB NOT NULL,
+                    password_hash BLOB NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, username, upload_id):
+        """Return the cached dataset for an upload, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload FROM datasets WHERE username = ? AND upload_id = ?",
+                (username, upload_id)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE datasets SET accessed_at = ? WHERE username = ? AND upload_id = ?",
+                (time.time(), username, upload_id)
+            )
+        return json.loads(zlib.decompress(row[0]))
+
+    def latest(self, username):
+        """Return the most recently used cached dataset for a user, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT upload_id FROM datasets WHERE username = ? "
+                "ORDER BY accessed_at DESC LIMIT 1",
+                (username,)
+            ).fetchone()
+        if row is None:
+            return None
+        return self.get(username, row[0])
+
+    def uploads(self, username):
+        """Return the cached upload ids for a user, most recently used first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT upload_id FROM datasets WHERE username = ? ORDER BY accessed_at DESC",
+                (username,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def put(self, username, upload_id, data, summary):
+        """Store a dataset and evict least recently used entries over the size cap"""
+        dataset = {'upload_id': upload_id, 'data': data, 'summary': summary}
+        payload = zlib.compress(json.dumps(dataset).encode('utf-8'))
+        if len(payload) > self.max_bytes:
+            return
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO datasets (username, upload_id, payload, size, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (username, upload_id, payload, len(payload), time.time())
+            )
+            self._evict(conn)
+
+    def remember_login(self, username, password):
+        """Store a salted hash of a password the server just accepted"""
+        salt = os.urandom(16)
+        password_hash = hashlib.pbkdf2_hmac(
+            'sha256', password.encode('utf-8'), salt, PASSWORD_HASH_ITERATIONS
+        )
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO credentials (username, salt, password_hash) VALUES (?, ?, ?)",
+                (username, salt, password_hash)
+            )
+
+    def verify_login(self, username, password):
+        """Return True if the password matches the user's last online login"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT salt, password_hash FROM credentials WHERE username = ?",
+                (username,)
+            ).fetchone()
+        if row is None:
+            return False
+        salt, password_hash = row
+        candidate = hashlib.pbkdf2_hmac(
+            'sha256', password.encode('utf-8'), salt, PASSWORD_HASH_ITERATIONS
+        )
+        return hmac.compare_digest(candidate, password_hash)
+
+    def _evict(self, conn):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM datasets").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = conn.execute(
+            "SELECT username, upload_id, size FROM datasets ORDER BY accessed_at ASC"
+        ).fetchall()
+        for username, upload_id, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute(
+                "DELETE FROM datasets WHERE username = ? AND upload_id = ?",
+                (username, upload_id)
+            )
+            total -= size
+
+    def delete(self, username, upload_ids):
+        """Remove specific uploads, e.g. after the server's retention cleanup"""
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM datasets WHERE username = ? AND upload_id = ?",
+                [(username, upload_id) for upload_id in upload_ids]
+            )
+
+    def clear(self, username=None):
+        """Remove cached datasets (and the offline login) for one user, or for everyone"""
+        with self._connect() as conn:
+            if username is None:
+                conn.execute("DELETE FROM datasets")
+                conn.execute("DELETE FROM credentials")
+            else:
+                conn.execute("DELETE FROM datasets WHERE username = ?", (username,))
+                conn.execute("DELETE FROM credentials WHERE username = ?", (username,))
@@ -0,0 +1,143 @@
+"""
+Upload queue for ChemLizer Desktop Application
+Uploads many files concurrently and tracks each file's progress and throughput
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from services.api_client import UPLOAD_CONCURRENCY
+
+QUEUED = 'queued'
+UPLOADING = 'uploading'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class UploadJob:
+    """
+    One file in the upload queue.
+
+    Fields are written by the worker thread running the upload and read by
+    the UI; ``sent`` and ``total`` count bytes as sent (after gzip).
+    """
+
+    def __init__(self, job_id, file_path):
+        self.id = job_id
+        self.file_path = file_path
+        self.filename = os.path.basename(file_path)
+        self.run = 0
+        self.cancel_event = threading.Event()
+        self.reset()
+
+    def reset(self):
+        self.status = QUEUED
+        self.sent = 0
+        self.total = 0
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def throughput(self):
+        """Bytes per second sent so far, or None before the upload starts"""
+        if self.started_at is None:
+            return None
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return self.sent / elapsed if elapsed > 0 else None
+
+
+class UploadQueue:
+    """
+    Uploads files on a pool of ``max_workers`` threads.
+
+    All uploads go through one APIClient, so they share its connection pool
+    and its adaptive cap on concurrent ingest requests. ``on_change(job)`` is
+    called, from whichever thread changed it, every time a job changes.
+    """
+
+    def __init__(self, api_client, on_change=None, max_workers=UPLOAD_CONCURRENCY):
+        self.api_client = api_client
+        self.on_change = on_change or (lambda job: None)
+        self.jobs = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upload')
+
+    def add(self, file_paths):
+        """Queue files for upload and return their jobs"""
+        jobs = []
+        with self._lock:
+            for file_path in file_paths:
+                jobs.append(UploadJob(len(self.jobs) + len(jobs) + 1, file_path))
+            self.jobs.extend(jobs)
+        for job in jobs:
+            self._submit(job)
+        return jobs
+
+    def _submit(self, job):
+        # A retried job gets a new run number, so a stale queued run of it does nothing
+        job.run += 1
+        job.cancel_event.clear()
+        job.reset()
+        self.on_change(job)
+        self._executor.submit(self._upload, job, job.run)
+
+    def _upload(self, job, run):
+        if job.run != run or job.cancel_event.is_set():
+            return
+        job.status = UPLOADING
+        job.started_at = time.monotonic()
+        self.on_change(job)
+
+        def progress(sent, total):
+            job.sent, job.total = sent, total
+            self.on_change(job)
+
+        success, result = self.api_client.upload_csv(job.file_path, progress, job.cancel_event)
+        job.finished_at = time.monotonic()
+        if success:
+            job.status, job.result = DONE, result
+        elif job.cancel_event.is_set():
+            job.status = CANCELLED
+        else:
+            job.status, job.error = FAILED, result
+        self.on_change(job)
+
+    def cancel(self, job):
+        """Cancel a queued job, or stop a running one at its next chunk or retry"""
+        if job.status not in (QUEUED, UPLOADING):
+            return
+        job.cancel_event.set()
+        if job.status == QUEUED:
+            job.status = CANCELLED
+            self.on_change(job)
+
+    def retry(self, job):
+        """Queue a failed or cancelled job again"""
+        if job.status in (FAILED, CANCELLED):
+            self._submit(job)
+
+    def counts(self):
+        """Number of jobs per status"""
+        return Counter(job.status for job in self.jobs)
+
+    def is_active(self):
+        return any(job.status in (QUEUED, UPLOADING) for job in self.jobs)
+
+    def throughput(self):
+        """Combined bytes per second of the running uploads"""
+        return sum(job.throughput or 0 for job in self.jobs if job.status == UPLOADING)
+
+    def cancel_all(self):
+        for job in self.jobs:
+            self.cancel(job)
+
+    def shutdown(self):
+        """Cancel every job and stop the worker threads"""
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,239 @@
+"""
+ChemLizer Desktop App - Chart Engine
+Matplotlib charts that are built once and then updated in place
+"""
+
+import math
+
+import numpy as np
+
+# ChemLizer colors
+COLORS = ['#0A4D68', '#088395', '#05BFDB', '#FF6B6B', '#4ECDC4']
+TITLE_COLOR = '#0A4D68'
+
+AVERAGE_PARAMS = [
+    ('avg_flowrate', 'Avg Flowrate'),
+    ('avg_pressure', 'Avg Pressure'),
+    ('avg_temperature', 'Avg Temperature'),
+]
+
+PROFILE_SERIES = [
+    ('flowrate', 'Flowrate', '#0A4D68'),
+    ('pressure', 'Pressure', '#088395'),
+    ('temperature', 'Temperature', '#FF6B6B'),
+]
+
+# Upper bound on points drawn per line, whatever the upload size
+MAX_PLOT_POINTS = 2000
+
+
+def minmax_decimate(y, max_points=MAX_PLOT_POINTS):
+    """
+    Downsample a series for plotting by keeping each bucket's min and max
+
+    Args:
+        y: 1-D array of values, plotted against their index
+        max_points: Maximum number of points to return
+
+    Returns:
+        Tuple of (x, y) arrays with at most max_points entries
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n), y
+
+    buckets = max_points // 2
+    size = n // buckets
+    usable = buckets * size
+
+    blocks = y[:usable].reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    lo = blocks.argmin(axis=1) + offsets
+    hi = blocks.argmax(axis=1) + offsets
+
+    # Keep each bucket's two extremes in index order so the line stays monotonic in x
+    x = np.sort(np.stack([lo, hi], axis=1), axis=1).ravel()
+    return x, y[x]
+
+
+class ChartEngine:
+    """
+    Owns the Charts tab figure.
+
+    Axes and artists are created once; refreshes change artist data and
+    only rebuild the categorical charts when the set of equipment types
+    changes. The parameter profile is decimated before drawing and its
+    hover cursor is drawn with blitting.
+    """
+
+    def __init__(self, figure, canvas):
+        self.figure = figure
+        self.canvas = canvas
+
+        self.ax_types = figure.add_subplot(2, 2, 1)
+        self.ax_pie = figure.add_subplot(2, 2, 2)
+        self.ax_avg = figure.add_subplot(2, 2, 3)
+        self.ax_profile = figure.add_subplot(2, 2, 4)
+
+        self._types = None
+        self._type_bars = None
+        self._pie_wedges = None
+        self._pie_labels = None
+        self._pie_pcts = None
+
+        self._init_type_axes()
+        self._init_average_axes()
+        self._init_profile_axes()
+
+        self._background = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.mpl_connect('motion_notify_event', self._on_motion)
+
+        self.figure.tight_layout()
+
+    # Setup
+
+    def _init_type_axes(self):
+        self.ax_types.set_title('Equipment Type Distribution', fontweight='bold', color=TITLE_COLOR)
+        self.ax_types.set_xlabel('Equipment Type')
+        self.ax_types.set_ylabel('Count')
+
+        self.ax_pie.set_title('Type Distribution', fontweight='bold', color=TITLE_COLOR)
+        self.ax_pie.set_aspect('equal')
+        self.ax_pie.axis('off')
+
+    def _init_average_axes(self):
+        labels = [label for _, label in AVERAGE_PARAMS]
+        positions = np.arange(len(labels))
+        self._avg_bars = self.ax_avg.bar(positions, [0] * len(labels), color=COLORS[:3])
+        self.ax_avg.set_xticks(positions)
+        self.ax_avg.set_xticklabels(labels, rotation=45)
+        self.ax_avg.set_title('Average Parameters', fontweight='bold', color=TITLE_COLOR)
+
+    def _init_profile_axes(self):
+        self._profile_lines = {}
+        for field, label, color in PROFILE_SERIES:
+            line, = self.ax_profile.plot([], [], color=color, linewidth=0.8, label=label)
+            self._profile_lines[field] = line
+        self.ax_profile.set_title('Parameter Profile', fontweight='bold', color=TITLE_COLOR)
+        self.ax_profile.set_xlabel('Equipment #')
+        self.ax_profile.legend(loc='upper right', fontsize='small')
+
+        self._cursor = self.ax_profile.axvline(0, color='#2C3E50', linewidth=0.8,
+                                               visible=False, animated=True)
+
+    # Updates
+
+    def update(self, summary, series=None):
+        """
+        Refresh all charts
+
+        Args:
+            summary: Summary dict from the API
+            series: Optional dict of field name -> 1-D array of raw values
+        """
+        type_dist = summary.get('type_distribution', {}) or {}
+        types = list(type_dist.keys())
+        counts = [type_dist[t] for t in types]
+
+        if types != self._types:
+            self._rebuild_type_charts(types, counts)
+            self.figure.tight_layout()
+        else:
+            self._update_type_charts(counts)
+
+        for bar, (key, _) in zip(self._avg_bars, AVERAGE_PARAMS):
+            bar.set_height(summary.get(key, 0) or 0)
+        self.ax_avg.relim()
+        self.ax_avg.autoscale_view()
+
+        if series is not None:
+            self.update_series(series)
+
+        self.canvas.draw_idle()
+
+    def update_series(self, series):
+        """Replace the profile lines with decimated copies of the raw series"""
+        for field, line in self._profile_lines.items():
+            values = series.get(field)
+            if values is None or len(values) == 0:
+                line.set_data([], [])
+                continue
+            x, y = minmax_decimate(values)
+            line.set_data(x, y)
+
+        self.ax_profile.relim()
+        self.ax_profile.autoscale_view()
+        self.canvas.draw_idle()
+
+    def _rebuild_type_charts(self, types, counts):
+        """Recreate the categorical artists when the set of types changes"""
+        if self._type_bars is not None:
+            self._type_bars.remove()
+        for artist in (self._pie_wedges or []) + (self._pie_labels or []) + (self._pie_pcts or []):
+            artist.remove()
+
+        self._types = types
+        positions = np.arange(len(types))
+        self._type_bars = self.ax_types.bar(positions, counts, color='#05BFDB')
+        self.ax_types.set_xticks(positions)
+        self.ax_types.set_xticklabels(types, rotation=45)
+        self.ax_types.relim()
+        self.ax_types.autoscale_view()
+
+        if types and sum(counts) > 0:
+            wedges, labels, pcts = self.ax_pie.pie(
+                counts, labels=types, autopct='%1.1f%%',
+                colors=[COLORS[i % len(COLORS)] for i in range(len(types))]
+            )
+            self._pie_wedges, self._pie_labels, self._pie_pcts = list(wedges), list(labels), list(pcts)
+        else:
+            self._pie_wedges, self._pie_labels, self._pie_pcts = [], [], []
+
+    def _update_type_charts(self, counts):
+        """Update bar heights and pie wedge angles for the same set of types"""
+        for bar, count in zip(self._type_bars, counts):
+            bar.set_height(count)
+        self.ax_types.relim()
+        self.ax_types.autoscale_view()
+
+        total = float(sum(counts))
+        if not self._pie_wedges or total <= 0:
+            return
+
+        theta = 0.0
+        for wedge, label, pct, count in zip(self._pie_wedges, self._pie_labels, self._pie_pcts, counts):
+            span = 360.0 * count / total
+            wedge.set_theta1(theta)
+            wedge.set_theta2(theta + span)
+
+            mid = math.radians(theta + span / 2)
+            x, y = math.cos(mid), math.sin(mid)
+            label.set_position((1.1 * x, 1.1 * y))
+            label.set_horizontalalignment('left' if x > 0 else 'right')
+            pct.set_position((0.6 * x, 0.6 * y))
+            pct.set_text(f"{100.0 * count / total:.1f}%")
+
+            theta += span
+
+    # Blitted hover cursor
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.ax_profile.draw_artist(self._cursor)
+
+    def _on_motion(self, event):
+        if self._background is None:
+            return
+
+        inside = event.inaxes is self.ax_profile and event.xdata is not None
+        if not inside and not self._cursor.get_visible():
+            return
+
+        self.canvas.restore_region(self._background)
+        self._cursor.set_visible(inside)
+        if inside:
+            self._cursor.set_xdata([event.xdata, event.xdata])
+            self.ax_profile.draw_artist(self._cursor)
+        self.canvas.blit(self.figure.bbox)
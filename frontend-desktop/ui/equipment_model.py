@@ -0,0 +1,159 @@
+"""
+ChemLizer Desktop App - Equipment Table Model
+Virtualized Qt table model over column arrays for large uploads
+"""
+
+import numpy as np
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+COLUMNS = [
+    ('equipment_name', 'Equipment Name'),
+    ('equipment_type', 'Type'),
+    ('flowrate', 'Flowrate'),
+    ('pressure', 'Pressure'),
+    ('temperature', 'Temperature'),
+]
+
+NUMERIC_FIELDS = ('flowrate', 'pressure', 'temperature')
+
+# Rows handed to the view per fetchMore() call
+PAGE_SIZE = 1000
+
+
+class EquipmentTableModel(QAbstractTableModel):
+    """
+    Table model backed by one NumPy array per column.
+
+    Cells are formatted on demand in data(), sorting only permutes an index
+    array, and rows are exposed to the view page by page as it scrolls.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._columns = {field: np.empty(0) for field, _ in COLUMNS}
+        self._order = np.empty(0, dtype=np.intp)
+        self._total = 0
+        self._loaded = 0
+
+    def set_records(self, records):
+        """Replace the model contents with a list of equipment dicts"""
+        self.beginResetModel()
+
+        count = len(records)
+        columns = {}
+        for field, _ in COLUMNS:
+            if field in NUMERIC_FIELDS:
+                columns[field] = np.fromiter(
+                    (item[field] for item in records), dtype=np.float64, count=count
+                )
+            else:
+                columns[field] = np.array(
+                    [item[field] for item in records], dtype=object
+                )
+
+        self._columns = columns
+        self._order = np.arange(count, dtype=np.intp)
+        self._total = count
+        self._loaded = min(PAGE_SIZE, count)
+
+        self.endResetModel()
+
+    def append_records(self, records):
+        """Add equipment dicts after the current ones, in the order given"""
+        count = len(records)
+        if count == 0:
+            return
+
+        for field, _ in COLUMNS:
+            if field in NUMERIC_FIELDS:
+                values = np.fromiter(
+                    (item[field] for item in records), dtype=np.float64, count=count
+                )
+            else:
+                values = np.array([item[field] for item in records], dtype=object)
+            self._columns[field] = np.concatenate((self._columns[field], values))
+
+        self._order = np.concatenate(
+            (self._order, np.arange(self._total, self._total + count, dtype=np.intp))
+        )
+        self._total += count
+
+        # Views only fetch more rows on scrolling, so fill a short first page now
+        if self._loaded < PAGE_SIZE:
+            self.fetchMore()
+
+    def column(self, field):
+        """Return the raw values of a column in upload order"""
+        return self._columns[field]
+
+    def total_count(self):
+        """Number of records held by the model (loaded or not)"""
+        return self._total
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        field = COLUMNS[index.column()][0]
+
+        if role == Qt.DisplayRole:
+            value = self._columns[field][self._order[index.row()]]
+            if field in NUMERIC_FIELDS:
+                return f"{value:.2f}"
+            return str(value)
+
+        if role == Qt.TextAlignmentRole and field in NUMERIC_FIELDS:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMNS[section][1]
+        return str(section + 1)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._loaded < self._total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        remaining = self._total - self._loaded
+        batch = min(PAGE_SIZE, remaining)
+        if batch <= 0:
+            return
+
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + batch - 1)
+        self._loaded += batch
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sort by permuting the row index; column arrays are left untouched"""
+        if self._total == 0:
+            return
+
+        self.layoutAboutToBeChanged.emit()
+
+        values = self._columns[COLUMNS[column][0]]
+        order_index = np.argsort(values, kind='stable')
+        if order == Qt.DescendingOrder:
+            order_index = order_index[::-1]
+        self._order = order_index
+
+        self.layoutChanged.emit()
@@ -3,26 +3,155 @@ ChemLizer Desktop App - Main Window
 Complete hybrid desktop application for chemical equipment data visualization
 """
 
-from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,QPushButton, QLabel, QFileDialog, QTableWidget, QTableWidgetItem,
-    QTabWidget, QMessageBox, QGroupBox, QProgressBar, QHeaderView
+from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,QPushButton, QLabel, QFileDialog, QTableView,
+    QTabWidget, QMessageBox, QGroupBox, QHeaderView, QAbstractItemView
 )
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont
-import matplotlib
-matplotlib.use('Qt5Agg')
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
 import os
+import threading
+
+from services.api_client import APIClient, DATA_PAGE_SIZE, abort_stream
+from services.dataset_cache import DatasetCache
+from services.upload_queue import QUEUED, UPLOADING, DONE, FAILED, CANCELLED
+from ui.equipment_model import EquipmentTableModel, COLUMNS, NUMERIC_FIELDS
+from ui.upload_queue_model import UploadQueueModel, format_bytes
+from ui.chart_engine import ChartEngine
+
+# Files accepted by the file dialog and by drag and drop
+CSV_EXTENSIONS = ('.csv', '.csv.gz', '.csv.bz2', '.csv.zst')
+
+class DatasetRevalidator(QThread):
+    """Background check that the cached dataset is still the latest upload"""
+    refreshed = pyqtSignal(str, dict)
+    failed = pyqtSignal(str, str)
+    
+    def __init__(self, api_client, dataset_cache, username):
+        super().__init__()
+        self.api_client = api_client
+        self.dataset_cache = dataset_cache
+        self.username = username
+    
+    def run(self):
+        success, result = self.api_client.get_dashboard(('summary',))
+        if not success:
+            self.failed.emit(self.username, result)
+            return
+        
+        latest_id = result.get('upload_id')
+        if latest_id is None:
+            return
+        if self.dataset_cache.get(self.username, latest_id) is not None:
+            return  # Cached copy is current
+        
+        # Rows of exactly that upload, even if another one lands meanwhile
+        summary = result.get('summary') or {}
+        success, rows = self.api_client.get_preview(latest_id, summary.get('total_count', 0))
+        if not success:
+            self.failed.emit(self.username, rows)
+            return
+        
+        dataset = {'upload_id': latest_id, 'summary': summary, **rows}
+        # A preview is not the whole upload, so only complete datasets are cached
+        if not dataset['preview']:
+            self.dataset_cache.put(self.username, dataset['upload_id'], dataset['data'], dataset['summary'])
+        self.refreshed.emit(self.username, dataset)
+
+
+class DataPageLoader(QThread):
+    """Background download of every record of an upload, one cursor page at a time"""
+    page_loaded = pyqtSignal(object, list, int, bool)
+    loaded = pyqtSignal()
+    failed = pyqtSignal(str)
+    
+    def __init__(self, api_client, upload_id, ordering):
+        super().__init__()
+        self.api_client = api_client
+        self.upload_id = upload_id
+        self.ordering = ordering
+        self._stopped = False
+    
+    def stop(self):
+        """Ask the loader to exit once the page being fetched arrives"""
+        self._stopped = True
+    
+    def run(self):
+        after = None
+        first = True
+        while not self._stopped:
+            success, result = self.api_client.get_data(
+                self.upload_id, limit=DATA_PAGE_SIZE, after=after, ordering=self.ordering
+            )
+            if self._stopped:
+                return
+            if not success:
+                self.failed.emit(result)
+                return
+            
+            # Later pages come from the same upload even if another one lands meanwhile
+            self.upload_id = result.get('upload_id')
+            self.page_loaded.emit(self.upload_id, result.get('data', []), result.get('count', 0), first)
+            first = False
+            after = result.get('next_cursor')
+            if after is None:
+                self.loaded.emit()
+                return
+
+
+class EventListener(QThread):
+    """Background subscription to the server's upload and retention events"""
+    event_received = pyqtSignal(str, object)
+    
+    RECONNECT_DELAY = 5
+    
+    def __init__(self, api_client):
+        super().__init__()
+        self.api_client = api_client
+        self.last_event_id = None
+        self.response = None
+        self._stopped = threading.Event()
+    
+    def stop(self):
+        """Make the listener exit now, cutting off the stream it is reading"""
+        self._stopped.set()
+        response = self.response
+        if response is not None:
+            abort_stream(response)
+    
+    def on_stream_open(self, response):
+        self.response = response
+        # stop() may have run before the response was there to cut off
+        if self._stopped.is_set():
+            abort_stream(response)
+    
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                for event in self.api_client.iter_events(self.last_event_id, self.on_stream_open):
+                    if self._stopped.is_set():
+                        return
+                    if event is None:
+                        continue
+                    event_id, event_type, data = event
+                    self.last_event_id = event_id
+                    self.event_received.emit(event_type, data)
+            except Exception as e:
+                if self._stopped.is_set():
+                    return
+                print(f"Event stream error: {e}")
+                self._stopped.wait(self.RECONNECT_DELAY)
+            finally:
+                self.response = None
 
-from services.api_client import APIClient
 
 class LoginDialog(QWidget):
     """Login dialog for user authentication"""
     login_successful = pyqtSignal()
     
-    def __init__(self, api_client):
+    def __init__(self, api_client, dataset_cache=None):
         super().__init__()
         self.api_client = api_client
+        self.dataset_cache = dataset_cache
         self.init_ui()
     
     def init_ui(self):
@@ -80,8 +209,33 @@ class LoginDialog(QWidget):
         success, message = self.api_client.login(username, password)
         
         if success:
+            if self.dataset_cache:
+                try:
+                    self.dataset_cache.remember_login(username, password)
+                except Exception as e:
+                    print(f"Error saving offline login: {e}")
             self.login_successful.emit()
             self.close()
+        elif self.api_client.offline and self.dataset_cache and self.dataset_cache.uploads(username):
+            # Offline access needs the password of this user's last online login
+            if not self.dataset_cache.verify_login(username, password):
+                QMessageBox.critical(
+                    self,
+                    "Login Failed",
+                    "The server could not be reached, and the password does not match "
+                    "your last online login."
+                )
+                return
+            reply = QMessageBox.question(
+                self,
+                "Backend Unreachable",
+                "The server could not be reached.\nBrowse your cached uploads offline?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply == QMessageBox.Yes:
+                self.api_client.username = username
+                self.login_successful.emit()
+                self.close()
         else:
             QMessageBox.critical(self, "Login Failed", f"Login failed: {message}")
 
@@ -94,12 +248,29 @@ class MainWindow(QMainWindow):
         self.api_client = APIClient()
         self.current_data = []
         self.current_summary = None
+        self.data_upload_id = None
+        self.data_preview = False
+        self.summary_upload_id = None
+        self.revalidator = None
+        self.event_listener = None
+        self.data_loader = None
+        # Result of the newest finished upload, shown once the queue drains
+        self.last_uploaded = None
+        # Matplotlib is imported and the chart canvas built on the first Charts tab visit
+        self.chart_engine = None
+        
+        # Local dataset cache (optional: the app still works without it)
+        try:
+            self.dataset_cache = DatasetCache()
+        except Exception as e:
+            print(f"Error opening dataset cache: {e}")
+            self.dataset_cache = None
         
         # Load stylesheet
         self.load_stylesheet()
         
         # Show login dialog
-        self.login_dialog = LoginDialog(self.api_client)
+        self.login_dialog = LoginDialog(self.api_client, self.dataset_cache)
         self.login_dialog.login_successful.connect(self.on_login_success)
         self.login_dialog.show()
         
@@ -156,6 +327,7 @@ class MainWindow(QMainWindow):
         self.create_upload_tab()
         self.create_data_tab()
         self.create_charts_tab()
+        self.tabs.currentChanged.connect(self.on_tab_changed)
         self.create_summary_tab()
         
         # Status bar
@@ -172,22 +344,49 @@ class MainWindow(QMainWindow):
         title.setProperty("class", "title")
         layout.addWidget(title)
         
-        subtitle = QLabel("Select a CSV file to upload")
+        subtitle = QLabel("Select CSV files or drop them here to upload")
         subtitle.setProperty("class", "subtitle")
         layout.addWidget(subtitle)
         
         layout.addSpacing(20)
         
         # Upload button
-        upload_btn = QPushButton("📁 Select CSV File")
-        upload_btn.setFixedHeight(60)
-        upload_btn.clicked.connect(self.handle_upload)
-        layout.addWidget(upload_btn)
-        
-        # Progress bar
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setVisible(False)
-        layout.addWidget(self.progress_bar)
+        self.upload_btn = QPushButton("📁 Select CSV Files")
+        self.upload_btn.setFixedHeight(60)
+        self.upload_btn.clicked.connect(self.handle_upload)
+        layout.addWidget(self.upload_btn)
+        self.setAcceptDrops(True)
+        
+        # Upload queue: files upload concurrently, one row each
+        self.upload_model = UploadQueueModel(self.api_client, self)
+        self.upload_model.job_changed.connect(self.on_upload_job_changed)
+        self.upload_table = QTableView()
+        self.upload_table.setModel(self.upload_model)
+        self.upload_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.upload_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.upload_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        layout.addWidget(self.upload_table)
+        
+        queue_actions = QHBoxLayout()
+        self.queue_label = QLabel("")
+        queue_actions.addWidget(self.queue_label)
+        queue_actions.addStretch()
+        
+        retry_btn = QPushButton("↻ Retry")
+        retry_btn.clicked.connect(lambda: self.for_selected_uploads(self.upload_model.queue.retry))
+        queue_actions.addWidget(retry_btn)
+        
+        cancel_btn = QPushButton("✕ Cancel")
+        cancel_btn.setProperty("class", "secondary")
+        cancel_btn.clicked.connect(lambda: self.for_selected_uploads(self.upload_model.queue.cancel))
+        queue_actions.addWidget(cancel_btn)
+        
+        clear_btn = QPushButton("Clear Finished")
+        clear_btn.setProperty("class", "secondary")
+        clear_btn.clicked.connect(self.upload_model.clear_finished)
+        queue_actions.addWidget(clear_btn)
+        
+        layout.addLayout(queue_actions)
         
         # CSV format info
         info_group = QGroupBox("Required CSV Format")
@@ -218,17 +417,30 @@ class MainWindow(QMainWindow):
         
         header.addStretch()
         
+        # Shown while the table holds a sample of a large upload
+        self.preview_label = QLabel()
+        self.preview_label.setVisible(False)
+        header.addWidget(self.preview_label)
+        
+        self.load_all_btn = QPushButton("⬇ Load All Records")
+        self.load_all_btn.clicked.connect(lambda: self.load_data(self.data_upload_id))
+        self.load_all_btn.setVisible(False)
+        header.addWidget(self.load_all_btn)
+        
         refresh_btn = QPushButton("🔄 Refresh")
-        refresh_btn.clicked.connect(self.load_data)
+        refresh_btn.clicked.connect(self.load_dashboard)
         header.addWidget(refresh_btn)
         
         layout.addLayout(header)
         
-        # Table
-        self.data_table = QTableWidget()
-        self.data_table.setColumnCount(5)
-        self.data_table.setHorizontalHeaderLabels(['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'])
+        # Table (virtualized: rows are formatted lazily by the model)
+        self.data_model = EquipmentTableModel(self)
+        self.data_table = QTableView()
+        self.data_table.setModel(self.data_model)
+        self.data_table.setSortingEnabled(True)
+        self.data_table.sortByColumn(0, Qt.AscendingOrder)
         self.data_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.data_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.data_table.setAlternatingRowColors(True)
         layout.addWidget(self.data_table)
         
@@ -244,17 +456,39 @@ class MainWindow(QMainWindow):
         title.setProperty("class", "title")
         layout.addWidget(title)
         
-        # Canvas for matplotlib
-        self.figure = Figure(figsize=(12, 8))
-        self.canvas = FigureCanvas(self.figure)
-        layout.addWidget(self.canvas)
+        # The matplotlib canvas is inserted here by ensure_chart_engine()
+        self.charts_layout = layout
         
         refresh_btn = QPushButton("🔄 Refresh Charts")
-        refresh_btn.clicked.connect(self.load_charts)
+        refresh_btn.clicked.connect(self.load_dashboard)
         layout.addWidget(refresh_btn)
         
+        self.charts_tab = charts_widget
         self.tabs.addTab(charts_widget, "📊 Charts")
     
+    def on_tab_changed(self, index):
+        if self.tabs.widget(index) is self.charts_tab:
+            self.ensure_chart_engine()
+    
+    def ensure_chart_engine(self):
+        """Import matplotlib and build the chart canvas on first use"""
+        if self.chart_engine is not None:
+            return
+        
+        import matplotlib
+        matplotlib.use('Qt5Agg')
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        
+        self.figure = Figure(figsize=(12, 8))
+        self.canvas = FigureCanvas(self.figure)
+        self.chart_engine = ChartEngine(self.figure, self.canvas)
+        # Below the title, above the refresh button
+        self.charts_layout.insertWidget(1, self.canvas)
+        
+        if self.current_summary is not None:
+            self.chart_engine.update(self.current_summary, self.data_series())
+    
     def create_summary_tab(self):
         """Create summary tab"""
         summary_widget = QWidget()
@@ -288,161 +522,342 @@ class MainWindow(QMainWindow):
         self.user_label.setText(f"👤 {self.api_client.username}")
         self.statusBar().showMessage(f"Logged in as {self.api_client.username}")
         self.show()
+        
+        # Show the cached dataset instantly, then check it against the server
+        self.load_cached_dataset()
+        if self.api_client.offline:
+            self.statusBar().showMessage(f"Offline - showing cached data for {self.api_client.username}")
+        else:
+            self.revalidate_cache()
+            self.start_event_listener()
+    
+    def start_event_listener(self):
+        """Follow server-pushed events instead of polling for new uploads"""
+        self.stop_event_listener()
+        self.event_listener = EventListener(self.api_client)
+        self.event_listener.event_received.connect(self.on_server_event)
+        self.event_listener.start()
+    
+    def stop_event_listener(self):
+        if self.event_listener:
+            self.event_listener.event_received.disconnect(self.on_server_event)
+            self.event_listener.stop()
+            self.event_listener.wait()
+            self.event_listener = None
+    
+    def on_server_event(self, event_type, data):
+        """React to an upload or retention event pushed by the server"""
+        own_upload = self.upload_model.queue.is_active()
+        
+        if event_type == 'upload.progress' and own_upload and data.get('stage') == 'saving':
+            self.statusBar().showMessage(
+                f"Saving... {data['saved_rows']} of {data['total_rows']} records"
+            )
+        elif event_type == 'upload.completed' and not own_upload:
+            # Uploaded from another client or session
+            self.statusBar().showMessage(f"New upload {data.get('filename', '')} - refreshing")
+            self.revalidate_cache()
+        elif event_type == 'retention.cleanup' and self.dataset_cache:
+            try:
+                self.dataset_cache.delete(self.api_client.username, data.get('deleted_upload_ids', []))
+            except Exception as e:
+                print(f"Error pruning dataset cache: {e}")
+    
+    def load_cached_dataset(self):
+        """Display the user's most recently used cached dataset, if any"""
+        if not self.dataset_cache:
+            return
+        
+        dataset = self.dataset_cache.latest(self.api_client.username)
+        if dataset:
+            self.display_dataset(dataset)
+    
+    def revalidate_cache(self):
+        """Refresh the cached dataset in the background"""
+        if not self.dataset_cache or (self.revalidator and self.revalidator.isRunning()):
+            return
+        
+        self.revalidator = DatasetRevalidator(self.api_client, self.dataset_cache, self.api_client.username)
+        self.revalidator.refreshed.connect(self.on_cache_refreshed)
+        self.revalidator.failed.connect(self.on_cache_revalidation_failed)
+        self.revalidator.start()
+    
+    def on_cache_refreshed(self, username, dataset):
+        """Show a dataset fetched by the background revalidator"""
+        if username != self.api_client.username:
+            return
+        self.display_dataset(dataset)
+        self.statusBar().showMessage(self.loaded_message(dataset))
+    
+    def on_cache_revalidation_failed(self, username, message):
+        """Keep showing cached data when the server cannot be reached"""
+        if username != self.api_client.username:
+            return
+        self.statusBar().showMessage(f"Showing cached data (refresh failed: {message})")
+    
+    def display_dataset(self, dataset):
+        """Populate every tab from a cached or freshly fetched dataset"""
+        upload_id = dataset.get('upload_id')
+        self.display_data(dataset.get('data', []), upload_id, dataset.get('count'), dataset.get('preview', False))
+        self.display_summary(dataset.get('summary') or {}, upload_id)
+        self.display_charts(dataset.get('summary') or {})
+    
+    def store_in_cache(self):
+        """Cache the current dataset once data and summary describe the same upload"""
+        if not self.dataset_cache or self.api_client.offline:
+            return
+        if self.data_upload_id is None or self.data_upload_id != self.summary_upload_id:
+            return
+        if self.data_preview:
+            return
+        try:
+            self.dataset_cache.put(
+                self.api_client.username,
+                self.data_upload_id,
+                self.current_data,
+                self.current_summary
+            )
+        except Exception as e:
+            print(f"Error writing dataset cache: {e}")
+    
+    def closeEvent(self, event):
+        """Stop background threads before the window goes away"""
+        self.stop_event_listener()
+        self.stop_data_loader()
+        super().closeEvent(event)
     
     def handle_logout(self):
         """Handle logout"""
+        self.stop_event_listener()
+        self.stop_data_loader()
+        self.upload_model.queue.cancel_all()
         self.api_client.token = None
         self.api_client.username = None
+        self.api_client.offline = False
         self.hide()
-        self.login_dialog = LoginDialog(self.api_client)
+        self.login_dialog = LoginDialog(self.api_client, self.dataset_cache)
         self.login_dialog.login_successful.connect(self.on_login_success)
         self.login_dialog.show()
     
     def handle_upload(self):
-        """Handle CSV file upload"""
-        file_path, _ = QFileDialog.getOpenFileName(
+        """Queue CSV files picked in a file dialog"""
+        file_paths, _ = QFileDialog.getOpenFileNames(
             self,
-            "Select CSV File",
+            "Select CSV Files",
             "",
-            "CSV Files (*.csv);;All Files (*)"
+            "CSV Files (*.csv *.csv.gz *.csv.bz2 *.csv.zst);;All Files (*)"
         )
-        
-        if not file_path:
+        self.queue_uploads(file_paths)
+    
+    def dragEnterEvent(self, event):
+        if any(url.toLocalFile().lower().endswith(CSV_EXTENSIONS) for url in event.mimeData().urls()):
+            event.acceptProposedAction()
+    
+    def dropEvent(self, event):
+        """Queue CSV files dropped on the window"""
+        file_paths = [url.toLocalFile() for url in event.mimeData().urls()]
+        self.queue_uploads([path for path in file_paths if path.lower().endswith(CSV_EXTENSIONS)])
+        event.acceptProposedAction()
+    
+    def queue_uploads(self, file_paths):
+        """Start uploading files through the queue"""
+        if not file_paths:
             return
+        self.upload_model.queue.add(file_paths)
+        self.tabs.setCurrentIndex(0)
+        self.statusBar().showMessage(f"Queued {len(file_paths)} file(s) for upload")
+    
+    def for_selected_uploads(self, action):
+        """Apply a queue action (retry, cancel) to the selected upload rows"""
+        for index in self.upload_table.selectionModel().selectedRows():
+            action(self.upload_model.job(index.row()))
+    
+    def on_upload_job_changed(self, job):
+        """Summarize the upload queue, and show the newest upload once it drains"""
+        queue = self.upload_model.queue
+        counts = queue.counts()
+        parts = [f"{counts[status]} {status}" for status in (UPLOADING, QUEUED, DONE, FAILED, CANCELLED)
+                 if counts[status]]
+        throughput = queue.throughput()
+        if throughput:
+            parts.append(f"{format_bytes(throughput)}/s")
+        self.queue_label.setText(" · ".join(parts))
+        
+        if job.status == DONE:
+            self.last_uploaded = job.result
+        if job.status in (DONE, FAILED, CANCELLED) and not queue.is_active():
+            self.on_uploads_finished(counts)
+    
+    def on_uploads_finished(self, counts):
+        """Show the newest upload once every queued file is done"""
+        message = f"Uploads finished: {counts[DONE]} imported"
+        if counts[FAILED]:
+            message += f", {counts[FAILED]} failed"
+        self.statusBar().showMessage(message)
+        
+        result, self.last_uploaded = self.last_uploaded, None
+        # A replayed upload the server has since removed comes back without a summary
+        if result is None or not result.get('summary') or not result.get('upload_id'):
+            return
+        # The upload response already carries the summary; only the rows need fetching
+        summary = result['summary']
+        self.load_preview(result['upload_id'], summary['total_count'])
+        self.display_summary(summary, result['upload_id'])
+        self.display_charts(summary)
+        self.store_in_cache()
+    
+    def load_dashboard(self):
+        """Load data, summary and charts of the latest upload in one go"""
+        success, result = self.api_client.get_dataset()
         
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)  # Indeterminate
-        self.statusBar().showMessage("Uploading...")
-        
-        success, result = self.api_client.upload_csv(file_path)
-        
-        self.progress_bar.setVisible(False)
+        if not success:
+            QMessageBox.warning(self, "Error", f"Failed to load data: {result}")
+            return
         
-        if success:
-            QMessageBox.information(
-                self,
-                "Success",
-                f"File uploaded successfully!\n{result['summary']['total_count']} records imported."
-            )
-            self.statusBar().showMessage("Upload successful")
-            self.load_data()
-            self.load_charts()
-            self.load_summary()
-        else:
-            QMessageBox.critical(self, "Error", f"Upload failed: {result}")
-            self.statusBar().showMessage("Upload failed")
+        self.display_dataset(result)
+        self.store_in_cache()
+        self.statusBar().showMessage(self.loaded_message(result))
+    
+    def loaded_message(self, dataset):
+        if dataset.get('preview'):
+            return f"Showing a sample of {len(dataset['data'])} of {dataset['count']} records"
+        return f"Loaded {len(dataset['data'])} records"
     
-    def load_data(self):
-        """Load equipment data into table"""
-        success, result = self.api_client.get_data()
+    def load_preview(self, upload_id, total_count):
+        """Load an upload's records into the table, or a sample of them if it is large"""
+        success, result = self.api_client.get_preview(upload_id, total_count)
         
         if success:
-            data = result.get('data', [])
-            self.current_data = data
-            
-            self.data_table.setRowCount(len(data))
-            
-            for row, item in enumerate(data):
-                self.data_table.setItem(row, 0, QTableWidgetItem(item['equipment_name']))
-                self.data_table.setItem(row, 1, QTableWidgetItem(item['equipment_type']))
-                self.data_table.setItem(row, 2, QTableWidgetItem(f"{item['flowrate']:.2f}"))
-                self.data_table.setItem(row, 3, QTableWidgetItem(f"{item['pressure']:.2f}"))
-                self.data_table.setItem(row, 4, QTableWidgetItem(f"{item['temperature']:.2f}"))
-            
-            self.statusBar().showMessage(f"Loaded {len(data)} records")
+            self.display_data(result['data'], upload_id, result['count'], result['preview'])
+            self.store_in_cache()
+            self.statusBar().showMessage(self.loaded_message(result))
         else:
             QMessageBox.warning(self, "Error", f"Failed to load data: {result}")
     
-    def load_charts(self):
-        """Load and display charts"""
-        success, result = self.api_client.get_summary()
-        
-        if not success:
-            QMessageBox.warning(self, "Error", "Failed to load data for charts")
+    def load_data(self, upload_id=None):
+        """Load all of an upload's records into the table, page by page in the background"""
+        self.stop_data_loader()
+        
+        # Pages arrive in the table's sort order, so appending them keeps it sorted
+        header = self.data_table.horizontalHeader()
+        field = COLUMNS[header.sortIndicatorSection()][0]
+        ordering = field if header.sortIndicatorOrder() == Qt.AscendingOrder else f'-{field}'
+        
+        self.data_loader = DataPageLoader(self.api_client, upload_id, ordering)
+        self.data_loader.page_loaded.connect(self.on_data_page)
+        self.data_loader.loaded.connect(self.on_data_loaded)
+        self.data_loader.failed.connect(self.on_data_load_failed)
+        self.load_all_btn.setEnabled(False)
+        self.statusBar().showMessage("Loading records...")
+        self.data_loader.start()
+    
+    def stop_data_loader(self):
+        if self.data_loader:
+            self.data_loader.stop()
+            self.data_loader.wait()
+            self.data_loader = None
+        self.load_all_btn.setEnabled(True)
+    
+    def is_current_loader(self):
+        """Whether a data loader signal comes from the running loader, not a stopped one"""
+        return self.data_loader is not None and self.sender() is self.data_loader
+    
+    def on_data_page(self, upload_id, records, count, first):
+        """Show the first page of a full load, and append the ones after it"""
+        if not self.is_current_loader():
             return
         
-        summary = result.get('summary', {})
-        type_dist = summary.get('type_distribution', {})
-        
-        if not type_dist:
+        if first:
+            self.show_data(records, upload_id)
+        else:
+            self.current_data.extend(records)
+            self.data_model.append_records(records)
+        self.statusBar().showMessage(f"Loading... {len(self.current_data)} of {count} records")
+    
+    def on_data_loaded(self):
+        if not self.is_current_loader():
             return
-        
-        self.figure.clear()
-        
-        # Create 3 subplots
-        ax1 = self.figure.add_subplot(2, 2, 1)
-        ax2 = self.figure.add_subplot(2, 2, 2)
-        ax3 = self.figure.add_subplot(2, 2, 3)
-        
-        # ChemLizer colors
-        colors = ['#0A4D68', '#088395', '#05BFDB', '#FF6B6B', '#4ECDC4']
-        
-        # Bar chart - Equipment Type Distribution
-        types = list(type_dist.keys())
-        counts = list(type_dist.values())
-        ax1.bar(types, counts, color='#05BFDB')
-        ax1.set_title('Equipment Type Distribution', fontweight='bold', color='#0A4D68')
-        ax1.set_xlabel('Equipment Type')
-        ax1.set_ylabel('Count')
-        ax1.tick_params(axis='x', rotation=45)
-        
-        # Pie chart - Type Distribution
-        ax2.pie(counts, labels=types, autopct='%1.1f%%', colors=colors[:len(types)])
-        ax2.set_title('Type Distribution', fontweight='bold', color='#0A4D68')
-        
-        # Bar chart - Average Parameters
-        params = ['Avg Flowrate', 'Avg Pressure', 'Avg Temperature']
-        values = [
-            summary.get('avg_flowrate', 0),
-            summary.get('avg_pressure', 0),
-            summary.get('avg_temperature', 0)
-        ]
-        ax3.bar(params, values, color=['#0A4D68', '#088395', '#05BFDB'])
-        ax3.set_title('Average Parameters', fontweight='bold', color='#0A4D68')
-        ax3.tick_params(axis='x', rotation=45)
-        
-        self.figure.tight_layout()
-        self.canvas.draw()
-        
-        self.statusBar().showMessage("Charts loaded")
-    
-    def load_summary(self):
-        """Load summary statistics"""
-        success, result = self.api_client.get_summary()
-        
-        if success:
-            summary = result.get('summary', {})
-            self.current_summary = summary
-            
-            # Clear existing summary
-            while self.summary_layout.count():
-                child = self.summary_layout.takeAt(0)
-                if child.widget():
-                    child.widget().deleteLater()
-            
-            # Add summary stats
-            stats_group = QGroupBox("Overall Statistics")
-            stats_layout = QVBoxLayout()
-            stats_group.setLayout(stats_layout)
-            
-            stats_layout.addWidget(QLabel(f"📊 Total Equipment: {summary.get('total_count', 0)}"))
-            stats_layout.addWidget(QLabel(f"💧 Average Flowrate: {summary.get('avg_flowrate', 0):.2f}"))
-            stats_layout.addWidget(QLabel(f"⚡ Average Pressure: {summary.get('avg_pressure', 0):.2f}"))
-            stats_layout.addWidget(QLabel(f"🌡️ Average Temperature: {summary.get('avg_temperature', 0):.2f}"))
-            
-            self.summary_layout.addWidget(stats_group)
-            
-            # Type distribution
-            type_group = QGroupBox("Equipment Type Distribution")
-            type_layout = QVBoxLayout()
-            type_group.setLayout(type_layout)
-            
-            for eq_type, count in summary.get('type_distribution', {}).items():
-                type_layout.addWidget(QLabel(f"{eq_type}: {count} units"))
-            
-            self.summary_layout.addWidget(type_group)
-            
-            self.statusBar().showMessage("Summary loaded")
+        self.data_loader = None
+        self.load_all_btn.setEnabled(True)
+        
+        # Re-sort in case the sort column changed while pages were arriving
+        header = self.data_table.horizontalHeader()
+        self.data_model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+        if self.chart_engine is not None:
+            self.chart_engine.update_series(self.data_series())
+        self.store_in_cache()
+        self.statusBar().showMessage(f"Loaded {len(self.current_data)} records")
+    
+    def on_data_load_failed(self, message):
+        if not self.is_current_loader():
+            return
+        self.data_loader = None
+        self.load_all_btn.setEnabled(True)
+        QMessageBox.warning(self, "Error", f"Failed to load data: {message}")
+    
+    def display_data(self, data, upload_id=None, total_count=None, preview=False):
+        """Show equipment records, or a preview sample of them, in the data table"""
+        # Newer data replaces whatever a running full load would append to
+        self.stop_data_loader()
+        self.show_data(data, upload_id, total_count, preview)
+    
+    def show_data(self, data, upload_id=None, total_count=None, preview=False):
+        """Fill the data table, leaving any running full load alone"""
+        self.current_data = data
+        self.data_upload_id = upload_id
+        self.data_preview = preview
+        
+        self.preview_label.setText(f"Preview: {len(data)} sampled of {total_count} records" if preview else "")
+        self.preview_label.setVisible(preview)
+        self.load_all_btn.setVisible(preview)
+        
+        self.data_model.set_records(data)
+        header = self.data_table.horizontalHeader()
+        self.data_model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+        if self.chart_engine is not None:
+            self.chart_engine.update_series(self.data_series())
+    
+    def data_series(self):
+        """Raw numeric columns of the current data, for the profile chart"""
+        return {field: self.data_model.column(field) for field in NUMERIC_FIELDS}
+    
+    def display_charts(self, summary):
+        """Draw charts for a summary (deferred until the Charts tab is first shown)"""
+        if self.chart_engine is not None:
+            self.chart_engine.update(summary, self.data_series())
+    
+    def display_summary(self, summary, upload_id=None):
+        """Show summary statistics"""
+        self.current_summary = summary
+        self.summary_upload_id = upload_id
+        
+        # Clear existing summary
+        while self.summary_layout.count():
+            child = self.summary_layout.takeAt(0)
+            if child.widget():
+                child.widget().deleteLater()
+        
+        # Add summary stats
+        stats_group = QGroupBox("Overall Statistics")
+        stats_layout = QVBoxLayout()
+        stats_group.setLayout(stats_layout)
+        
+        stats_layout.addWidget(QLabel(f"📊 Total Equipment: {summary.get('total_count', 0)}"))
+        stats_layout.addWidget(QLabel(f"💧 Average Flowrate: {summary.get('avg_flowrate', 0):.2f}"))
+        stats_layout.addWidget(QLabel(f"⚡ Average Pressure: {summary.get('avg_pressure', 0):.2f}"))
+        stats_layout.addWidget(QLabel(f"🌡️ Average Temperature: {summary.get('avg_temperature', 0):.2f}"))
+        
+        self.summary_layout.addWidget(stats_group)
+        
+        # Type distribution
+        type_group = QGroupBox("Equipment Type Distribution")
+        type_layout = QVBoxLayout()
+        type_group.setLayout(type_layout)
+        
+        for eq_type, count in summary.get('type_distribution', {}).items():
+            type_layout.addWidget(QLabel(f"{eq_type}: {count} units"))
+        
+        self.summary_layout.addWidget(type_group)
     
     def download_report(self):
         """Download PDF report"""
@@ -0,0 +1,117 @@
+"""
+ChemLizer Desktop App - Upload Queue Model
+Qt table model over the files of an upload queue
+"""
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt5.QtGui import QColor
+
+from services.upload_queue import UploadQueue, DONE, FAILED, CANCELLED
+
+COLUMNS = ['File', 'Status', 'Progress', 'Throughput', 'Details']
+
+STATUS_COLORS = {
+    DONE: QColor('#198754'),
+    FAILED: QColor('#DC3545'),
+    CANCELLED: QColor('#6C757D'),
+}
+
+
+def format_bytes(size):
+    """Human-readable byte count: 1536 -> '1.5 KB'"""
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class UploadQueueModel(QAbstractTableModel):
+    """
+    One row per queued file, with its status, progress and throughput.
+
+    Jobs change on the queue's worker threads; job_changed carries every
+    change to the GUI thread (a queued connection) before rows are updated.
+    """
+    job_changed = pyqtSignal(object)
+
+    def __init__(self, api_client, parent=None):
+        super().__init__(parent)
+        self._jobs = []
+        self._rows = {}
+        self.job_changed.connect(self._on_job_changed)
+        self.queue = UploadQueue(api_client, self.job_changed.emit)
+
+    def job(self, row):
+        return self._jobs[row]
+
+    def _on_job_changed(self, job):
+        row = self._rows.get(job.id)
+        if row is None:
+            row = len(self._jobs)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._jobs.append(job)
+            self._rows[job.id] = row
+            self.endInsertRows()
+            return
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
+
+    def clear_finished(self):
+        """Drop the rows of uploads that are done"""
+        self.beginResetModel()
+        self._jobs = [job for job in self._jobs if job.status != DONE]
+        self._rows = {job.id: row for row, job in enumerate(self._jobs)}
+        self.endResetModel()
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._jobs)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        job = self._jobs[index.row()]
+        column = COLUMNS[index.column()]
+
+        if role == Qt.DisplayRole:
+            if column == 'File':
+                return job.filename
+            if column == 'Status':
+                return job.status.capitalize()
+            if column == 'Progress':
+                if not job.total:
+                    return ''
+                return f"{job.sent * 100 // job.total}% of {format_bytes(job.total)}"
+            if column == 'Throughput':
+                rate = job.throughput
+                return f"{format_bytes(rate)}/s" if rate else ''
+            if column == 'Details':
+                if job.status == DONE:
+                    # A repeated completion of an upload the server has since removed has no summary
+                    summary = (job.result or {}).get('summary')
+                    return f"{summary['total_count']} records imported" if summary else "Imported earlier"
+                return job.error or ''
+
+        if role == Qt.ToolTipRole and column == 'Details' and job.error:
+            return job.error
+
+        if role == Qt.ForegroundRole and column == 'Status':
+            return STATUS_COLORS.get(job.status)
+
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return str(section + 1)
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import Login from './components/Login';
 import Upload from './components/Upload';
 import DataTable from './components/DataTable';
@@ -11,6 +11,47 @@ function App() {
     const [isAuthenticated, setIsAuthenticated] = useState(apiService.isAuthenticated());
     const [activeTab, setActiveTab] = useState('upload');
     const [dataUploaded, setDataUploaded] = useState(false);
+    // Bumped when a new upload lands so the dashboard is fetched again
+    const [dataVersion, setDataVersion] = useState(0);
+    const [dashboard, setDashboard] = useState(null);
+    const [dashboardLoading, setDashboardLoading] = useState(false);
+    const latestUploadId = useRef(null);
+
+    useEffect(() => {
+        if (!isAuthenticated) {
+            return undefined;
+        }
+        let cancelled = false;
+        setDashboardLoading(true);
+        apiService.getDashboard()
+            .then((result) => {
+                if (cancelled) return;
+                latestUploadId.current = result.upload_id;
+                setDashboard(result);
+                if (result.upload_id) setDataUploaded(true);
+            })
+            .catch((err) => console.error('Error fetching dashboard:', err))
+            .finally(() => {
+                if (!cancelled) setDashboardLoading(false);
+            });
+        return () => {
+            cancelled = true;
+        };
+    }, [isAuthenticated, dataVersion]);
+
+    useEffect(() => {
+        if (!isAuthenticated) {
+            return undefined;
+        }
+        return apiService.subscribeEvents((type, data) => {
+            // Uploads from this tab are already refreshed by handleUploadSuccess
+            if (type === 'upload.completed' && data.upload_id !== latestUploadId.current) {
+                latestUploadId.current = data.upload_id;
+                setDataUploaded(true);
+                setDataVersion((version) => version + 1);
+            }
+        });
+    }, [isAuthenticated]);
 
     const handleLoginSuccess = () => {
         setIsAuthenticated(true);
@@ -21,9 +62,15 @@ function App() {
         setIsAuthenticated(false);
         setActiveTab('upload');
         setDataUploaded(false);
+        setDashboard(null);
+        latestUploadId.current = null;
     };
 
-    const handleUploadSuccess = () => {
+    const handleUploadSuccess = (response) => {
+        if (response && response.upload_id !== latestUploadId.current) {
+            latestUploadId.current = response.upload_id;
+            setDataVersion((version) => version + 1);
+        }
         setDataUploaded(true);
         setActiveTab('data');
     };
@@ -82,9 +129,22 @@ function App() {
 
                 <div className="tab-content">
                     {activeTab === 'upload' && <Upload onUploadSuccess={handleUploadSuccess} />}
-                    {activeTab === 'data' && <DataTable />}
-                    {activeTab === 'charts' && <Charts />}
-                    {activeTab === 'summary' && <Summary />}
+                    {activeTab === 'data' && (
+                        <DataTable
+                            key={dashboard?.upload_id}
+                            uploadId={dashboard?.upload_id}
+                            initialData={dashboard?.data}
+                            totalCount={dashboard?.data_count}
+                            types={Object.keys(dashboard?.summary?.type_distribution || {})}
+                            loading={dashboardLoading}
+                        />
+                    )}
+                    {activeTab === 'charts' && (
+                        <Charts summary={dashboard?.summary} data={dashboard?.data} loading={dashboardLoading} />
+                    )}
+                    {activeTab === 'summary' && (
+                        <Summary summary={dashboard?.summary} loading={dashboardLoading} />
+                    )}
                 </div>
             </div>
 
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React from 'react';
 import {
     Chart as ChartJS,
     CategoryScale,
@@ -13,7 +13,6 @@ import {
     Filler
 } from 'chart.js';
 import { Bar, Line, Doughnut } from 'react-chartjs-2';
-import apiService from '../services/api';
 import theme from '../theme';
 import './Charts.css';
 
@@ -30,30 +29,7 @@ ChartJS.register(
     Filler
 );
 
-const Charts = () => {
-    const [summary, setSummary] = useState(null);
-    const [data, setData] = useState([]);
-    const [loading, setLoading] = useState(true);
-
-    useEffect(() => {
-        fetchData();
-    }, []);
-
-    const fetchData = async () => {
-        try {
-            const [summaryRes, dataRes] = await Promise.all([
-                apiService.getSummary(),
-                apiService.getData()
-            ]);
-            setSummary(summaryRes.summary);
-            setData(dataRes.data || []);
-        } catch (err) {
-            console.error('Error fetching data:', err);
-        } finally {
-            setLoading(false);
-        }
-    };
-
+const Charts = ({ summary, data = [], loading }) => {
     if (loading || !summary) {
         return <div className="charts-container">Loading charts...</div>;
     }
@@ -1,48 +1,196 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef, useCallback } from 'react';
 import apiService from '../services/api';
 import './DataTable.css';
 
-const DataTable = () => {
-    const [data, setData] = useState([]);
-    const [loading, setLoading] = useState(true);
-    const [sortConfig, setSortConfig] = useState({ key: null, direction: 'asc' });
+const NO_ROWS = [];
+const NO_TYPES = [];
+// Rows of the random preview shown for uploads larger than the dashboard's first page
+const PREVIEW_SAMPLE_SIZE = 1000;
+// Browsing is virtualized: only the rows in view are rendered, and their pages
+// are fetched from the server (sorted and filtered there) as they scroll in.
+// A page right after a loaded one continues from that page's cursor, so
+// scrolling down stays fast however deep it goes; jumps fall back to an offset
+const PAGE_SIZE = 100;
+const ROW_HEIGHT = 54;
+const VIEWPORT_ROWS = 12;
+const OVERSCAN = 10;
+const SEARCH_DELAY_MS = 300;
+const DEFAULT_QUERY = { ordering: [], search: '', equipmentType: '' };
+
+const COLUMNS = [
+    { key: 'equipment_name', label: 'Equipment Name' },
+    { key: 'equipment_type', label: 'Type' },
+    { key: 'flowrate', label: 'Flowrate' },
+    { key: 'pressure', label: 'Pressure' },
+    { key: 'temperature', label: 'Temperature' },
+];
+
+// The server's default order is by name, which is also the dashboard's first page
+const isDefaultQuery = (query) =>
+    !query.search &&
+    !query.equipmentType &&
+    (query.ordering.length === 0 || (query.ordering.length === 1 && query.ordering[0] === 'equipment_name'));
+
+const queryParams = (query) => {
+    const params = {};
+    if (query.ordering.length) params.ordering = query.ordering.join(',');
+    if (query.search) params.search = query.search;
+    if (query.equipmentType) params.equipment_type = query.equipmentType;
+    return params;
+};
+
+// Pages of the dashboard's first rows, so the default view opens without a request
+const seedPages = (rows, totalCount) => {
+    const pages = {};
+    for (let start = 0; start < rows.length; start += PAGE_SIZE) {
+        const page = rows.slice(start, start + PAGE_SIZE);
+        if (page.length === PAGE_SIZE || start + page.length === totalCount) {
+            pages[start / PAGE_SIZE] = page;
+        }
+    }
+    return pages;
+};
+
+// Rows arrive with the dashboard; larger uploads open on a stratified sample,
+// and browsing, sorting or searching pages through the full data on the server
+const DataTable = ({ uploadId, initialData = NO_ROWS, totalCount = 0, types = NO_TYPES, loading: dashboardLoading }) => {
+    const [preview, setPreview] = useState(totalCount > initialData.length);
+    const [sample, setSample] = useState(NO_ROWS);
+    const [loading, setLoading] = useState(totalCount > initialData.length);
+    const [query, setQuery] = useState(DEFAULT_QUERY);
+    const [searchInput, setSearchInput] = useState('');
+    const [pages, setPages] = useState(() => seedPages(initialData, totalCount));
+    const [count, setCount] = useState(totalCount);
+    const [scrollTop, setScrollTop] = useState(0);
+    const scrollRef = useRef(null);
+    // Bumped on every query change; pages of older queries are dropped
+    const queryVersion = useRef(0);
+    const requestedPages = useRef(new Set());
+    // next_cursor of each fetched page, by page number
+    const pageCursors = useRef({});
 
     useEffect(() => {
-        fetchData();
-    }, []);
+        if (totalCount <= initialData.length) {
+            setPreview(false);
+            setLoading(false);
+            return;
+        }
+        fetchPreview();
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [uploadId, initialData, totalCount]);
+
+    useEffect(() => {
+        queryVersion.current += 1;
+        requestedPages.current = new Set();
+        pageCursors.current = {};
+        if (isDefaultQuery(query)) {
+            setPages(seedPages(initialData, totalCount));
+            setCount(totalCount);
+        } else {
+            setPages({});
+            setCount(null);
+        }
+        setScrollTop(0);
+        if (scrollRef.current) scrollRef.current.scrollTop = 0;
+    }, [query, initialData, totalCount]);
 
-    const fetchData = async () => {
+    useEffect(() => {
+        const timer = setTimeout(() => {
+            if (searchInput.trim() !== query.search) {
+                updateQuery({ search: searchInput.trim() });
+            }
+        }, SEARCH_DELAY_MS);
+        return () => clearTimeout(timer);
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [searchInput]);
+
+    const fetchPreview = async () => {
+        setLoading(true);
         try {
-            const response = await apiService.getData();
-            setData(response.data || []);
+            const response = await apiService.getData({
+                upload_id: uploadId,
+                sample: PREVIEW_SAMPLE_SIZE,
+                stratify: 'equipment_type',
+            });
+            setSample(response.data || []);
+            setPreview(true);
         } catch (err) {
-            console.error('Error fetching data:', err);
+            console.error('Error fetching preview:', err);
+            setPreview(false);
         } finally {
             setLoading(false);
         }
     };
 
-    const requestSort = (key) => {
-        let direction = 'asc';
-        if (sortConfig.key === key && sortConfig.direction === 'asc') {
-            direction = 'desc';
+    const fetchPage = useCallback(async (page) => {
+        const version = queryVersion.current;
+        requestedPages.current.add(page);
+        const after = pageCursors.current[page - 1];
+        try {
+            const response = await apiService.getData({
+                upload_id: uploadId,
+                ...(after ? { after } : { offset: page * PAGE_SIZE }),
+                limit: PAGE_SIZE,
+                ...queryParams(query),
+            });
+            if (version !== queryVersion.current) return;
+            if (response.next_cursor) pageCursors.current[page] = response.next_cursor;
+            setPages((current) => ({ ...current, [page]: response.data || [] }));
+            setCount(response.count);
+        } catch (err) {
+            console.error('Error fetching data:', err);
+            if (version === queryVersion.current) requestedPages.current.delete(page);
         }
-        setSortConfig({ key, direction });
-
-        const sorted = [...data].sort((a, b) => {
-            if (a[key] < b[key]) return direction === 'asc' ? -1 : 1;
-            if (a[key] > b[key]) return direction === 'asc' ? 1 : -1;
-            return 0;
-        });
-        setData(sorted);
+    }, [uploadId, query]);
+
+    const rowCount = preview ? sample.length : count ?? 0;
+    const firstVisible = Math.floor(scrollTop / ROW_HEIGHT);
+    const first = Math.max(0, firstVisible - OVERSCAN);
+    const last = Math.min(rowCount, firstVisible + VIEWPORT_ROWS + OVERSCAN);
+
+    useEffect(() => {
+        if (preview) return;
+        // Until the first page arrives the count is unknown
+        const lastPage = count === null ? 0 : Math.floor(Math.max(first, last - 1) / PAGE_SIZE);
+        for (let page = Math.floor(first / PAGE_SIZE); page <= lastPage; page++) {
+            if (!pages[page] && !requestedPages.current.has(page)) {
+                fetchPage(page);
+            }
+        }
+    }, [preview, first, last, count, pages, fetchPage]);
+
+    const updateQuery = (changes) => {
+        setPreview(false);
+        setQuery((current) => ({ ...current, ...changes }));
+    };
+
+    // Click sorts by a column (again to reverse it); shift-click adds it as a tie-breaker
+    const requestSort = (key, addToSort) => {
+        const current = query.ordering.find((field) => field.replace('-', '') === key);
+        const next = current === key ? `-${key}` : key;
+        let ordering = [next];
+        if (addToSort) {
+            ordering = current
+                ? query.ordering.map((field) => (field === current ? next : field))
+                : [...query.ordering, next];
+        }
+        updateQuery({ ordering });
     };
 
     const getSortIcon = (key) => {
-        if (sortConfig.key !== key) return '⇅';
-        return sortConfig.direction === 'asc' ? '↑' : '↓';
+        const position = query.ordering.findIndex((field) => field.replace('-', '') === key);
+        if (position < 0) return '⇅';
+        const arrow = query.ordering[position].startsWith('-') ? '↓' : '↑';
+        return query.ordering.length > 1 ? `${arrow}${position + 1}` : arrow;
+    };
+
+    const rowAt = (index) => {
+        if (preview) return sample[index];
+        const page = pages[Math.floor(index / PAGE_SIZE)];
+        return page && page[index % PAGE_SIZE];
     };
 
-    if (loading) {
+    if (loading || dashboardLoading) {
         return (
             <div className="data-table-container">
                 <h2>Equipment Data</h2>
@@ -55,7 +203,7 @@ const DataTable = () => {
         );
     }
 
-    if (data.length === 0) {
+    if (!totalCount) {
         return (
             <div className="data-table-container">
                 <h2>Equipment Data</h2>
@@ -66,46 +214,95 @@ const DataTable = () => {
         );
     }
 
+    const rows = [];
+    for (let index = first; index < last; index++) {
+        const item = rowAt(index);
+        rows.push(item ? (
+            <tr key={item.id} className="table-row">
+                <td className="equipment-name">{item.equipment_name}</td>
+                <td>
+                    <span className="type-badge">{item.equipment_type}</span>
+                </td>
+                <td className="numeric">{item.flowrate.toFixed(2)}</td>
+                <td className="numeric">{item.pressure.toFixed(2)}</td>
+                <td className="numeric">{item.temperature.toFixed(2)}</td>
+            </tr>
+        ) : (
+            <tr key={`pending-${index}`} className="table-row">
+                <td colSpan={COLUMNS.length}>
+                    <div className="skeleton-cell skeleton"></div>
+                </td>
+            </tr>
+        ));
+    }
+
     return (
         <div className="data-table-container">
             <div className="table-header">
                 <h2>Equipment Data</h2>
-                <span className="record-count">{data.length} records</span>
+                {preview ? (
+                    <div className="preview-actions">
+                        <span className="record-count">
+                            Preview: {sample.length} sampled of {totalCount} records
+                        </span>
+                        <button onClick={() => setPreview(false)} className="btn btn-outline">
+                            Browse all records
+                        </button>
+                    </div>
+                ) : (
+                    <span className="record-count">
+                        {count === null
+                            ? 'Searching…'
+                            : count === totalCount ? `${count} records` : `${count} of ${totalCount} records`}
+                    </span>
+                )}
+            </div>
+
+            <div className="table-toolbar">
+                <input
+                    type="search"
+                    className="table-search"
+                    placeholder="Search name or type…"
+                    value={searchInput}
+                    onChange={(e) => setSearchInput(e.target.value)}
+                />
+                <select
+                    className="table-filter"
+                    value={query.equipmentType}
+                    onChange={(e) => updateQuery({ equipmentType: e.target.value })}
+                >
+                    <option value="">All types</option>
+                    {types.map((type) => (
+                        <option key={type} value={type}>{type}</option>
+                    ))}
+                </select>
             </div>
 
-            <div className="table-wrapper">
+            <div
+                className="table-wrapper table-scroll"
+                ref={scrollRef}
+                style={{ height: ROW_HEIGHT * (VIEWPORT_ROWS + 1) }}
+                onScroll={(e) => setScrollTop(e.currentTarget.scrollTop)}
+            >
                 <table className="data-table">
                     <thead>
                         <tr>
-                            <th onClick={() => requestSort('equipment_name')}>
-                                Equipment Name {getSortIcon('equipment_name')}
-                            </th>
-                            <th onClick={() => requestSort('equipment_type')}>
-                                Type {getSortIcon('equipment_type')}
-                            </th>
-                            <th onClick={() => requestSort('flowrate')}>
-                                Flowrate {getSortIcon('flowrate')}
-                            </th>
-                            <th onClick={() => requestSort('pressure')}>
-                                Pressure {getSortIcon('pressure')}
-                            </th>
-                            <th onClick={() => requestSort('temperature')}>
-                                Temperature {getSortIcon('temperature')}
-                            </th>
+                            {COLUMNS.map(({ key, label }) => (
+                                <th key={key} onClick={(e) => requestSort(key, e.shiftKey)} title="Shift-click to sort by several columns">
+                                    {label} {getSortIcon(key)}
+                                </th>
+                            ))}
                         </tr>
                     </thead>
                     <tbody>
-                        {data.map((item, index) => (
-                            <tr key={item.id || index} className="fade-in" style={{ animationDelay: `${index * 0.02}s` }}>
-                                <td className="equipment-name">{item.equipment_name}</td>
-                                <td>
-                                    <span className="type-badge">{item.equipment_type}</span>
-                                </td>
-                                <td className="numeric">{item.flowrate.toFixed(2)}</td>
-                                <td className="numeric">{item.pressure.toFixed(2)}</td>
-                                <td className="numeric">{item.temperature.toFixed(2)}</td>
+                        {first > 0 && <tr style={{ height: first * ROW_HEIGHT }} />}
+                        {rows}
+                        {last < rowCount && <tr style={{ height: (rowCount - last) * ROW_HEIGHT }} />}
+                        {count === 0 && !preview && (
+                            <tr>
+                                <td colSpan={COLUMNS.length} className="no-matches">No records match.</td>
                             </tr>
-                        ))}
+                        )}
                     </tbody>
                 </table>
             </div>
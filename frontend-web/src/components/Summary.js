@@ -1,26 +1,8 @@
-import React, { useState, useEffect } from 'react';
+import React from 'react';
 import apiService from '../services/api';
 import './Summary.css';
 
-const Summary = () => {
-    const [summary, setSummary] = useState(null);
-    const [loading, setLoading] = useState(true);
-
-    useEffect(() => {
-        fetchSummary();
-    }, []);
-
-    const fetchSummary = async () => {
-        try {
-            const response = await apiService.getSummary();
-            setSummary(response.summary);
-        } catch (err) {
-            console.error('Error fetching summary:', err);
-        } finally {
-            setLoading(false);
-        }
-    };
-
+const Summary = ({ summary, loading }) => {
     const handleDownloadReport = async () => {
         try {
             await apiService.downloadReport();
@@ -3,6 +3,9 @@ import { useDropzone } from 'react-dropzone';
 import apiService from '../services/api';
 import './Upload.css';
 
+// Plain or compressed CSV; the backend decompresses while parsing
+const CSV_EXTENSIONS = ['.csv', '.csv.gz', '.csv.bz2', '.csv.zst'];
+
 const Upload = ({ onUploadSuccess }) => {
     const [uploading, setUploading] = useState(false);
     const [progress, setProgress] = useState(0);
@@ -15,7 +18,7 @@ const Upload = ({ onUploadSuccess }) => {
         const file = acceptedFiles[0];
 
         // Validate file type
-        if (!file.name.endsWith('.csv')) {
+        if (!CSV_EXTENSIONS.some((ext) => file.name.toLowerCase().endsWith(ext))) {
             setError('Please upload a CSV file');
             return;
         }
@@ -57,7 +60,10 @@ const Upload = ({ onUploadSuccess }) => {
     const { getRootProps, getInputProps, isDragActive } = useDropzone({
         onDrop,
         accept: {
-            'text/csv': ['.csv']
+            'text/csv': ['.csv'],
+            'application/gzip': ['.gz'],
+            'application/x-bzip2': ['.bz2'],
+            'application/zstd': ['.zst']
         },
         multiple: false,
     });
@@ -92,7 +98,7 @@ const Upload = ({ onUploadSuccess }) => {
                         <>
                             <p className="primary-text">Drag & drop CSV file here</p>
                             <p className="secondary-text">or click to browse files</p>
-                            <p className="hint-text">Supported format: .csv</p>
+                            <p className="hint-text">Supported formats: .csv, .csv.gz, .csv.bz2, .csv.zst</p>
                         </>
                     )}
                 </div>
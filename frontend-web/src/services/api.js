@@ -2,6 +2,10 @@ import axios from 'axios';
 
 const API_BASE_URL = 'http://localhost:8000/api';
 
+const EVENT_TYPES = ['upload.started', 'upload.progress', 'upload.completed', 'upload.failed', 'retention.cleanup'];
+// Matches the retry interval the event stream advertises
+const EVENT_RECONNECT_MS = 5000;
+
 // Create axios instance
 const api = axios.create({
     baseURL: API_BASE_URL,
@@ -57,9 +61,16 @@ const apiService = {
         return response.data;
     },
 
-    // Get Equipment Data
-    getData: async () => {
-        const response = await api.get('/data/');
+    // Get Equipment Data (params: upload_id, offset or after (a page's next_cursor), limit, ordering,
+    // equipment_type, search and <field>_min/<field>_max filters; or sample, stratify for a random preview)
+    getData: async (params = {}) => {
+        const response = await api.get('/data/', { params });
+        return response.data;
+    },
+
+    // Summary, history and the first page of data in one request
+    getDashboard: async (params = {}) => {
+        const response = await api.get('/dashboard/', { params });
         return response.data;
     },
 
@@ -92,6 +103,55 @@ const apiService = {
 
         return response.data;
     },
+
+    // Server-pushed upload and retention events; returns a function that closes the stream
+    subscribeEvents: (onEvent) => {
+        let source = null;
+        let closed = false;
+        let retryTimer = null;
+        let lastEventId = null;
+
+        const reconnectLater = () => {
+            if (!closed) retryTimer = setTimeout(connect, EVENT_RECONNECT_MS);
+        };
+
+        // EventSource cannot send headers, so each connection opens with a
+        // short-lived ticket rather than the auth token
+        const connect = async () => {
+            let ticket;
+            try {
+                ticket = (await api.post('/events/ticket/')).data.ticket;
+            } catch (err) {
+                console.error('Error opening event stream:', err);
+                reconnectLater();
+                return;
+            }
+            if (closed) return;
+
+            const params = new URLSearchParams({ ticket });
+            if (lastEventId) params.set('last_event_id', lastEventId);
+            source = new EventSource(`${API_BASE_URL}/events/?${params}`);
+            EVENT_TYPES.forEach((type) => {
+                source.addEventListener(type, (event) => {
+                    lastEventId = event.lastEventId || lastEventId;
+                    onEvent(type, JSON.parse(event.data));
+                });
+            });
+            // The browser's own reconnect would resend the expired ticket, so
+            // reconnect with a fresh one, resuming after the last event seen
+            source.onerror = () => {
+                source.close();
+                reconnectLater();
+            };
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(retryTimer);
+            if (source) source.close();
+        };
+    },
 };
 
 export default apiService;